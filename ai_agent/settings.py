@@ -80,6 +80,36 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'ai_agent.wsgi.application'
+ASGI_APPLICATION = 'ai_agent.asgi.application'
+
+# Serve /api/chat/stream/ from the async view. Only enable when running
+# under an ASGI server (ai_agent.asgi); under WSGI the sync view is used.
+CHAT_ASYNC_STREAMING = env.bool('CHAT_ASYNC_STREAMING', default=False)
+
+# Streamed assistant content is written behind: flushed to the database at
+# most every CHAT_STREAM_FLUSH_INTERVAL_MS or once CHAT_STREAM_FLUSH_BYTES
+# have accumulated, and always on complete/error.
+CHAT_STREAM_FLUSH_INTERVAL_MS = env.int('CHAT_STREAM_FLUSH_INTERVAL_MS', default=250)
+CHAT_STREAM_FLUSH_BYTES = env.int('CHAT_STREAM_FLUSH_BYTES', default=2048)
+
+# Streamed events are numbered and the last CHAT_STREAM_BUFFER_EVENTS of each
+# message kept in this cache, so clients can resume with Last-Event-ID
+# (apps.chat.events). Use a shared cache (Redis) with several workers.
+CHAT_STREAM_BUFFER_CACHE = env('CHAT_STREAM_BUFFER_CACHE', default='default')
+CHAT_STREAM_BUFFER_EVENTS = env.int('CHAT_STREAM_BUFFER_EVENTS', default=512)
+CHAT_STREAM_BUFFER_TTL = env.int('CHAT_STREAM_BUFFER_TTL', default=600)  # seconds after the last event
+# The log is off on a process-local cache (locmem) unless one process produces
+# and serves every stream (e.g. runserver without background chat)
+CHAT_STREAM_BUFFER_ALLOW_LOCAL = env.bool('CHAT_STREAM_BUFFER_ALLOW_LOCAL', default=False)
+
+# SSE encoding (apps.chat.sse): deltas are merged into one frame until
+# CHAT_SSE_FLUSH_BYTES are pending or CHAT_SSE_FLUSH_INTERVAL_MS passed; a
+# comment heartbeat is sent after CHAT_SSE_HEARTBEAT_SECONDS of silence.
+# At most CHAT_SSE_MAX_PENDING_EVENTS are read ahead of a slow client.
+CHAT_SSE_FLUSH_BYTES = env.int('CHAT_SSE_FLUSH_BYTES', default=1024)
+CHAT_SSE_FLUSH_INTERVAL_MS = env.int('CHAT_SSE_FLUSH_INTERVAL_MS', default=50)
+CHAT_SSE_HEARTBEAT_SECONDS = env.float('CHAT_SSE_HEARTBEAT_SECONDS', default=15)
+CHAT_SSE_MAX_PENDING_EVENTS = env.int('CHAT_SSE_MAX_PENDING_EVENTS', default=64)
 
 # Database
 DATABASES = {
@@ -132,21 +162,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.PresenceJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'apps.core.parsers.FastJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
 }
 
+# JSON encoding for API responses, chat streams and reports (apps.core.json).
+# 'orjson' needs the orjson package; 'stdlib' uses DRF's JSONRenderer as is.
+JSON_BACKEND = env('JSON_BACKEND', default='stdlib')
+
+# Hot counters (usage, download and activity counts) are buffered per process
+# and written in bulk every HOT_COUNTERS_FLUSH_INTERVAL seconds, or once
+# HOT_COUNTERS_MAX_KEYS rows are pending; 0 writes each increment through.
+HOT_COUNTERS_FLUSH_INTERVAL = env.float('HOT_COUNTERS_FLUSH_INTERVAL', default=5)
+HOT_COUNTERS_MAX_KEYS = env.int('HOT_COUNTERS_MAX_KEYS', default=1000)
+HOT_COUNTERS_BATCH_SIZE = env.int('HOT_COUNTERS_BATCH_SIZE', default=500)
+
+# User presence, see apps.authentication.presence: last_activity is written at
+# most once per PRESENCE_PERSIST_INTERVAL seconds per user, and open sessions
+# of users idle for PRESENCE_IDLE_TIMEOUT seconds are ended in bulk.
+PRESENCE_PERSIST_INTERVAL = env.int('PRESENCE_PERSIST_INTERVAL', default=60)
+PRESENCE_IDLE_TIMEOUT = env.int('PRESENCE_IDLE_TIMEOUT', default=1800)
+PRESENCE_SWEEP_INTERVAL = env.int('PRESENCE_SWEEP_INTERVAL', default=300)
+PRESENCE_SWEEP_BATCH_SIZE = env.int('PRESENCE_SWEEP_BATCH_SIZE', default=1000)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=env.int('JWT_ACCESS_TOKEN_LIFETIME', default=60)),
@@ -217,6 +266,171 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# RAG calls are slow and I/O bound: keep them off the default queue and
+# hand each worker one task at a time. Run a dedicated consumer with
+#   celery -A ai_agent worker -Q chat -P threads --concurrency 50
+CELERY_TASK_ROUTES = {
+    'chat.process_chat_message': {'queue': 'chat'},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Everything else (outbox delivery, search indexing, rollups, purges, cache
+# refreshes) goes to the default queue. It needs a worker and, for the
+# periodic runs below, a beat scheduler:
+#   celery -A ai_agent worker -Q celery --concurrency 4
+#   celery -A ai_agent beat
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+
+# Background chat (POST /api/chat/ with "background": true returns 202)
+CHAT_BACKGROUND_DEFAULT = env.bool('CHAT_BACKGROUND_DEFAULT', default=False)
+CHAT_BACKGROUND_TIME_LIMIT = env.int('CHAT_BACKGROUND_TIME_LIMIT', default=300)  # seconds per task
+CHAT_BACKGROUND_POLL_INTERVAL_MS = env.int('CHAT_BACKGROUND_POLL_INTERVAL_MS', default=250)  # event stream
+# Answers left PROCESSING by a worker that died (restart, OOM) are failed by a
+# periodic sweep once they saw no write for CHAT_STALE_MESSAGE_SECONDS
+CHAT_STALE_MESSAGE_SECONDS = env.int('CHAT_STALE_MESSAGE_SECONDS', default=CHAT_BACKGROUND_TIME_LIMIT + 60)
+CHAT_STALE_MESSAGE_BATCH_SIZE = env.int('CHAT_STALE_MESSAGE_BATCH_SIZE', default=500)
+CHAT_STALE_MESSAGE_SWEEP_INTERVAL = env.int('CHAT_STALE_MESSAGE_SWEEP_INTERVAL', default=120)  # periodic run
+
+# RAG / n8n upstream HTTP client
+# One pooled keep-alive session per worker process, see apps.core.http
+RAG_HTTP_POOL_SIZE = env.int('RAG_HTTP_POOL_SIZE', default=10)
+RAG_HTTP_ASYNC_MAX_CONNECTIONS = env.int('RAG_HTTP_ASYNC_MAX_CONNECTIONS', default=200)  # ASGI streams
+RAG_HTTP_CONNECT_TIMEOUT = env.float('RAG_HTTP_CONNECT_TIMEOUT', default=3.05)  # seconds
+RAG_HTTP_READ_TIMEOUT = env.float('RAG_HTTP_READ_TIMEOUT', default=30)  # seconds
+RAG_HTTP_MAX_RETRIES = env.int('RAG_HTTP_MAX_RETRIES', default=2)  # idempotent calls only
+RAG_HTTP_BACKOFF_FACTOR = env.float('RAG_HTTP_BACKOFF_FACTOR', default=0.3)
+RAG_CIRCUIT_FAILURE_THRESHOLD = env.int('RAG_CIRCUIT_FAILURE_THRESHOLD', default=5)
+RAG_CIRCUIT_RESET_TIMEOUT = env.float('RAG_CIRCUIT_RESET_TIMEOUT', default=30)  # seconds
+
+# Outbound n8n webhooks go through a transactional outbox (apps.core.outbox),
+# delivered by the 'core.drain_outbox' task in claimed batches of
+# OUTBOX_BATCH_SIZE, OUTBOX_CONCURRENCY calls at a time. Failures are retried
+# with exponential backoff and marked dead after OUTBOX_MAX_ATTEMPTS.
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', default=50)
+OUTBOX_CONCURRENCY = env.int('OUTBOX_CONCURRENCY', default=8)
+OUTBOX_DRAIN_MAX_BATCHES = env.int('OUTBOX_DRAIN_MAX_BATCHES', default=20)  # per task run
+OUTBOX_CLAIM_SECONDS = env.int('OUTBOX_CLAIM_SECONDS', default=300)  # lease of a claimed batch
+OUTBOX_HTTP_TIMEOUT = env.float('OUTBOX_HTTP_TIMEOUT', default=30)  # seconds
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=10)
+OUTBOX_RETRY_BASE_SECONDS = env.int('OUTBOX_RETRY_BASE_SECONDS', default=30)
+OUTBOX_RETRY_MAX_SECONDS = env.int('OUTBOX_RETRY_MAX_SECONDS', default=3600)
+OUTBOX_SENT_RETENTION_DAYS = env.int('OUTBOX_SENT_RETENTION_DAYS', default=7)
+OUTBOX_DRAIN_INTERVAL = env.int('OUTBOX_DRAIN_INTERVAL', default=60)  # seconds between periodic drains
+
+# Caches
+# locmem by default; point CACHE_URL / ANSWER_CACHE_URL at Redis in production
+# (e.g. redis://redis:6379/1, with maxmemory-policy allkeys-lru).
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://default'),
+    'answers': env.cache('ANSWER_CACHE_URL', default='locmemcache://answers'),
+}
+CACHES['answers'].setdefault('OPTIONS', {}).setdefault(
+    'MAX_ENTRIES', env.int('ANSWER_CACHE_MAX_ENTRIES', default=5000)
+)
+
+# RAG answer cache, see apps.chat.cache. It needs a shared ANSWER_CACHE_URL so
+# that invalidations after document changes reach every worker; set
+# ANSWER_CACHE_ALLOW_LOCAL to use locmem when only one process serves requests.
+ANSWER_CACHE_ENABLED = env.bool('ANSWER_CACHE_ENABLED', default=True)
+ANSWER_CACHE_ALLOW_LOCAL = env.bool('ANSWER_CACHE_ALLOW_LOCAL', default=False)
+ANSWER_CACHE_TTL = env.int('ANSWER_CACHE_TTL', default=3600)  # seconds served fresh
+ANSWER_CACHE_STALE_TTL = env.int('ANSWER_CACHE_STALE_TTL', default=86400)  # extra seconds kept for stale-if-error
+
+# Async streams convert HTML to Markdown in a worker thread once a single
+# upstream piece is larger than this (keeps the event loop responsive)
+CHAT_MARKDOWN_OFFLOAD_BYTES = env.int('CHAT_MARKDOWN_OFFLOAD_BYTES', default=16 * 1024)
+
+# Conversation context sent to the RAG webhook, see apps.chat.context
+CHAT_CONTEXT_WINDOW_MESSAGES = env.int('CHAT_CONTEXT_WINDOW_MESSAGES', default=10)
+CHAT_CONTEXT_TOKEN_BUDGET = env.int('CHAT_CONTEXT_TOKEN_BUDGET', default=2000)
+CHAT_CONTEXT_CACHE_TTL = env.int('CHAT_CONTEXT_CACHE_TTL', default=3600)  # seconds
+
+# Message history is served newest first in cursor windows of this size;
+# the conversation detail endpoint embeds only the latest window.
+CHAT_HISTORY_PAGE_SIZE = env.int('CHAT_HISTORY_PAGE_SIZE', default=50)
+CHAT_HISTORY_MAX_PAGE_SIZE = env.int('CHAT_HISTORY_MAX_PAGE_SIZE', default=200)
+
+# Chat search, see apps.chat.search. Vectors are computed in the background,
+# CHAT_SEARCH_INDEX_DELAY seconds after a write, in UPDATEs of
+# CHAT_SEARCH_INDEX_BATCH rows. CHAT_SEARCH_CONFIG is the PostgreSQL text
+# search configuration ('simple' does no language-specific stemming).
+CHAT_SEARCH_CONFIG = env('CHAT_SEARCH_CONFIG', default='simple')
+CHAT_SEARCH_PAGE_SIZE = env.int('CHAT_SEARCH_PAGE_SIZE', default=20)
+CHAT_SEARCH_MAX_PAGE_SIZE = env.int('CHAT_SEARCH_MAX_PAGE_SIZE', default=50)
+CHAT_SEARCH_CONVERSATION_LIMIT = env.int('CHAT_SEARCH_CONVERSATION_LIMIT', default=5)
+CHAT_SEARCH_SNIPPET_WORDS = env.int('CHAT_SEARCH_SNIPPET_WORDS', default=30)
+CHAT_SEARCH_INDEX_DELAY = env.int('CHAT_SEARCH_INDEX_DELAY', default=5)  # seconds
+CHAT_SEARCH_INDEX_BATCH = env.int('CHAT_SEARCH_INDEX_BATCH', default=1000)
+CHAT_SEARCH_INDEX_MAX_BATCHES = env.int('CHAT_SEARCH_INDEX_MAX_BATCHES', default=50)
+CHAT_SEARCH_INDEX_INTERVAL = env.int('CHAT_SEARCH_INDEX_INTERVAL', default=300)  # periodic run
+
+# Hourly chat usage rollups, see apps.chat.rollups. Reads queue a refresh when
+# the rollups are more than CHAT_ROLLUP_MAX_AGE seconds behind; refreshes stop
+# CHAT_ROLLUP_LAG_SECONDS short of now so in-flight transactions are not missed.
+CHAT_ROLLUP_LAG_SECONDS = env.int('CHAT_ROLLUP_LAG_SECONDS', default=60)
+CHAT_ROLLUP_MAX_AGE = env.int('CHAT_ROLLUP_MAX_AGE', default=300)
+
+# Bulk conversation actions, see ChatService.bulk_update_conversations. Deletes
+# of more than CHAT_BULK_DELETE_SYNC_MESSAGES messages run in the background.
+CHAT_BULK_MAX_IDS = env.int('CHAT_BULK_MAX_IDS', default=5000)
+CHAT_BULK_DELETE_SYNC_MESSAGES = env.int('CHAT_BULK_DELETE_SYNC_MESSAGES', default=2000)
+
+# Ratings accepted per POST /api/chat/feedback/batch/
+FEEDBACK_BATCH_MAX_ITEMS = env.int('FEEDBACK_BATCH_MAX_ITEMS', default=500)
+
+# Remote feedback lists and analytics, see apps.chat.feedback_cache. Entries are
+# served fresh for FEEDBACK_CACHE_TTL seconds; for FEEDBACK_CACHE_STALE_TTL more
+# they are still served while a background task refreshes them.
+FEEDBACK_CACHE_TTL = env.int('FEEDBACK_CACHE_TTL', default=60)
+FEEDBACK_CACHE_STALE_TTL = env.int('FEEDBACK_CACHE_STALE_TTL', default=86400)
+FEEDBACK_CACHE_REFRESH_TIMEOUT = env.int('FEEDBACK_CACHE_REFRESH_TIMEOUT', default=120)
+
+# Deleted conversations are hidden at once and purged in the background (see
+# apps.chat.purge), CHAT_PURGE_BATCH_SIZE rows per DELETE with a pause of
+# CHAT_PURGE_PAUSE_MS between batches; each run takes CHAT_PURGE_MAX_SECONDS at most.
+CHAT_PURGE_BATCH_SIZE = env.int('CHAT_PURGE_BATCH_SIZE', default=1000)
+CHAT_PURGE_PAUSE_MS = env.int('CHAT_PURGE_PAUSE_MS', default=50)
+CHAT_PURGE_MAX_SECONDS = env.int('CHAT_PURGE_MAX_SECONDS', default=120)
+CHAT_PURGE_INTERVAL = env.int('CHAT_PURGE_INTERVAL', default=300)  # periodic run
+
+# Streaming exports (see apps.chat.export) read CHAT_EXPORT_CHUNK_SIZE rows per
+# server-side cursor fetch and write the response in chunks of about
+# CHAT_EXPORT_FLUSH_BYTES.
+CHAT_EXPORT_CHUNK_SIZE = env.int('CHAT_EXPORT_CHUNK_SIZE', default=500)
+CHAT_EXPORT_FLUSH_BYTES = env.int('CHAT_EXPORT_FLUSH_BYTES', default=65536)
+
+# Periodic runs of the background jobs (celery beat). Writes queue these tasks
+# right away too, but the dedup keys that keep a burst of writes to one run
+# live in the cache, which is per process unless CACHE_URL is shared. These
+# runs make sure work recorded in the database is picked up regardless.
+CELERY_BEAT_SCHEDULE = {
+    'drain-outbox': {
+        'task': 'core.drain_outbox',
+        'schedule': OUTBOX_DRAIN_INTERVAL,
+    },
+    'index-search': {
+        'task': 'chat.index_search',
+        'schedule': CHAT_SEARCH_INDEX_INTERVAL,
+    },
+    'refresh-usage-rollups': {
+        'task': 'chat.refresh_usage_rollups',
+        'schedule': CHAT_ROLLUP_MAX_AGE,
+    },
+    'purge-conversations': {
+        'task': 'chat.purge_conversations',
+        'schedule': CHAT_PURGE_INTERVAL,
+    },
+    'end-idle-sessions': {
+        'task': 'authentication.end_idle_sessions',
+        'schedule': PRESENCE_SWEEP_INTERVAL,
+    },
+    'fail-stale-messages': {
+        'task': 'chat.fail_stale_messages',
+        'schedule': CHAT_STALE_MESSAGE_SWEEP_INTERVAL,
+    },
+}
+
+# Coalesce identical concurrent RAG questions into one upstream call per process
+RAG_SINGLE_FLIGHT_ENABLED = env.bool('RAG_SINGLE_FLIGHT_ENABLED', default=True)
 
 # Email Configuration
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -286,4 +500,4 @@ if not DEBUG:
     SECURE_SSL_REDIRECT = False
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
-    X_FRAME_OPTIONS = 'DENY'
\ No newline at end of file
+    X_FRAME_OPTIONS = 'DENY'
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import datetime, timedelta
+from apps.core.fields import CounterField
 from .models import (
     AnalyticsEvent, UserActivity, SystemMetrics, Report,
     FeatureUsage, ErrorLog
@@ -71,6 +72,10 @@ class UserActivitySerializer(serializers.ModelSerializer):
     user_display = serializers.CharField(source='user.username', read_only=True)
     total_session_time_display = serializers.SerializerMethodField()
     active_time_display = serializers.SerializerMethodField()
+    login_count = CounterField()
+    chat_messages_sent = CounterField()
+    files_uploaded = CounterField()
+    files_downloaded = CounterField()
     
     class Meta:
         model = UserActivity
@@ -1,10 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import Count, Sum, Avg, Q, F
+from django.db.models import Count, Sum, Avg, Q
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Any, Optional
-import json
 import csv
 import io
 from decimal import Decimal
@@ -14,9 +13,19 @@ from .models import (
     FeatureUsage, ErrorLog, EventType, PaymentRecord
 )
 from ..chat.models import ChatMessage
+from apps.core import json as fast_json
+from apps.core.counters import counters
 
 User = get_user_model()
 
+# UserActivity counter incremented for each tracked event type
+ACTIVITY_COUNTERS = {
+    EventType.USER_LOGIN: 'login_count',
+    EventType.CHAT_MESSAGE: 'chat_messages_sent',
+    EventType.FILE_UPLOAD: 'files_uploaded',
+    EventType.FILE_DOWNLOAD: 'files_downloaded',
+}
+
 
 class AnalyticsService:
     """Service for handling analytics operations"""
@@ -51,10 +60,7 @@ class AnalyticsService:
         )
         
         # Update user activity if user is provided
-        if user and event_type in [
-            EventType.USER_LOGIN, EventType.CHAT_MESSAGE, 
-            EventType.FILE_UPLOAD, EventType.FILE_DOWNLOAD
-        ]:
+        if user and event_type in ACTIVITY_COUNTERS:
             AnalyticsService._update_user_activity(user, event_type)
         
         return event
@@ -79,20 +85,10 @@ class AnalyticsService:
             }
         )
         
-        # Update specific metrics based on event type
-        if event_type == EventType.USER_LOGIN:
-            activity.login_count = F('login_count') + 1
-        elif event_type == EventType.CHAT_MESSAGE:
-            activity.chat_messages_sent = F('chat_messages_sent') + 1
-        elif event_type == EventType.FILE_UPLOAD:
-            activity.files_uploaded = F('files_uploaded') + 1
-        elif event_type == EventType.FILE_DOWNLOAD:
-            activity.files_downloaded = F('files_downloaded') + 1
-        
-        activity.save(update_fields=[
-            'login_count', 'chat_messages_sent', 'files_uploaded', 
-            'files_downloaded', 'updated_at'
-        ])
+        # Update specific metrics based on event type (buffered, see apps.core.counters)
+        field = ACTIVITY_COUNTERS.get(event_type)
+        if field:
+            counters.add(UserActivity, activity.pk, field, touch={'updated_at': timezone.now()})
     
     @staticmethod
     def get_user_activity_stats(
@@ -652,10 +648,10 @@ class ReportService:
             report.data = data
             
             if report.report_format == 'json':
-                file_content = json.dumps(data, indent=2, default=str)
+                file_content = ReportService._convert_to_json(data)
                 file_extension = 'json'
             elif report.report_format == 'csv':
-                file_content = ReportService._convert_to_csv(data)
+                file_content = ReportService._convert_to_csv(data).encode('utf-8')
                 file_extension = 'csv'
             else:
                 raise ValueError(f"Unknown report format: {report.report_format}")
@@ -663,7 +659,7 @@ class ReportService:
             # Save file (in a real app, save to storage service)
             file_path = f"reports/{report.id}_{report.name}.{file_extension}"
             report.file_path = file_path
-            report.file_size = len(file_content.encode('utf-8'))
+            report.file_size = len(file_content)
             
             report.progress = 100
             report.mark_completed()
@@ -832,6 +828,11 @@ class ReportService:
         
         return data
     
+    @staticmethod
+    def _convert_to_json(data: Dict[str, Any]) -> bytes:
+        """Convert report data to indented JSON (UTF-8)"""
+        return fast_json.dumps(data, indent=2, default=str)
+    
     @staticmethod
     def _convert_to_csv(data: Dict[str, Any]) -> str:
         """Convert report data to CSV format"""
@@ -8,7 +8,6 @@ from django.db.models import Q
 from django.http import HttpResponse, Http404
 from datetime import datetime, timedelta, date
 from typing import Dict, Any
-import json
 
 from .models import (
     AnalyticsEvent, UserActivity, SystemMetrics, Report,
@@ -22,6 +21,7 @@ from .serializers import (
 )
 from .services import AnalyticsService, ReportService, ErrorTrackingService
 from apps.authentication.permissions import IsAdminUser, IsActiveSubscription
+from apps.core.counters import counters
 
 User = get_user_model()
 
@@ -255,7 +255,7 @@ class ReportDownloadView(generics.RetrieveAPIView):
         # For now, return the data as JSON or CSV
         if report.report_format == 'json':
             response = HttpResponse(
-                json.dumps(report.data, indent=2, default=str),
+                ReportService._convert_to_json(report.data),
                 content_type='application/json'
             )
             response['Content-Disposition'] = f'attachment; filename="{report.name}.json"'
@@ -621,9 +621,9 @@ def users_list_stats(request):
                 'recent_activity': [
                     {
                         'date': activity.date,
-                        'login_count': activity.login_count,
-                        'chat_messages_sent': activity.chat_messages_sent,
-                        'files_uploaded': activity.files_uploaded,
+                        'login_count': counters.value(activity, 'login_count'),
+                        'chat_messages_sent': counters.value(activity, 'chat_messages_sent'),
+                        'files_uploaded': counters.value(activity, 'files_uploaded'),
                         'total_session_time': activity.total_session_time
                     } for activity in recent_activity
                 ]
@@ -0,0 +1,18 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .presence import presence
+
+
+class PresenceJWTAuthentication(JWTAuthentication):
+    """JWT authentication that records the user's activity on every authenticated request.
+    
+    ``presence.touch`` only writes the cache per request and the user row
+    once per PRESENCE_PERSIST_INTERVAL, so any API use (chat, files,
+    analytics) keeps the user's session open for the idle sweep.
+    """
+    
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            presence.touch(result[0])
+        return result
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.authentication.presence import presence
+
+
+class Command(BaseCommand):
+    help = 'End the open sessions of users idle for PRESENCE_IDLE_TIMEOUT seconds'
+
+    def handle(self, *args, **options):
+        ended = presence.end_idle_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Ended {ended} idle sessions"))
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_clientinfo_monthly_revenue_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Last time user was active'),
+        ),
+    ]
@@ -74,8 +74,9 @@ class User(AbstractUser):
     )
 
     # Activity tracking
+    # Written by apps.authentication.presence, not on every save
     last_activity = models.DateTimeField(
-        auto_now=True,
+        default=timezone.now,
         help_text="Last time user was active"
     )
 
@@ -0,0 +1,122 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import UserSession
+
+logger = logging.getLogger(__name__)
+
+SWEEP_SCHEDULED_KEY = 'presence:sweep-scheduled'
+
+
+class PresenceTracker:
+    """Track when users were last active without a user-row write per request.
+
+    Activity is recorded in the cache on every ``touch``; ``User.last_activity``
+    is persisted at most once per PRESENCE_PERSIST_INTERVAL seconds per user,
+    so it may lag the cache by that much. Sessions of users idle for
+    PRESENCE_IDLE_TIMEOUT seconds are ended in bulk by ``end_idle_sessions``,
+    which ``touch`` schedules at most once per PRESENCE_SWEEP_INTERVAL.
+    """
+
+    @staticmethod
+    def _seen_key(user_id) -> str:
+        return f"presence:seen:{user_id}"
+
+    @staticmethod
+    def _persisted_key(user_id) -> str:
+        return f"presence:persisted:{user_id}"
+
+    def touch(self, user, now: Optional[datetime] = None):
+        """Record activity of ``user``."""
+        now = now or timezone.now()
+        try:
+            cache.set(self._seen_key(user.pk), now, timeout=settings.PRESENCE_IDLE_TIMEOUT)
+            persist = cache.add(self._persisted_key(user.pk), True, timeout=settings.PRESENCE_PERSIST_INTERVAL)
+        except Exception as e:
+            # Without the cache, fall back to writing every time
+            logger.warning(f"Presence cache unavailable: {str(e)}")
+            persist = True
+
+        if persist:
+            # update() skips auto fields and signals; only this column is written
+            get_user_model().objects.filter(pk=user.pk).update(last_activity=now)
+            user.last_activity = now
+            self._schedule_sweep()
+
+    def last_seen(self, user) -> Optional[datetime]:
+        """Most recent activity, including activity not persisted yet."""
+        try:
+            seen = cache.get(self._seen_key(user.pk))
+        except Exception:
+            seen = None
+        if seen is None or (user.last_activity and user.last_activity > seen):
+            return user.last_activity
+        return seen
+
+    def end_idle_sessions(self, now: Optional[datetime] = None) -> int:
+        """End the open sessions of users idle for PRESENCE_IDLE_TIMEOUT seconds.
+
+        Each session ends at its user's last activity (never before it
+        started), and the session durations are added to the users'
+        ``total_time_spent``, all with set-based UPDATEs.
+
+        Returns:
+            Number of sessions ended
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=settings.PRESENCE_IDLE_TIMEOUT)
+        User = get_user_model()
+
+        idle = UserSession.objects.filter(
+            session_end__isnull=True,
+            user__last_activity__lt=cutoff
+        )
+        ended = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    idle.select_for_update(skip_locked=True, of=('self',))
+                    .values_list('id', flat=True)[:settings.PRESENCE_SWEEP_BATCH_SIZE]
+                )
+                if not ids:
+                    break
+                batch = UserSession.objects.filter(id__in=ids)
+                batch.update(session_end=Greatest(
+                    Subquery(User.objects.filter(pk=OuterRef('user_id')).values('last_activity')[:1]),
+                    F('session_start')
+                ))
+
+                durations = batch.filter(user_id=OuterRef('pk')).order_by().values('user_id').annotate(
+                    total=Sum(ExpressionWrapper(F('session_end') - F('session_start'), output_field=DurationField()))
+                ).values('total')
+                User.objects.filter(pk__in=batch.values('user_id')).update(
+                    total_time_spent=F('total_time_spent') + Coalesce(
+                        Subquery(durations[:1]), timedelta(0), output_field=DurationField()
+                    )
+                )
+                ended += len(ids)
+
+        if ended:
+            logger.info(f"Ended {ended} idle user sessions")
+        return ended
+
+    def _schedule_sweep(self):
+        from .tasks import end_idle_sessions_task
+
+        try:
+            if cache.add(SWEEP_SCHEDULED_KEY, True, timeout=settings.PRESENCE_SWEEP_INTERVAL):
+                end_idle_sessions_task.apply_async(countdown=settings.PRESENCE_SWEEP_INTERVAL)
+        except Exception as e:
+            logger.warning(f"Failed to schedule idle session sweep: {str(e)}")
+
+
+presence = PresenceTracker()
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from apps.core.fields import CounterField
 from .models import User, UserSession, ClientInfo
 
 
@@ -202,6 +203,7 @@ class UserSessionSerializer(serializers.ModelSerializer):
     
     duration = serializers.DurationField(read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
+    chat_messages_sent = CounterField()
     
     class Meta:
         model = UserSession
@@ -0,0 +1,13 @@
+import logging
+
+from celery import shared_task
+
+from .presence import presence
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='authentication.end_idle_sessions', ignore_result=True)
+def end_idle_sessions_task():
+    """End sessions of idle users (scheduled by PresenceTracker.touch)."""
+    return presence.end_idle_sessions()
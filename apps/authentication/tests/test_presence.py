@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.authentication.models import UserSession
+from apps.authentication.presence import SWEEP_SCHEDULED_KEY, presence
+
+
+@override_settings(PRESENCE_PERSIST_INTERVAL=60, PRESENCE_IDLE_TIMEOUT=1800)
+class PresenceTrackerTest(TestCase):
+    """Test cases for debounced presence tracking"""
+    
+    def setUp(self):
+        cache.clear()
+        cache.add(SWEEP_SCHEDULED_KEY, True)
+        self.user = get_user_model().objects.create_user(
+            username='present',
+            email='present@example.com',
+            password='testpass123'
+        )
+    
+    def stored_last_activity(self, user=None):
+        return get_user_model().objects.get(pk=(user or self.user).pk).last_activity
+    
+    def test_touch_persists_once_per_interval(self):
+        """Test repeated activity writes the user row only once"""
+        first = timezone.now()
+        
+        presence.touch(self.user, now=first)
+        with self.assertNumQueries(0):
+            presence.touch(self.user, now=first + timedelta(seconds=10))
+        
+        self.assertEqual(self.stored_last_activity(), first)
+        self.assertEqual(presence.last_seen(self.user), first + timedelta(seconds=10))
+    
+    def test_user_save_does_not_touch_activity(self):
+        """Test unrelated user saves leave last_activity alone"""
+        before = self.stored_last_activity()
+        
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        
+        self.assertEqual(self.stored_last_activity(), before)
+    
+    def test_end_idle_sessions(self):
+        """Test idle users' sessions end at their last activity, in bulk"""
+        now = timezone.now()
+        idle_user = self.user
+        active_user = get_user_model().objects.create_user(
+            username='active',
+            email='active@example.com',
+            password='testpass123'
+        )
+        idle_session = UserSession.objects.create(user=idle_user)
+        active_session = UserSession.objects.create(user=active_user)
+        started = now - timedelta(hours=3)
+        UserSession.objects.filter(pk=idle_session.pk).update(session_start=started)
+        get_user_model().objects.filter(pk=idle_user.pk).update(last_activity=now - timedelta(hours=2))
+        get_user_model().objects.filter(pk=active_user.pk).update(last_activity=now)
+        
+        ended = presence.end_idle_sessions(now=now)
+        
+        self.assertEqual(ended, 1)
+        idle_session.refresh_from_db()
+        active_session.refresh_from_db()
+        self.assertEqual(idle_session.session_end, now - timedelta(hours=2))
+        self.assertIsNone(active_session.session_end)
+        idle_user.refresh_from_db()
+        self.assertEqual(idle_user.total_time_spent, timedelta(hours=1))
+        self.assertEqual(presence.end_idle_sessions(now=now), 0)
+    
+    def test_first_persist_schedules_sweep(self):
+        """Test persisting activity schedules one idle-session sweep"""
+        cache.delete(SWEEP_SCHEDULED_KEY)
+        other = get_user_model().objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        
+        with patch('apps.authentication.tasks.end_idle_sessions_task.apply_async') as mock_apply_async:
+            presence.touch(self.user)
+            presence.touch(other)
+        
+        mock_apply_async.assert_called_once()
+    
+    def test_authenticated_request_records_activity(self):
+        """Test any API request counts as activity, not only chat writes"""
+        stale = timezone.now() - timedelta(hours=2)
+        get_user_model().objects.filter(pk=self.user.pk).update(last_activity=stale)
+        
+        response = self.client.get(
+            '/api/auth/profile/',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.stored_last_activity(), stale)
@@ -19,6 +19,7 @@ from .serializers import (
     ClientInfoSerializer
 )
 from .permissions import IsAdminUser
+from .presence import presence
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -73,6 +74,7 @@ class UserLoginView(APIView):
         # Update last login
         user.last_login = timezone.now()
         user.save(update_fields=['last_login'])
+        presence.touch(user, now=user.last_login)
         
         # Create user session
         session = UserSession.objects.create(
@@ -80,7 +80,7 @@ class ChatMessageAdmin(admin.ModelAdmin):
         'created_at'
     ]
     list_filter = [
-        'message_type', 'status', 'created_at', 'conversation__user'
+        'message_type', 'status', 'cache_status', 'created_at', 'conversation__user'
     ]
     search_fields = [
         'content', 'conversation__title', 'conversation__user__username',
@@ -88,7 +88,7 @@ class ChatMessageAdmin(admin.ModelAdmin):
     ]
     readonly_fields = [
         'id', 'created_at', 'updated_at', 'tokens_used', 
-        'response_time_ms', 'model_used'
+        'response_time_ms', 'time_to_first_token_ms', 'cache_status', 'model_used'
     ]
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
@@ -102,7 +102,7 @@ class ChatMessageAdmin(admin.ModelAdmin):
         ('AI Information', {
             'fields': (
                 'model_used', 'tokens_used', 
-                'response_time_ms', 'status'
+                'response_time_ms', 'time_to_first_token_ms', 'cache_status', 'status'
             )
         }),
         ('Error Information', {
@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+
+def is_process_local(cache) -> bool:
+    """Whether ``cache`` keeps entries per process (locmem, dummy), unseen by other workers."""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+class AnswerCache:
+    """Cache of RAG answers keyed on the normalized question and template.
+
+    Answers are stored as Markdown for ``ttl + stale_ttl`` seconds. Within
+    ``ttl`` they are served instead of calling the RAG webhook; after that
+    they are only served when the upstream fails (stale-if-error). Size is bounded by the
+    backing cache (``MAX_ENTRIES`` on locmem, ``maxmemory-policy`` on Redis),
+    both of which evict least recently used entries first.
+
+    Invalidation bumps a generation number that is part of every key, so
+    all previous answers become unreachable in one write. That only reaches
+    every worker when the backend is shared (Redis, Memcached, database), so
+    on a process-local backend the cache stays off unless
+    ANSWER_CACHE_ALLOW_LOCAL says the deployment runs a single process.
+    """
+
+    HIT = 'hit'
+    STALE = 'stale'
+    MISS = 'miss'
+    BYPASS = 'bypass'
+
+    GENERATION_KEY = 'answers:generation'
+
+    def __init__(self, alias: str = 'answers'):
+        self.alias = alias
+        self._warned = False
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def shared(self) -> bool:
+        """Whether every worker process sees the same entries."""
+        return not is_process_local(self.cache)
+
+    @property
+    def enabled(self) -> bool:
+        if not settings.ANSWER_CACHE_ENABLED:
+            return False
+        if self.shared or settings.ANSWER_CACHE_ALLOW_LOCAL:
+            return True
+        if not self._warned:
+            logger.warning(
+                f"Answer cache disabled: cache '{self.alias}' is local to each process, "
+                f"so invalidations would not reach other workers. Set ANSWER_CACHE_URL to a shared cache."
+            )
+            self._warned = True
+        return False
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation."""
+        return ' '.join(question.lower().split()).rstrip('?!.').strip()
+
+    @staticmethod
+    def _clock() -> int:
+        """Generation seed: later than any generation handed out before.
+
+        Milliseconds, so it stays ahead of ``incr`` unless invalidations come
+        faster than one per millisecond.
+        """
+        return int(time.time() * 1000)
+
+    def _generation(self) -> int:
+        # An evicted key must not restart at a generation already used
+        return self.cache.get_or_set(self.GENERATION_KEY, self._clock, timeout=None)
+
+    @classmethod
+    def fingerprint(cls, question: str, template_id: Optional[int] = None) -> str:
+        """Identify a question independently of the cache generation."""
+        digest = hashlib.sha256(cls.normalize(question).encode('utf-8')).hexdigest()
+        return f"{template_id or 0}:{digest}"
+
+    def make_key(self, question: str, template_id: Optional[int] = None) -> str:
+        return f"answers:{self._generation()}:{self.fingerprint(question, template_id)}"
+
+    def lookup(self, question: str, template_id: Optional[int] = None) -> Dict[str, Any]:
+        """Look up an answer.
+
+        Returns:
+            Dict with ``key``, ``entry`` (cached answer or None), ``fresh``
+            and the ``status`` to record if the upstream ends up being called
+        """
+        if not self.enabled:
+            return {'key': None, 'entry': None, 'fresh': False, 'status': self.MISS}
+
+        try:
+            key = self.make_key(question, template_id)
+            entry = self.cache.get(key)
+        except Exception as e:
+            # A cache outage must never break chat
+            logger.warning(f"Answer cache lookup failed: {str(e)}")
+            return {'key': None, 'entry': None, 'fresh': False, 'status': self.MISS}
+
+        fresh = bool(entry) and time.time() - entry['cached_at'] < settings.ANSWER_CACHE_TTL
+        return {'key': key, 'entry': entry, 'fresh': fresh, 'status': self.MISS}
+
+    def bypass(self) -> Dict[str, Any]:
+        """Lookup result for requests that must not use the cache."""
+        return {'key': None, 'entry': None, 'fresh': False, 'status': self.BYPASS}
+
+    def store(self, key: Optional[str], response: str, sources: list):
+        """Store an answer under a key returned by ``lookup``."""
+        if not key:
+            return
+        entry = {
+            'response': response,
+            'sources': sources or [],
+            'cached_at': time.time(),
+        }
+        try:
+            self.cache.set(key, entry, timeout=settings.ANSWER_CACHE_TTL + settings.ANSWER_CACHE_STALE_TTL)
+        except Exception as e:
+            logger.warning(f"Answer cache store failed: {str(e)}")
+
+    def invalidate(self):
+        """Drop every cached answer, e.g. after the document set changed."""
+        try:
+            generation = self.cache.incr(self.GENERATION_KEY)
+            now = self._clock()
+            if generation < now:
+                # Keep the generation at or above the clock, so a reseed after
+                # eviction can never fall back to a value already used
+                self.cache.set(self.GENERATION_KEY, now, timeout=None)
+        except ValueError:
+            # Generation key missing or evicted
+            self.cache.set(self.GENERATION_KEY, self._clock(), timeout=None)
+        except Exception as e:
+            logger.warning(f"Answer cache invalidation failed: {str(e)}")
+            return
+        logger.info("Answer cache invalidated")
+
+
+answer_cache = AnswerCache()
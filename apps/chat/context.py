@@ -0,0 +1,119 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import ChatMessage, Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationContextBuilder:
+    """Rolling window of recent turns per conversation, trimmed to a token budget.
+
+    The window is kept in the cache together with the conversation's
+    ``total_messages`` at the time it was last synced. The conversation row
+    is loaded at the start of every turn anyway, so comparing the two tells
+    whether another worker added or deleted messages since; only then is
+    the window reloaded from the messages table.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, conversation_id) -> str:
+        return f"chat:context:{conversation_id}"
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimate (about 4 characters per token)."""
+        return max(1, len(text) // 4)
+
+    def history(self, conversation: Conversation) -> List[Dict[str, Any]]:
+        """Return prior turns (oldest first) that fit in the token budget.
+
+        Must be called before the current user message is saved.
+        """
+        window = self._get(conversation.id)
+        if window is None or window['total_messages'] != conversation.total_messages:
+            window = {
+                'messages': self._load(conversation) if conversation.total_messages else [],
+                'total_messages': conversation.total_messages,
+            }
+            self._set(conversation.id, window)
+        return self.trim(window['messages'])
+
+    def record_turn(self, conversation: Conversation, user_message: ChatMessage, assistant_message: ChatMessage):
+        """Append a finished turn to the cached window.
+
+        ``conversation.total_messages`` must already include both messages.
+        Failed or unfinished answers are left out, as they are when the
+        window is loaded from the database.
+        """
+        window = self._get(conversation.id)
+        if window is None:
+            return
+
+        turn = [user_message]
+        if assistant_message.status == ChatMessage.MessageStatus.COMPLETED and assistant_message.content:
+            turn.append(assistant_message)
+
+        messages = window['messages'] + [self._entry(message) for message in turn]
+        self._set(conversation.id, {
+            'messages': messages[-settings.CHAT_CONTEXT_WINDOW_MESSAGES:],
+            'total_messages': conversation.total_messages,
+        })
+
+    def trim(self, messages: List[Dict[str, Any]], budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Keep the most recent messages whose combined size fits ``budget`` tokens."""
+        if budget is None:
+            budget = settings.CHAT_CONTEXT_TOKEN_BUDGET
+
+        kept = []
+        used = 0
+        for message in reversed(messages):
+            used += self.estimate_tokens(message['content'])
+            if used > budget:
+                break
+            kept.append(message)
+        kept.reverse()
+        return kept
+
+    def invalidate(self, conversation_id):
+        self.cache.delete(self._key(conversation_id))
+
+    def _load(self, conversation: Conversation) -> List[Dict[str, Any]]:
+        messages = conversation.messages.filter(
+            status=ChatMessage.MessageStatus.COMPLETED
+        ).exclude(
+            content=''
+        ).order_by('-created_at')[:settings.CHAT_CONTEXT_WINDOW_MESSAGES]
+        return [self._entry(message) for message in reversed(messages)]
+
+    def _entry(self, message: ChatMessage) -> Dict[str, Any]:
+        return {
+            'role': 'user' if message.is_from_user else 'assistant',
+            'content': message.content,
+            'timestamp': message.created_at.isoformat()
+        }
+
+    def _get(self, conversation_id) -> Optional[Dict[str, Any]]:
+        try:
+            return self.cache.get(self._key(conversation_id))
+        except Exception as e:
+            logger.warning(f"Conversation context cache read failed: {str(e)}")
+            return None
+
+    def _set(self, conversation_id, window: Dict[str, Any]):
+        try:
+            self.cache.set(self._key(conversation_id), window, timeout=settings.CHAT_CONTEXT_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Conversation context cache write failed: {str(e)}")
+
+
+context_builder = ConversationContextBuilder()
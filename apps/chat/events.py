@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import is_process_local
+from .models import ChatMessage
+from .sse import TICK
+
+logger = logging.getLogger(__name__)
+
+
+class StreamEventLog:
+    """Numbered events of one streamed assistant message in a bounded ring buffer.
+
+    The buffer lives in the shared cache, so a client reconnecting with
+    ``Last-Event-ID`` (or a second tab) can be served by any worker while the
+    original producer keeps running. Event ``n`` is stored in slot
+    ``n % size`` together with its number; the head record holds the last
+    number written and whether the stream has ended. A slot holding a
+    different number has been overwritten, which readers treat as a gap.
+
+    There is a single producer per message, so numbering needs no
+    coordination beyond the producer's own counter.
+
+    The producer (a web or Celery worker) and its readers are usually
+    different processes, so on a process-local cache the log is not
+    written at all unless CHAT_STREAM_BUFFER_ALLOW_LOCAL says one process
+    does everything; readers then follow the persisted message instead.
+    """
+
+    _warned = False
+
+    def __init__(self, message_id, size: Optional[int] = None, alias: Optional[str] = None):
+        self.message_id = str(message_id)
+        self.size = size or settings.CHAT_STREAM_BUFFER_EVENTS
+        self.alias = alias or settings.CHAT_STREAM_BUFFER_CACHE
+        self.seq = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def enabled(self) -> bool:
+        if settings.CHAT_STREAM_BUFFER_ALLOW_LOCAL or not is_process_local(self.cache):
+            return True
+        if not StreamEventLog._warned:
+            logger.warning(
+                f"Stream event log disabled: cache '{self.alias}' is local to each process. "
+                f"Set CHAT_STREAM_BUFFER_CACHE to a shared cache to make streams resumable."
+            )
+            StreamEventLog._warned = True
+        return False
+
+    @property
+    def head_key(self) -> str:
+        return f"chat:events:{self.message_id}:head"
+
+    def _slot_key(self, seq: int) -> str:
+        return f"chat:events:{self.message_id}:{seq % self.size}"
+
+    def _next(self, event: Dict[str, Any], offset: int) -> Dict[str, Any]:
+        """Number ``event`` and build the cache writes that store it."""
+        self.seq += 1
+        event['event_id'] = self.seq
+        return {
+            self._slot_key(self.seq): (self.seq, offset, event),
+            self.head_key: {'seq': self.seq, 'done': False},
+        }
+
+    def append(self, event: Dict[str, Any], offset: int = 0) -> Dict[str, Any]:
+        """Number and store an event.
+
+        Args:
+            event: Event to publish; ``event_id`` is added to it
+            offset: Position of a delta's content in the message, used to
+                line replayed deltas up with a content snapshot
+        """
+        writes = self._next(event, offset)
+        if not self.enabled:
+            return event
+        try:
+            self.cache.set_many(writes, timeout=settings.CHAT_STREAM_BUFFER_TTL)
+        except Exception as e:
+            # Resuming is best effort; never break the live stream over it
+            logger.warning(f"Stream event log write failed: {str(e)}")
+        return event
+
+    async def aappend(self, event: Dict[str, Any], offset: int = 0) -> Dict[str, Any]:
+        """Async variant of ``append``."""
+        writes = self._next(event, offset)
+        if not self.enabled:
+            return event
+        try:
+            await self.cache.aset_many(writes, timeout=settings.CHAT_STREAM_BUFFER_TTL)
+        except Exception as e:
+            logger.warning(f"Stream event log write failed: {str(e)}")
+        return event
+
+    def close(self):
+        """Mark the stream as ended so subscribers stop waiting."""
+        if not self.enabled:
+            return
+        try:
+            self.cache.set(self.head_key, {'seq': self.seq, 'done': True}, timeout=settings.CHAT_STREAM_BUFFER_TTL)
+        except Exception as e:
+            logger.warning(f"Stream event log write failed: {str(e)}")
+
+    async def aclose(self):
+        """Async variant of ``close``."""
+        if not self.enabled:
+            return
+        try:
+            await self.cache.aset(self.head_key, {'seq': self.seq, 'done': True}, timeout=settings.CHAT_STREAM_BUFFER_TTL)
+        except Exception as e:
+            logger.warning(f"Stream event log write failed: {str(e)}")
+
+    def read(self, after: int = 0) -> Optional[Dict[str, Any]]:
+        """Return the retained events numbered above ``after``.
+
+        Returns:
+            None if there is no log for the message, otherwise a dict with
+            ``events`` (list of (seq, offset, event)), ``first`` (lowest
+            number returned or still retained), ``last`` and ``done``
+        """
+        if not self.enabled:
+            return None
+        head = self.cache.get(self.head_key)
+        if head is None:
+            return None
+        keys = self._slot_keys(head, after)
+        slots = self.cache.get_many(list(keys)) if keys else {}
+        return self._page(head, keys, slots)
+
+    async def aread(self, after: int = 0) -> Optional[Dict[str, Any]]:
+        """Async variant of ``read``."""
+        if not self.enabled:
+            return None
+        head = await self.cache.aget(self.head_key)
+        if head is None:
+            return None
+        keys = self._slot_keys(head, after)
+        slots = await self.cache.aget_many(list(keys)) if keys else {}
+        return self._page(head, keys, slots)
+
+    def _slot_keys(self, head: Dict[str, Any], after: int) -> Dict[str, int]:
+        """Slot keys of the events after ``after`` that may still be retained, with their numbers."""
+        last = head['seq']
+        first = max(after + 1, last - self.size + 1, 1)
+        return {self._slot_key(seq): seq for seq in range(first, last + 1)}
+
+    @staticmethod
+    def _page(head: Dict[str, Any], keys: Dict[str, int], slots: Dict[str, Any]) -> Dict[str, Any]:
+        first = min(keys.values()) if keys else head['seq'] + 1
+        events = []
+        for key, seq in keys.items():
+            slot = slots.get(key)
+            if slot is None or slot[0] != seq:
+                # Evicted or overwritten; only events after it are usable
+                events = []
+                first = seq + 1
+                continue
+            events.append(slot)
+        return {'events': events, 'first': first, 'last': head['seq'], 'done': head['done']}
+
+MESSAGE_FIELDS = (
+    'status', 'content', 'sources', 'tokens_used', 'model_used', 'response_time_ms',
+    'time_to_first_token_ms', 'cache_status', 'error_message', 'conversation_id'
+)
+
+TERMINAL_STATUSES = (ChatMessage.MessageStatus.COMPLETED, ChatMessage.MessageStatus.FAILED)
+
+
+def follow_message_events(message_id, after: int = 0, ticks: bool = False) -> Iterator[Dict[str, Any]]:
+    """Replay a message's events after ``after`` and follow the live stream.
+
+    Events still in the ring buffer are replayed as they were sent. When
+    some were lost (evicted, or the log expired), the client first gets a
+    ``snapshot`` event carrying the persisted content, which replaces what
+    it has; snapshots have no ``event_id``, so reconnecting after one
+    resynchronises the same way. Deltas already covered by the snapshot are
+    trimmed using their recorded offsets.
+
+    Blocking variant for WSGI workers; see ``afollow_message_events``.
+    With ``ticks`` it yields ``sse.TICK`` before each wait, for SSEEncoder
+    (``with_ticks`` would poll the database from its reader thread).
+    """
+    log = StreamEventLog(message_id)
+    interval = settings.CHAT_BACKGROUND_POLL_INTERVAL_MS / 1000
+    deadline = time.monotonic() + settings.CHAT_BACKGROUND_TIME_LIMIT
+    messages = ChatMessage.objects.filter(id=message_id)
+    snapshot_length = None
+
+    while True:
+        page = log.read(after)
+
+        if page is None:
+            # Not started yet (queued), expired, disabled, or the producer is gone
+            row = messages.values(*MESSAGE_FIELDS).first()
+            if row is None:
+                return
+            if row['status'] in TERMINAL_STATUSES:
+                yield _snapshot_event(row)
+                yield _final_event(row)
+                return
+        else:
+            if page['first'] > after + 1 and snapshot_length is None:
+                row = messages.values(*MESSAGE_FIELDS).first()
+                if row is None:
+                    return
+                if not _snapshot_ready(row, page):
+                    if ticks:
+                        yield TICK
+                    time.sleep(interval)
+                    continue
+                snapshot_length = len(row['content'])
+                yield _snapshot_event(row)
+
+            events, after = _replay(page, after, snapshot_length)
+            yield from events
+
+            if page['done'] and after >= page['last']:
+                return
+
+        if time.monotonic() >= deadline:
+            yield _timeout_event(message_id)
+            return
+        if ticks:
+            yield TICK
+        time.sleep(interval)
+
+
+async def afollow_message_events(message_id, after: int = 0) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of ``follow_message_events``; waiting does not hold a thread."""
+    log = StreamEventLog(message_id)
+    interval = settings.CHAT_BACKGROUND_POLL_INTERVAL_MS / 1000
+    deadline = time.monotonic() + settings.CHAT_BACKGROUND_TIME_LIMIT
+    messages = ChatMessage.objects.filter(id=message_id)
+    snapshot_length = None
+
+    while True:
+        page = await log.aread(after)
+
+        if page is None:
+            row = await messages.values(*MESSAGE_FIELDS).afirst()
+            if row is None:
+                return
+            if row['status'] in TERMINAL_STATUSES:
+                yield _snapshot_event(row)
+                yield _final_event(row)
+                return
+        else:
+            if page['first'] > after + 1 and snapshot_length is None:
+                row = await messages.values(*MESSAGE_FIELDS).afirst()
+                if row is None:
+                    return
+                if not _snapshot_ready(row, page):
+                    await asyncio.sleep(interval)
+                    continue
+                snapshot_length = len(row['content'])
+                yield _snapshot_event(row)
+
+            events, after = _replay(page, after, snapshot_length)
+            for event in events:
+                yield event
+
+            if page['done'] and after >= page['last']:
+                return
+
+        if time.monotonic() >= deadline:
+            yield _timeout_event(message_id)
+            return
+        await asyncio.sleep(interval)
+
+
+def _snapshot_ready(row: Dict[str, Any], page: Dict[str, Any]) -> bool:
+    """False while the persisted content lags the oldest retained event (wait for the next flush)."""
+    oldest_offset = page['events'][0][1] if page['events'] else 0
+    return len(row['content']) >= oldest_offset or row['status'] in TERMINAL_STATUSES
+
+
+def _replay(page: Dict[str, Any], after: int, snapshot_length: Optional[int]) -> Tuple[List[Dict[str, Any]], int]:
+    """Events of a page, trimmed of content a snapshot already covered; returns them and the new ``after``."""
+    events = []
+    for seq, offset, event in page['events']:
+        after = seq
+        if snapshot_length is not None and event.get('type') == 'delta':
+            covered = snapshot_length - offset
+            if covered >= len(event.get('content', '')):
+                continue
+            if covered > 0:
+                event = {**event, 'content': event['content'][covered:]}
+        events.append(event)
+    return events, after
+
+
+def _timeout_event(message_id) -> Dict[str, Any]:
+    # Worker lost or queue backed up; the client can poll the message
+    return {'type': 'timeout', 'assistant_message_id': str(message_id)}
+
+
+def _snapshot_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'type': 'snapshot',
+        'content': row['content'],
+        'status': row['status'],
+        'conversation_id': str(row['conversation_id'])
+    }
+
+
+def _final_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the terminal event of a finished message from its row."""
+    if row['status'] == ChatMessage.MessageStatus.FAILED:
+        return {
+            'type': 'error',
+            'response': row['content'],
+            'sources': row['sources'],
+            'error': row['error_message'],
+            'success': False,
+            'conversation_id': str(row['conversation_id'])
+        }
+    return {
+        'type': 'complete',
+        'sources': row['sources'],
+        'tokens_used': row['tokens_used'],
+        'model_used': row['model_used'],
+        'response_time_ms': row['response_time_ms'],
+        'time_to_first_token_ms': row['time_to_first_token_ms'],
+        'cache_status': row['cache_status'],
+        'success': True,
+        'conversation_id': str(row['conversation_id'])
+    }
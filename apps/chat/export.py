@@ -0,0 +1,147 @@
+import io
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+
+from apps.core import json as fast_json
+from .models import ChatMessage, Conversation
+
+NDJSON = 'ndjson'
+ZIP = 'zip'
+
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    ZIP: 'application/zip',
+}
+
+CONVERSATION_FIELDS = ('id', 'title', 'created_at', 'total_messages', 'total_tokens_used')
+MESSAGE_FIELDS = ('created_at', 'message_type', 'content', 'tokens_used', 'response_time_ms')
+
+
+def conversation_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Export shape of a conversation (without its messages)."""
+    return {
+        'conversation_id': str(row['id']),
+        'title': row['title'],
+        'created_at': row['created_at'].isoformat(),
+        'total_messages': row['total_messages'],
+        'total_tokens_used': row['total_tokens_used'],
+    }
+
+
+def message_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Export shape of a message."""
+    return {
+        'timestamp': row['created_at'].isoformat(),
+        'type': row['message_type'],
+        'content': row['content'],
+        'tokens_used': row['tokens_used'],
+        'response_time_ms': row['response_time_ms'],
+    }
+
+
+def conversation_rows(user, conversation_ids: Optional[Iterable] = None) -> Iterator[Dict[str, Any]]:
+    """A user's conversations, oldest first, read through a server-side cursor."""
+    conversations = Conversation.objects.filter(user=user)
+    if conversation_ids:
+        conversations = conversations.filter(id__in=conversation_ids)
+    return conversations.order_by('created_at', 'id').values(*CONVERSATION_FIELDS).iterator(
+        chunk_size=settings.CHAT_EXPORT_CHUNK_SIZE
+    )
+
+
+def message_rows(conversation_id) -> Iterator[Dict[str, Any]]:
+    """A conversation's messages in order, read through a server-side cursor."""
+    return ChatMessage.objects.filter(conversation_id=conversation_id).order_by('created_at').values(
+        *MESSAGE_FIELDS
+    ).iterator(chunk_size=settings.CHAT_EXPORT_CHUNK_SIZE)
+
+
+def export_ndjson(user, conversation_ids: Optional[Iterable] = None) -> Iterator[bytes]:
+    """Stream conversations as newline-delimited JSON.
+
+    Each conversation is a ``{"record": "conversation", ...}`` line
+    followed by one ``{"record": "message", "conversation_id": ..., ...}``
+    line per message. At most one database chunk and one output chunk
+    are held in memory at a time.
+    """
+    def lines():
+        for row in conversation_rows(user, conversation_ids):
+            conversation_id = str(row['id'])
+            yield fast_json.dumps({'record': 'conversation', **conversation_record(row)}) + b'\n'
+            for message in message_rows(row['id']):
+                yield fast_json.dumps({
+                    'record': 'message',
+                    'conversation_id': conversation_id,
+                    **message_record(message)
+                }) + b'\n'
+
+    return _chunked(lines())
+
+
+def export_zip(user, conversation_ids: Optional[Iterable] = None) -> Iterator[bytes]:
+    """Stream a ZIP archive with one ``<conversation_id>.json`` file per conversation.
+
+    Each file has the shape of ``ChatService.export_conversation``. The
+    archive is written to a non-seekable sink (sizes go in data
+    descriptors), which is drained as the response goes out.
+    """
+    sink = _Sink()
+
+    def parts():
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for row in conversation_rows(user, conversation_ids):
+                info = zipfile.ZipInfo(f"{row['id']}.json", date_time=row['created_at'].timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with archive.open(info, 'w') as entry:
+                    # The record without its closing brace, then the messages array
+                    entry.write(fast_json.dumps(conversation_record(row))[:-1] + b',"messages":[')
+                    separator = b''
+                    for message in message_rows(row['id']):
+                        entry.write(separator + fast_json.dumps(message_record(message)))
+                        separator = b','
+                        yield sink.drain()
+                    entry.write(b']}')
+                yield sink.drain()
+        yield sink.drain()
+
+    return _chunked(parts())
+
+
+def _chunked(parts: Iterable[bytes]) -> Iterator[bytes]:
+    """Merge small parts into chunks of about CHAT_EXPORT_FLUSH_BYTES."""
+    size = settings.CHAT_EXPORT_FLUSH_BYTES
+    pending = []
+    pending_bytes = 0
+    for part in parts:
+        if not part:
+            continue
+        pending.append(part)
+        pending_bytes += len(part)
+        if pending_bytes >= size:
+            yield b''.join(pending)
+            pending = []
+            pending_bytes = 0
+    if pending:
+        yield b''.join(pending)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer that hands out what was written so far."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
@@ -0,0 +1,108 @@
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS = 'analytics'
+FEEDBACKS = 'feedbacks'
+KINDS = (ANALYTICS, FEEDBACKS)
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def make_key(kind: str, status: Optional[bool] = None, date_from: str = None, date_to: str = None) -> str:
+    """Cache key of one remote feedback query (kind, status filter and date range)."""
+    status_part = 'all' if status is None else ('true' if status else 'false')
+    raw = f"{status_part}|{date_from or ''}|{date_to or ''}"
+    digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    return f"feedback:{kind}:{digest}"
+
+
+def summarize(data: Any) -> Dict[str, Any]:
+    """Thumbs counts and satisfaction rate of a remote feedback response."""
+    feedbacks = data.get('feedbacks', []) if isinstance(data, dict) else []
+    thumbs_up_count = 0
+    thumbs_down_count = 0
+    for feedback in feedbacks:
+        feedback_type = feedback.get('feedback_type')
+        if feedback_type == 'thumbs_up':
+            thumbs_up_count += 1
+        elif feedback_type == 'thumbs_down':
+            thumbs_down_count += 1
+    total_feedback = len(feedbacks)
+    satisfaction_rate = (thumbs_up_count / total_feedback * 100) if total_feedback > 0 else 0
+    return {
+        'total_feedback': total_feedback,
+        'thumbs_up_count': thumbs_up_count,
+        'thumbs_down_count': thumbs_down_count,
+        'satisfaction_rate': round(satisfaction_rate, 2)
+    }
+
+
+def lookup(key: str) -> Dict[str, Any]:
+    """Look up a cached response.
+
+    Returns:
+        Dict with ``entry`` (None on a miss), ``fresh``, True while the
+        entry is younger than FEEDBACK_CACHE_TTL, and ``overdue``, True once
+        a background refresh should long have replaced it (the task was
+        lost, or no worker consumes the default queue)
+    """
+    try:
+        entry = cache.get(key)
+    except Exception as e:
+        # A cache outage falls back to calling the remote service
+        logger.warning(f"Feedback cache lookup failed: {str(e)}")
+        entry = None
+    age = time.time() - entry['fetched_at'] if entry else None
+    return {
+        'entry': entry,
+        'fresh': age is not None and age < settings.FEEDBACK_CACHE_TTL,
+        'overdue': age is not None and age >= settings.FEEDBACK_CACHE_TTL + settings.FEEDBACK_CACHE_REFRESH_TIMEOUT,
+    }
+
+
+def store(key: str, data: Any) -> Dict[str, Any]:
+    """Store a remote response with its precomputed summary; returns the entry."""
+    entry = {
+        'data': data,
+        'summary': summarize(data),
+        'fetched_at': time.time(),
+    }
+    try:
+        cache.set(key, entry, timeout=settings.FEEDBACK_CACHE_TTL + settings.FEEDBACK_CACHE_STALE_TTL)
+    except Exception as e:
+        logger.warning(f"Feedback cache store failed: {str(e)}")
+    return entry
+
+
+def fetched_at(entry: Dict[str, Any]) -> str:
+    """When an entry was fetched from the remote service, as ISO 8601 (UTC)."""
+    return datetime.fromtimestamp(entry['fetched_at'], tz=dt_timezone.utc).isoformat()
+
+
+def refreshing_key(key: str) -> str:
+    return f"{key}:refreshing"
+
+
+def schedule_refresh(kind: str, status: Optional[bool] = None, date_from: str = None, date_to: str = None):
+    """Queue a background refresh of one entry, unless one is queued or running."""
+    from .tasks import refresh_feedback_cache_task
+
+    lock = refreshing_key(make_key(kind, status, date_from, date_to))
+    try:
+        # Expires on its own if the task is lost
+        if not cache.add(lock, True, timeout=settings.FEEDBACK_CACHE_REFRESH_TIMEOUT):
+            return
+        refresh_feedback_cache_task.apply_async(args=[kind, status, date_from, date_to])
+    except Exception as e:
+        cache.delete(lock)
+        logger.warning(f"Failed to schedule feedback cache refresh: {str(e)}")
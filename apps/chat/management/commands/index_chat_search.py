@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.search import full_text_supported, index_pending
+
+
+class Command(BaseCommand):
+    help = 'Compute missing full-text search vectors for conversations and messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of rows to index in each UPDATE (default: CHAT_SEARCH_INDEX_BATCH)'
+        )
+
+    def handle(self, *args, **options):
+        if not full_text_supported():
+            self.stdout.write(self.style.WARNING('Full-text search needs PostgreSQL; nothing to index'))
+            return
+
+        result = index_pending(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {result['conversations']} conversations and {result['messages']} messages"
+        ))
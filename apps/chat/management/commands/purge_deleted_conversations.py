@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.purge import purge_hidden
+
+
+class Command(BaseCommand):
+    help = 'Purge deleted conversations and their messages in throttled batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            help='Stop after this many seconds (default: CHAT_PURGE_MAX_SECONDS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of rows to delete in each statement (default: CHAT_PURGE_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        result = purge_hidden(max_seconds=options['max_seconds'], batch_size=options['batch_size'])
+        message = f"Purged {result['conversations']} conversations and {result['messages']} messages"
+        if result['done']:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.WARNING(f"{message}; more remain, run again"))
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+import logging
+
+from apps.chat.models import ChatMessage, Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Repair conversation counters and latest-message snapshots that drifted from their messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of conversations to fix in each UPDATE (default: 1000)'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Only reconcile conversations of this user id'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted conversations without updating them'
+        )
+
+    def handle(self, *args, **options):
+        actual_messages, actual_tokens = self._actual_totals()
+        snapshot = Conversation.last_message_expressions()
+
+        drifted = Conversation.objects.annotate(
+            actual_messages=actual_messages,
+            actual_tokens=actual_tokens,
+            actual_last_message_id=snapshot['last_message_id']
+        ).filter(
+            ~Q(total_messages=F('actual_messages'))
+            | ~Q(total_tokens_used=F('actual_tokens'))
+            | ~Q(last_message_id=F('actual_last_message_id'))
+            | Q(last_message_id__isnull=True, actual_last_message_id__isnull=False)
+            | Q(last_message_id__isnull=False, actual_last_message_id__isnull=True)
+        )
+        if options['user']:
+            drifted = drifted.filter(user_id=options['user'])
+
+        drifted_ids = list(drifted.values_list('id', flat=True))
+        if not drifted_ids:
+            self.stdout.write(self.style.SUCCESS('All conversation counters and snapshots are consistent'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f"DRY RUN - {len(drifted_ids)} conversations have drifted counters")
+            )
+            return
+
+        batch_size = options['batch_size']
+        fixed = 0
+        for start in range(0, len(drifted_ids), batch_size):
+            batch = drifted_ids[start:start + batch_size]
+            # One set-based UPDATE per batch; values come from correlated subqueries
+            fixed += Conversation.objects.filter(id__in=batch).update(
+                total_messages=actual_messages,
+                total_tokens_used=actual_tokens,
+                **snapshot
+            )
+
+        logger.info(f"Reconciled counters for {fixed} conversations")
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters for {fixed} conversations'))
+
+    def _actual_totals(self):
+        """Correlated subqueries computing each conversation's real totals."""
+        messages = ChatMessage.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by().values('conversation')
+
+        actual_messages = Coalesce(
+            Subquery(messages.annotate(count=Count('id')).values('count')),
+            Value(0),
+            output_field=IntegerField()
+        )
+        actual_tokens = Coalesce(
+            Subquery(messages.annotate(tokens=Sum('tokens_used')).values('tokens')),
+            Value(0),
+            output_field=IntegerField()
+        )
+        return actual_messages, actual_tokens
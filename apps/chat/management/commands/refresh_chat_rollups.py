@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.rollups import refresh_usage_rollups
+
+
+class Command(BaseCommand):
+    help = 'Refresh hourly chat usage rollups from messages changed since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every bucket, e.g. to drop deleted messages'
+        )
+
+    def handle(self, *args, **options):
+        result = refresh_usage_rollups(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {result['buckets']} buckets up to {result['high_water'].isoformat()}"
+        ))
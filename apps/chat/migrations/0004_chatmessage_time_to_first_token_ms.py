@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chatmessage_sources'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='time_to_first_token_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='Time until the first streamed token arrived, in milliseconds', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chatmessage_time_to_first_token_ms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='cache_status',
+            field=models.CharField(blank=True, choices=[('hit', 'Hit'), ('stale', 'Stale'), ('miss', 'Miss')], help_text='Whether the response was served from the answer cache', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_chatmessage_cache_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='cache_status',
+            field=models.CharField(blank=True, choices=[('hit', 'Hit'), ('stale', 'Stale'), ('miss', 'Miss'), ('bypass', 'Bypass')], help_text='Whether the response was served from the answer cache', max_length=10),
+        ),
+    ]
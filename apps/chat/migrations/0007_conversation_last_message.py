@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:43
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Length, Substr
+
+
+def backfill_last_message(apps, schema_editor):
+    """Fill the snapshot for existing conversations in one UPDATE."""
+    Conversation = apps.get_model('chat', 'Conversation')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+
+    latest = ChatMessage.objects.filter(
+        conversation=OuterRef('pk')
+    ).order_by('-created_at').annotate(
+        content_length=Length('content'),
+        preview=Case(
+            When(content_length__gt=100, then=Concat(Substr('content', 1, 100), Value('...'))),
+            default=F('content'),
+            output_field=models.TextField()
+        )
+    )
+    Conversation.objects.all().update(
+        last_message_id=Subquery(latest.values('id')[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.values('preview')[:1]), Value(''), output_field=models.CharField()
+        ),
+        last_message_type=Coalesce(
+            Subquery(latest.values('message_type')[:1]), Value(''), output_field=models.CharField()
+        ),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_alter_chatmessage_cache_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, help_text='When the latest message was created', null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_id',
+            field=models.UUIDField(blank=True, help_text='ID of the latest message', null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, help_text='First 100 characters of the latest message', max_length=103),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_type',
+            field=models.CharField(blank=True, help_text='Type of the latest message', max_length=10),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:50
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# GIN indexes for matching, and partial indexes that let the background
+# indexer find rows whose vector is missing without scanning the table.
+# Built CONCURRENTLY so existing tables stay writable; the vectors
+# themselves are filled by the indexer (manage.py index_chat_search).
+SEARCH_INDEXES = (
+    ('chat_messages_search_gin', 'chat_messages USING gin (search_vector)'),
+    ('chat_conversations_search_gin', 'chat_conversations USING gin (search_vector)'),
+    ('chat_messages_search_pending', 'chat_messages (id) WHERE search_vector IS NULL'),
+    ('chat_conversations_search_pending', 'chat_conversations (id) WHERE search_vector IS NULL'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('chat', '0007_conversation_last_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0008_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour (UTC)')),
+                ('model_used', models.CharField(blank=True, help_text='AI model of the messages (blank for user messages)', max_length=100)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('user_message_count', models.PositiveIntegerField(default=0)),
+                ('assistant_message_count', models.PositiveIntegerField(default=0)),
+                ('tokens_used', models.BigIntegerField(default=0)),
+                ('response_time_ms_sum', models.BigIntegerField(default=0)),
+                ('response_time_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Chat Usage Rollup',
+                'verbose_name_plural': 'Chat Usage Rollups',
+                'db_table': 'chat_usage_rollups',
+                'ordering': ['-bucket'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('high_water', models.DateTimeField(blank=True, help_text='Rows updated up to this time are included', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'chat_rollup_watermarks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['updated_at'], name='chat_messag_updated_2ebabf_idx'),
+        ),
+        migrations.AddField(
+            model_name='chatusagerollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_usage_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='chatusagerollup',
+            index=models.Index(fields=['user', 'bucket'], name='chat_usage__user_id_d3ac80_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatusagerollup',
+            index=models.Index(fields=['bucket'], name='chat_usage__bucket_fe308c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='chatusagerollup',
+            constraint=models.UniqueConstraint(fields=('bucket', 'user', 'model_used'), name='chat_usage_rollup_key'),
+        ),
+    ]
@@ -1,8 +1,13 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Greatest, Length, Substr
 from django.conf import settings
 from django.utils import timezone
 import uuid
 
+from apps.core.counters import counters
+
 
 class Folder(models.Model):
     """Model to represent conversation folders for organization."""
@@ -57,6 +62,16 @@ class Folder(models.Model):
         return self.conversations.count()
 
 
+class ConversationManager(models.Manager):
+    """Default manager: conversations waiting to be purged are hidden.
+    
+    Use ``Conversation.all_objects`` to include them.
+    """
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Conversation(models.Model):
     """Model to represent a chat conversation."""
     
@@ -112,6 +127,49 @@ class Conversation(models.Model):
         help_text="Total tokens used in this conversation"
     )
     
+    # Snapshot of the latest message, so conversation lists need no per-row query
+    last_message_id = models.UUIDField(
+        null=True,
+        blank=True,
+        help_text="ID of the latest message"
+    )
+    
+    last_message_preview = models.CharField(
+        max_length=103,
+        blank=True,
+        help_text="First 100 characters of the latest message"
+    )
+    
+    last_message_type = models.CharField(
+        max_length=10,
+        blank=True,
+        help_text="Type of the latest message"
+    )
+    
+    last_message_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the latest message was created"
+    )
+    
+    # Full-text index of the title, NULL until (re)computed by apps.chat.search
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+    
+    # Set when the conversation is deleted; the rows are removed later by
+    # the background purger (apps.chat.purge)
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the conversation was deleted, pending purge"
+    )
+    
+    objects = ConversationManager()
+    all_objects = models.Manager()
+    
     class Meta:
         db_table = 'chat_conversations'
         verbose_name = 'Conversation'
@@ -123,6 +181,11 @@ class Conversation(models.Model):
             models.Index(fields=['user', 'is_pinned']),
             models.Index(fields=['user', 'folder']),
             models.Index(fields=['folder', '-updated_at']),
+            models.Index(
+                fields=['deleted_at'],
+                name='chat_conv_pending_purge_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
         ]
     
     def __str__(self):
@@ -140,14 +203,97 @@ class Conversation(models.Model):
                 if len(first_message.content) > 50:
                     self.title += "..."
         
+        # A new title is indexed in the background
+        update_fields = kwargs.get('update_fields')
+        reindex = update_fields is None or 'title' in update_fields
+        if reindex:
+            self.search_vector = None
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_vector'}
+        
         super().save(*args, **kwargs)
+        
+        if reindex:
+            _schedule_search_indexing()
+    
+    @staticmethod
+    def stats_delta(messages=0, tokens=0, touch=False, last_message=None):
+        """Build ``update()`` kwargs that adjust the counters atomically.
+        
+        Counters are clamped at zero so a drifted row never violates the
+        positive integer constraint. If ``last_message`` is given, the
+        latest-message snapshot is set to it in the same UPDATE.
+        """
+        updates = {}
+        if messages:
+            updates['total_messages'] = Greatest(F('total_messages') + messages, 0)
+        if tokens:
+            updates['total_tokens_used'] = Greatest(F('total_tokens_used') + tokens, 0)
+        if touch:
+            updates['updated_at'] = timezone.now()
+        if last_message is not None:
+            updates.update(last_message.snapshot())
+        return updates
+    
+    def apply_stats_delta(self, messages=0, tokens=0, touch=False, last_message=None):
+        """Adjust statistics (and optionally ``updated_at``) in a single UPDATE."""
+        updates = self.stats_delta(messages, tokens, touch, last_message)
+        if not updates:
+            return
+        Conversation.objects.filter(pk=self.pk).update(**updates)
+        
+        # Mirror the change in memory without re-reading the row
+        self.total_messages = max(self.total_messages + messages, 0)
+        self.total_tokens_used = max(self.total_tokens_used + tokens, 0)
+        if touch:
+            self.updated_at = updates['updated_at']
+        if last_message is not None:
+            for field, value in last_message.snapshot().items():
+                setattr(self, field, value)
+    
+    @staticmethod
+    def last_message_expressions():
+        """Subquery expressions computing the latest-message snapshot of each row.
+        
+        Used to repair the snapshot in bulk, e.g. after the latest message
+        was deleted (``Conversation.objects.filter(...).update(**...)``).
+        """
+        latest = ChatMessage.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by('-created_at').annotate(
+            content_length=Length('content'),
+            preview=Case(
+                When(
+                    content_length__gt=ChatMessage.PREVIEW_LENGTH,
+                    then=Concat(Substr('content', 1, ChatMessage.PREVIEW_LENGTH), Value('...'))
+                ),
+                default=F('content'),
+                output_field=models.TextField()
+            )
+        )
+        return {
+            'last_message_id': Subquery(latest.values('id')[:1]),
+            'last_message_preview': Coalesce(
+                Subquery(latest.values('preview')[:1]), Value(''), output_field=models.CharField()
+            ),
+            'last_message_type': Coalesce(
+                Subquery(latest.values('message_type')[:1]), Value(''), output_field=models.CharField()
+            ),
+            'last_message_at': Subquery(latest.values('created_at')[:1]),
+        }
     
     def update_stats(self):
-        """Update conversation statistics."""
-        self.total_messages = self.messages.count()
-        self.total_tokens_used = sum(
-            msg.tokens_used or 0 for msg in self.messages.all()
+        """Recount conversation statistics from scratch.
+        
+        Counters are normally maintained incrementally by ChatMessage; this
+        is only needed to repair drift (see ``reconcile_conversation_stats``).
+        """
+        totals = self.messages.aggregate(
+            count=models.Count('id'),
+            tokens=models.Sum('tokens_used')
         )
+        self.total_messages = totals['count']
+        self.total_tokens_used = totals['tokens'] or 0
         self.save(update_fields=['total_messages', 'total_tokens_used'])
 
 
@@ -165,6 +311,12 @@ class ChatMessage(models.Model):
         COMPLETED = 'completed', 'Completed'
         FAILED = 'failed', 'Failed'
     
+    class CacheStatus(models.TextChoices):
+        HIT = 'hit', 'Hit'
+        STALE = 'stale', 'Stale'
+        MISS = 'miss', 'Miss'
+        BYPASS = 'bypass', 'Bypass'
+    
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -220,6 +372,19 @@ class ChatMessage(models.Model):
         help_text="Response time in milliseconds"
     )
     
+    time_to_first_token_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Time until the first streamed token arrived, in milliseconds"
+    )
+    
+    cache_status = models.CharField(
+        max_length=10,
+        choices=CacheStatus.choices,
+        blank=True,
+        help_text="Whether the response was served from the answer cache"
+    )
+    
     # Error handling
     error_message = models.TextField(
         blank=True,
@@ -249,6 +414,12 @@ class ChatMessage(models.Model):
         help_text="List of source documents used for this response"
     )
     
+    # Full-text index of the content, NULL until (re)computed by apps.chat.search
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+    
     class Meta:
         db_table = 'chat_messages'
         verbose_name = 'Chat Message'
@@ -258,18 +429,95 @@ class ChatMessage(models.Model):
             models.Index(fields=['conversation', 'created_at']),
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['message_type', 'status']),
+            models.Index(fields=['updated_at']),
         ]
     
+    PREVIEW_LENGTH = 100
+    
     def __str__(self):
         return f"{self.message_type} - {self.content[:50]}..."
     
-    def save(self, *args, **kwargs):
+    @property
+    def preview(self):
+        """First 100 characters of the content, as shown in conversation lists."""
+        if len(self.content) > self.PREVIEW_LENGTH:
+            return self.content[:self.PREVIEW_LENGTH] + '...'
+        return self.content
+    
+    def snapshot(self):
+        """Conversation fields describing this message as the latest one."""
+        return {
+            'last_message_id': self.pk,
+            'last_message_preview': self.preview,
+            'last_message_type': self.message_type,
+            'last_message_at': self.created_at,
+        }
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Tokens already counted in the conversation total
+        instance._counted_tokens = instance.__dict__.get('tokens_used')
+        return instance
+    
+    def save(self, *args, touch_conversation=True, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        tokens_delta = 0
+        if update_fields is None or 'tokens_used' in update_fields:
+            tokens_delta = (self.tokens_used or 0) - (getattr(self, '_counted_tokens', None) or 0)
+        
+        # New or edited content is indexed in the background
+        reindex = adding or update_fields is None or 'content' in update_fields
+        if reindex:
+            self.search_vector = None
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'search_vector'}
+        
         super().save(*args, **kwargs)
         
-        # Update conversation stats when message is saved
-        if self.conversation_id:
-            self.conversation.updated_at = timezone.now()
-            self.conversation.save(update_fields=['updated_at'])
+        if reindex:
+            _schedule_search_indexing()
+        
+        # Update conversation stats when message is saved: counters move by
+        # atomic deltas and updated_at is touched in the same UPDATE. Streamed
+        # turns pass touch_conversation=False and apply the whole turn's delta
+        # once at the end (Conversation.apply_stats_delta).
+        if touch_conversation and self.conversation_id:
+            self._counted_tokens = self.tokens_used
+            # A new message is the latest one; also in the same UPDATE
+            self._apply_conversation_delta(
+                messages=1 if adding else 0,
+                tokens=tokens_delta,
+                touch=True,
+                last_message=self if adding else None
+            )
+            if not adding and (update_fields is None or 'content' in update_fields):
+                # Edited content: refresh the preview if this is the latest message
+                Conversation.objects.filter(
+                    pk=self.conversation_id,
+                    last_message_id=self.pk
+                ).update(last_message_preview=self.preview)
+    
+    def delete(self, *args, **kwargs):
+        tokens = getattr(self, '_counted_tokens', self.tokens_used) or 0
+        message_id = self.pk
+        result = super().delete(*args, **kwargs)
+        self._apply_conversation_delta(messages=-1, tokens=-tokens)
+        # Fall back to the previous message if this one was the latest
+        Conversation.objects.filter(
+            pk=self.conversation_id,
+            last_message_id=message_id
+        ).update(**Conversation.last_message_expressions())
+        return result
+    
+    def _apply_conversation_delta(self, messages=0, tokens=0, touch=False, last_message=None):
+        if ChatMessage.conversation.is_cached(self):
+            self.conversation.apply_stats_delta(messages, tokens, touch, last_message)
+            return
+        updates = Conversation.stats_delta(messages, tokens, touch, last_message)
+        if updates:
+            Conversation.objects.filter(pk=self.conversation_id).update(**updates)
     
     @property
     def is_from_user(self):
@@ -355,6 +603,81 @@ class ChatTemplate(models.Model):
         return f"{self.name} ({self.get_category_display()})"
     
     def increment_usage(self):
-        """Increment usage count."""
+        """Increment usage count (buffered, see apps.core.counters)."""
+        counters.add(ChatTemplate, self.pk, 'usage_count')
         self.usage_count += 1
-        self.save(update_fields=['usage_count'])
\ No newline at end of file
+
+
+class ChatUsageRollup(models.Model):
+    """Hourly chat usage per user and model, maintained by apps.chat.rollups.
+    
+    Messages are counted in the hour they were created. Latency is kept as
+    a sum and a count so averages over any range stay exact.
+    """
+    
+    bucket = models.DateTimeField(
+        help_text="Start of the hour (UTC)"
+    )
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chat_usage_rollups'
+    )
+    
+    model_used = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="AI model of the messages (blank for user messages)"
+    )
+    
+    message_count = models.PositiveIntegerField(default=0)
+    user_message_count = models.PositiveIntegerField(default=0)
+    assistant_message_count = models.PositiveIntegerField(default=0)
+    tokens_used = models.BigIntegerField(default=0)
+    response_time_ms_sum = models.BigIntegerField(default=0)
+    response_time_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'chat_usage_rollups'
+        verbose_name = 'Chat Usage Rollup'
+        verbose_name_plural = 'Chat Usage Rollups'
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'user', 'model_used'], name='chat_usage_rollup_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'bucket']),
+            models.Index(fields=['bucket']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.bucket:%Y-%m-%d %H:00} - {self.model_used or 'user'}"
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup has been refreshed (``ChatMessage.updated_at`` high-water mark)."""
+    
+    name = models.CharField(
+        max_length=50,
+        primary_key=True
+    )
+    
+    high_water = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Rows updated up to this time are included"
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'chat_rollup_watermarks'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.high_water}"
+
+
+def _schedule_search_indexing():
+    from .search import schedule_search_indexing
+    transaction.on_commit(schedule_search_indexing)
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class MessageCursorPagination(CursorPagination):
+    """Newest-first windows over a conversation's messages.
+
+    Pages are keyed on ``created_at``, so each one is a range scan on the
+    ``(conversation, created_at)`` index however long the conversation is.
+    ``next`` loads older messages, ``previous`` newer ones. Cursors stay
+    valid while messages are added, unlike page numbers.
+    """
+
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.CHAT_HISTORY_PAGE_SIZE
+        self.max_page_size = settings.CHAT_HISTORY_MAX_PAGE_SIZE
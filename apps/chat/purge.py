@@ -0,0 +1,177 @@
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ChatMessage, Conversation
+from .rollups import recompute_buckets, touched_buckets
+
+logger = logging.getLogger(__name__)
+
+PURGE_SCHEDULED_KEY = 'chat:purge:scheduled'
+PURGE_RUNNING_KEY = 'chat:purge:running'
+
+
+def hide_conversations(conversations) -> int:
+    """Delete conversations from the user's point of view right away.
+
+    The rows are only marked (``deleted_at``) and taken out of their
+    folder in one UPDATE; the purger removes them and their messages in
+    the background, once the surrounding transaction commits.
+
+    Args:
+        conversations: Conversation queryset
+
+    Returns:
+        Number of conversations hidden
+    """
+    hidden = conversations.update(deleted_at=timezone.now(), folder=None)
+    if hidden:
+        transaction.on_commit(schedule_purge)
+    return hidden
+
+
+def schedule_purge(countdown: int = 0):
+    """Queue a purger run, unless one is already queued."""
+    from .tasks import purge_conversations_task
+
+    try:
+        # Expires on its own if the task is lost; the periodic run
+        # (CELERY_BEAT_SCHEDULE) purges what it hides from other processes
+        if not cache.add(PURGE_SCHEDULED_KEY, True, timeout=countdown + settings.CHAT_PURGE_INTERVAL):
+            return
+        purge_conversations_task.apply_async(countdown=countdown)
+    except Exception as e:
+        cache.delete(PURGE_SCHEDULED_KEY)
+        logger.warning(f"Failed to schedule conversation purge: {str(e)}")
+
+
+def purge_hidden(max_seconds: Optional[float] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Purge hidden conversations, oldest first, for at most ``max_seconds``.
+
+    Returns:
+        Dict with the number of ``conversations`` and ``messages`` deleted
+        and ``done``, False when time ran out before everything was purged
+    """
+    batch_size = batch_size or settings.CHAT_PURGE_BATCH_SIZE
+    max_seconds = settings.CHAT_PURGE_MAX_SECONDS if max_seconds is None else max_seconds
+    deadline = time.monotonic() + max_seconds
+    hidden = Conversation.all_objects.filter(deleted_at__isnull=False).order_by('deleted_at')
+
+    result = {'conversations': 0, 'messages': 0, 'done': True}
+    while True:
+        ids = list(hidden.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        purged = purge_conversations(
+            ids, batch_size, pause=settings.CHAT_PURGE_PAUSE_MS / 1000, deadline=deadline
+        )
+        result['conversations'] += purged['conversations']
+        result['messages'] += purged['messages']
+        if not purged['done']:
+            result['done'] = False
+            break
+    return result
+
+
+def purge_conversations(
+    conversation_ids: Iterable,
+    batch_size: Optional[int] = None,
+    pause: float = 0,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """Delete conversations and their messages in bounded batches.
+
+    Messages are removed first, ``batch_size`` rows per DELETE statement,
+    so no single statement holds locks on (or writes WAL for) a whole
+    history, and the ORM never loads them. The usage rollup buckets the
+    messages were counted in are recomputed afterwards.
+
+    Args:
+        conversation_ids: IDs of the conversations to delete
+        batch_size: Rows per DELETE (CHAT_PURGE_BATCH_SIZE by default)
+        pause: Seconds to sleep between batches, to leave the database room
+            for user traffic
+        deadline: ``time.monotonic()`` value after which to stop early
+
+    Returns:
+        Dict with the number of ``conversations`` and ``messages`` deleted
+        and ``done``, False when stopped by ``deadline``
+    """
+    batch_size = batch_size or settings.CHAT_PURGE_BATCH_SIZE
+    conversation_ids = list(conversation_ids)
+    result = {'conversations': 0, 'messages': 0, 'done': True}
+
+    for start in range(0, len(conversation_ids), batch_size):
+        chunk = conversation_ids[start:start + batch_size]
+        buckets = touched_buckets(ChatMessage.objects.filter(conversation_id__in=chunk))
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                recompute_buckets(buckets)
+                result['done'] = False
+                return result
+            deleted = _delete_messages(chunk, batch_size)
+            result['messages'] += deleted
+            if deleted < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        # Messages written meanwhile are still removed by the cascade
+        deleted = Conversation.all_objects.filter(id__in=chunk).delete()[1]
+        result['conversations'] += deleted.get(Conversation._meta.label, 0)
+        result['messages'] += deleted.get(ChatMessage._meta.label, 0)
+        recompute_buckets(buckets)
+
+    if result['conversations']:
+        logger.info(f"Purged {result['conversations']} conversations and {result['messages']} messages")
+    return result
+
+
+def _delete_messages(conversation_ids: list, limit: int) -> int:
+    """Delete up to ``limit`` messages of the given conversations in one statement."""
+    quote = connection.ops.quote_name
+    table = quote(ChatMessage._meta.db_table)
+    pk = quote(ChatMessage._meta.pk.column)
+    fk = quote(ChatMessage._meta.get_field('conversation').column)
+    params = [Conversation._meta.pk.get_db_prep_value(value, connection) for value in conversation_ids]
+    placeholders = ', '.join(['%s'] * len(params))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {pk} IN "
+            f"(SELECT {pk} FROM {table} WHERE {fk} IN ({placeholders}) LIMIT %s)",
+            params + [limit]
+        )
+        return cursor.rowcount
+
+
+def purge_progress(user) -> Dict[str, Any]:
+    """How much of a user's deleted history is still waiting to be purged.
+
+    Queues a purger run when there is work left, so a lost task does not
+    leave rows behind.
+
+    Returns:
+        Dict with the ``pending_conversations``, their ``pending_messages``
+        (as counted on the conversations), ``deleted_since`` (oldest
+        pending deletion) and ``done``
+    """
+    pending = Conversation.all_objects.filter(user=user, deleted_at__isnull=False).aggregate(
+        conversations=Count('id'),
+        messages=Coalesce(Sum('total_messages'), 0),
+        since=Min('deleted_at')
+    )
+    if pending['conversations']:
+        schedule_purge()
+    return {
+        'pending_conversations': pending['conversations'],
+        'pending_messages': pending['messages'],
+        'deleted_since': pending['since'],
+        'done': not pending['conversations']
+    }
@@ -0,0 +1,218 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import ChatMessage, ChatUsageRollup, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'chat_usage'
+REFRESH_SCHEDULED_KEY = 'chat:rollups:refresh-scheduled'
+
+HOUR = timedelta(hours=1)
+
+ROLLUP_FIELDS = (
+    'message_count', 'user_message_count', 'assistant_message_count',
+    'tokens_used', 'response_time_ms_sum', 'response_time_count'
+)
+
+
+def _aggregates() -> Dict[str, Any]:
+    """Aggregates over ChatMessage that make up one rollup row."""
+    timed = Q(message_type=ChatMessage.MessageType.ASSISTANT, response_time_ms__isnull=False)
+    return {
+        'message_count': Count('id'),
+        'user_message_count': Count('id', filter=Q(message_type=ChatMessage.MessageType.USER)),
+        'assistant_message_count': Count('id', filter=Q(message_type=ChatMessage.MessageType.ASSISTANT)),
+        'tokens_used': Coalesce(Sum('tokens_used'), 0),
+        'response_time_ms_sum': Coalesce(Sum('response_time_ms', filter=timed), 0),
+        'response_time_count': Count('id', filter=timed),
+    }
+
+
+def refresh_usage_rollups(rebuild: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Bring ChatUsageRollup up to date with messages changed since the last refresh.
+
+    Only the (hour, user) buckets holding a message updated after the
+    high-water mark are recomputed, from the messages themselves, so a
+    refresh is idempotent and picks up late changes such as a streamed
+    answer's final token count. The mark trails the clock by
+    CHAT_ROLLUP_LAG_SECONDS so that transactions still in flight are not
+    skipped. Refreshes are serialized on the watermark row.
+
+    Deleted messages leave nothing behind to find by ``updated_at``: code
+    that deletes messages calls ``recompute_buckets`` with the buckets
+    they were in, and ``rebuild`` recomputes every bucket.
+
+    Returns:
+        Dict with the number of ``buckets`` recomputed and the new ``high_water``
+    """
+    upper = (now or timezone.now()) - timedelta(seconds=settings.CHAT_ROLLUP_LAG_SECONDS)
+
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        lower = None if rebuild else watermark.high_water
+        if lower is not None and lower >= upper:
+            return {'buckets': 0, 'high_water': lower}
+
+        if lower is None:
+            # First run or rebuild: every bucket, for every user
+            ChatUsageRollup.objects.all().delete()
+            changed = _changed_buckets(ChatMessage.objects.filter(updated_at__lte=upper), users=False)
+        else:
+            changed = _changed_buckets(
+                ChatMessage.objects.filter(updated_at__gt=lower, updated_at__lte=upper), users=True
+            )
+
+        buckets = 0
+        for bucket, user_ids in changed.items():
+            _recompute_bucket(bucket, user_ids)
+            buckets += 1
+
+        watermark.high_water = upper
+        watermark.save(update_fields=['high_water', 'updated_at'])
+
+    logger.info(f"Refreshed {buckets} chat usage rollup buckets up to {upper.isoformat()}")
+    return {'buckets': buckets, 'high_water': upper}
+
+
+def _changed_buckets(messages, users: bool) -> Dict[datetime, Optional[set]]:
+    """Map each hour touched by ``messages`` to its users (None meaning all)."""
+    hours = messages.annotate(bucket=TruncHour('created_at')).order_by()
+    if not users:
+        return {bucket: None for bucket in hours.values_list('bucket', flat=True).distinct()}
+    changed = defaultdict(set)
+    for bucket, user_id in hours.values_list('bucket', 'user_id').distinct().iterator():
+        changed[bucket].add(user_id)
+    return changed
+
+
+def _recompute_bucket(bucket: datetime, user_ids: Optional[Iterable[int]]):
+    """Replace the rollup rows of one hour (for ``user_ids``, or all users) with fresh aggregates."""
+    messages = ChatMessage.objects.filter(created_at__gte=bucket, created_at__lt=bucket + HOUR)
+    rollups = ChatUsageRollup.objects.filter(bucket=bucket)
+    if user_ids is not None:
+        messages = messages.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    rows = messages.order_by().values('user_id', 'model_used').annotate(**_aggregates())
+    rollups.delete()
+    ChatUsageRollup.objects.bulk_create([
+        ChatUsageRollup(bucket=bucket, **row)
+        for row in rows
+    ])
+
+
+def touched_buckets(messages) -> Dict[datetime, set]:
+    """The (hour, user) buckets ``messages`` are counted in; collect them before a delete."""
+    return _changed_buckets(messages, users=True)
+
+
+def recompute_buckets(changed: Dict[datetime, Iterable[int]]) -> int:
+    """Recompute buckets after messages in them were deleted.
+
+    Serialized with refreshes on the watermark row. Before the first
+    refresh there is nothing to correct, so nothing is done.
+
+    Args:
+        changed: Users per bucket, as returned by ``touched_buckets``
+
+    Returns:
+        Number of buckets recomputed
+    """
+    if not changed:
+        return 0
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+        if watermark is None or watermark.high_water is None:
+            return 0
+        for bucket, user_ids in changed.items():
+            _recompute_bucket(bucket, user_ids)
+    return len(changed)
+
+
+def high_water() -> Optional[datetime]:
+    """Time up to which the rollups are current (None before the first refresh)."""
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('high_water', flat=True).first()
+
+
+def schedule_rollup_refresh(current: Optional[datetime]):
+    """Queue a background refresh when the rollups are older than CHAT_ROLLUP_MAX_AGE.
+
+    Called on read with the current ``high_water()``; readers get the
+    current rollups right away and later reads see the refreshed ones.
+    Before the first refresh (``current`` is None) the initial build is
+    queued the same way, so no request scans the whole message table; run
+    ``manage.py refresh_chat_rollups`` after deploying to build it up front.
+    """
+    max_age = timedelta(seconds=settings.CHAT_ROLLUP_LAG_SECONDS + settings.CHAT_ROLLUP_MAX_AGE)
+    if current is not None and timezone.now() - current < max_age:
+        return
+
+    from .tasks import refresh_usage_rollups_task
+
+    try:
+        if not cache.add(REFRESH_SCHEDULED_KEY, True, timeout=settings.CHAT_ROLLUP_MAX_AGE):
+            return
+        refresh_usage_rollups_task.apply_async()
+    except Exception as e:
+        cache.delete(REFRESH_SCHEDULED_KEY)
+        logger.warning(f"Failed to schedule chat usage rollup refresh: {str(e)}")
+
+
+def usage_totals(user=None, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """Sum the rollups, optionally for one user and from ``since`` on.
+
+    Returns:
+        Dict with the summed rollup fields, ``avg_response_time_ms`` and
+        ``refreshed_at`` (the high-water mark the totals are current to, None
+        while the rollups have not been built yet and the totals are empty)
+    """
+    refreshed_at = high_water()
+    schedule_rollup_refresh(refreshed_at)
+
+    rollups = ChatUsageRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    if since is not None:
+        rollups = rollups.filter(bucket__gte=since)
+
+    totals = rollups.aggregate(**{field: Coalesce(Sum(field), 0) for field in ROLLUP_FIELDS})
+    totals['avg_response_time_ms'] = (
+        totals['response_time_ms_sum'] / totals['response_time_count'] if totals['response_time_count'] else 0
+    )
+    totals['refreshed_at'] = refreshed_at
+    return totals
+
+
+def usage_by_day(user=None, since: Optional[datetime] = None) -> list:
+    """Daily totals from the rollups, oldest day first."""
+    schedule_rollup_refresh(high_water())
+    rollups = ChatUsageRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    if since is not None:
+        rollups = rollups.filter(bucket__gte=since)
+
+    days = rollups.annotate(date=TruncDate('bucket')).values('date').annotate(
+        **{field: Sum(field) for field in ROLLUP_FIELDS}
+    ).order_by('date')
+    return [
+        {
+            'date': day['date'],
+            'messages': day['message_count'],
+            'tokens_used': day['tokens_used'],
+            'avg_response_time_ms': round(
+                day['response_time_ms_sum'] / day['response_time_count'], 2
+            ) if day['response_time_count'] else 0
+        }
+        for day in days
+    ]
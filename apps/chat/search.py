@@ -0,0 +1,253 @@
+import base64
+import binascii
+import html
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
+
+from apps.core import json as fast_json
+from .models import ChatMessage, Conversation
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEDULED_KEY = 'chat:search:index-scheduled'
+
+# Streaming messages are indexed once their content is final
+UNINDEXED_STATUSES = (ChatMessage.MessageStatus.PENDING, ChatMessage.MessageStatus.PROCESSING)
+
+# Highlight markers that never occur in message text, replaced by <mark>
+# tags after the snippet has been HTML-escaped
+_START_SEL = '\x02'
+_STOP_SEL = '\x03'
+
+
+def full_text_supported() -> bool:
+    """Full-text search needs PostgreSQL; other databases fall back to substring matching."""
+    return connection.vendor == 'postgresql'
+
+
+def schedule_search_indexing():
+    """Queue an indexing run, unless one is already queued.
+
+    Writes only mark rows as stale (``search_vector`` NULL), so chat
+    requests never compute vectors themselves. A burst of writes queues a
+    single run, ``CHAT_SEARCH_INDEX_DELAY`` seconds later.
+    """
+    if not full_text_supported():
+        return
+
+    from .tasks import index_search_task
+
+    delay = settings.CHAT_SEARCH_INDEX_DELAY
+    try:
+        # Expires on its own if the task is lost; the periodic run
+        # (CELERY_BEAT_SCHEDULE) catches writes it hides from other processes
+        if not cache.add(INDEX_SCHEDULED_KEY, True, timeout=delay + settings.CHAT_SEARCH_INDEX_INTERVAL):
+            return
+        # Runs on commit of every message write: fail fast instead of
+        # retrying the broker connection
+        index_search_task.apply_async(countdown=delay, retry=False)
+    except Exception as e:
+        # The key stays set, so writes until it expires do not try again;
+        # the periodic run indexes what they changed
+        logger.warning(f"Failed to schedule search indexing: {str(e)}")
+
+
+def index_pending(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, Any]:
+    """Compute search vectors for rows that are new or changed since they were indexed.
+
+    Each batch is one set-based UPDATE; the vector is computed by the
+    database from the row's current text, so a concurrent edit is never
+    indexed with stale content.
+
+    Returns:
+        Dict with the number of ``conversations`` and ``messages`` indexed
+        and ``done``, False when ``max_batches`` stopped the run early
+    """
+    result = {'conversations': 0, 'messages': 0, 'done': True}
+    if not full_text_supported():
+        return result
+
+    config = settings.CHAT_SEARCH_CONFIG
+    batch_size = batch_size or settings.CHAT_SEARCH_INDEX_BATCH
+    jobs = (
+        ('conversations', Conversation, Q(), SearchVector('title', config=config)),
+        ('messages', ChatMessage, ~Q(status__in=UNINDEXED_STATUSES), SearchVector('content', config=config)),
+    )
+
+    for name, model, condition, vector in jobs:
+        pending = model.objects.filter(condition, search_vector__isnull=True)
+        batches = 0
+        while True:
+            if max_batches is not None and batches >= max_batches:
+                result['done'] = False
+                break
+            ids = list(pending.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            result[name] += model.objects.filter(pk__in=ids, search_vector__isnull=True).update(search_vector=vector)
+            batches += 1
+
+    return result
+
+
+def encode_cursor(rank: float, message_id) -> str:
+    raw = fast_json.dumps([rank, str(message_id)])
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    """Return the (rank, message id) position of a cursor; ValueError if it is invalid."""
+    try:
+        rank, message_id = fast_json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(rank), str(message_id)
+    except (binascii.Error, TypeError, UnicodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def search_conversations(user, text: str, cursor: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Search a user's conversation titles and message contents.
+
+    Messages are ranked by relevance and paginated by keyset on
+    ``(rank, id)``, so later pages cost the same as the first. Conversation
+    title matches are only returned with the first page.
+
+    Args:
+        user: User whose conversations are searched
+        text: Search text (web search syntax: quoted phrases, ``or``, ``-word``)
+        cursor: ``next`` value of the previous page
+        limit: Page size
+
+    Returns:
+        Dict with ``conversations``, ``results`` and the ``next`` cursor
+        (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    limit = limit or settings.CHAT_SEARCH_PAGE_SIZE
+    after = decode_cursor(cursor) if cursor else None
+
+    if full_text_supported():
+        query = SearchQuery(text, search_type='websearch', config=settings.CHAT_SEARCH_CONFIG)
+        # ts_rank is float4; as float8 the rank survives the cursor's JSON
+        # round trip exactly, so the keyset comparison matches the boundary row
+        messages = ChatMessage.objects.filter(
+            user=user, search_vector=query, conversation__deleted_at__isnull=True
+        ).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+        conversations = Conversation.objects.filter(user=user, search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        )
+    else:
+        query = None
+        messages = ChatMessage.objects.filter(
+            user=user, content__icontains=text, conversation__deleted_at__isnull=True
+        ).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+        conversations = Conversation.objects.filter(user=user, title__icontains=text).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+
+    if after:
+        rank, message_id = after
+        messages = messages.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=message_id))
+
+    page = list(messages.order_by('-rank', '-id').values('id', 'rank')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]['rank'], page[limit - 1]['id']) if len(page) > limit else None
+    page = page[:limit]
+
+    return {
+        'conversations': [] if after else _conversation_hits(conversations, query, text),
+        'results': _message_hits(page, query, text),
+        'next': next_cursor
+    }
+
+
+def _conversation_hits(conversations, query, text: str) -> List[Dict[str, Any]]:
+    conversations = conversations.order_by('-rank', '-updated_at')[:settings.CHAT_SEARCH_CONVERSATION_LIMIT]
+    if query is not None:
+        conversations = conversations.annotate(
+            snippet=SearchHeadline(
+                'title', query, config=settings.CHAT_SEARCH_CONFIG,
+                start_sel=_START_SEL, stop_sel=_STOP_SEL, highlight_all=True
+            )
+        )
+    return [
+        {
+            'conversation_id': str(conversation.id),
+            'title': conversation.title,
+            'snippet': _highlight(conversation.snippet if query is not None else _plain_snippet(conversation.title, text)),
+            'rank': conversation.rank,
+            'updated_at': conversation.updated_at,
+        }
+        for conversation in conversations
+    ]
+
+
+def _message_hits(page: List[Dict[str, Any]], query, text: str) -> List[Dict[str, Any]]:
+    """Load the page's messages and their snippets.
+
+    Headlines are expensive, so they are only computed for the rows of the
+    page, after ranking.
+    """
+    if not page:
+        return []
+
+    messages = ChatMessage.objects.filter(id__in=[row['id'] for row in page]).select_related('conversation')
+    if query is not None:
+        messages = messages.annotate(
+            snippet=SearchHeadline(
+                'content', query, config=settings.CHAT_SEARCH_CONFIG,
+                start_sel=_START_SEL, stop_sel=_STOP_SEL,
+                max_words=settings.CHAT_SEARCH_SNIPPET_WORDS,
+                min_words=settings.CHAT_SEARCH_SNIPPET_WORDS // 2,
+                max_fragments=2
+            )
+        )
+    by_id = {message.id: message for message in messages}
+
+    results = []
+    for row in page:
+        message = by_id.get(row['id'])
+        if message is None:
+            # Deleted between the two queries
+            continue
+        snippet = message.snippet if query is not None else _plain_snippet(message.content, text)
+        results.append({
+            'message_id': str(message.id),
+            'conversation_id': str(message.conversation_id),
+            'conversation_title': message.conversation.title,
+            'message_type': message.message_type,
+            'snippet': _highlight(snippet),
+            'rank': row['rank'],
+            'created_at': message.created_at,
+        })
+    return results
+
+
+def _plain_snippet(content: str, text: str) -> str:
+    """Snippet around the first substring match, for databases without full-text search."""
+    words = settings.CHAT_SEARCH_SNIPPET_WORDS
+    start = content.lower().find(text.lower())
+    if start < 0:
+        return ' '.join(content.split()[:words])
+    end = start + len(text)
+    before = content[:start].split()[-(words // 2):]
+    after = content[end:].split()[:words // 2]
+    prefix = ' '.join(before) + (' ' if before and content[start - 1].isspace() else '')
+    suffix = (' ' if after and content[end:end + 1].isspace() else '') + ' '.join(after)
+    return f"{prefix}{_START_SEL}{content[start:end]}{_STOP_SEL}{suffix}"
+
+
+def _highlight(snippet: str) -> str:
+    """Escape a snippet for HTML and turn the match markers into <mark> tags."""
+    return html.escape(snippet or '').replace(_START_SEL, '<mark>').replace(_STOP_SEL, '</mark>')
@@ -1,4 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
+from apps.core.fields import CounterField
 from .models import Conversation, ChatMessage, ChatTemplate, Folder
 
 
@@ -13,13 +15,13 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             'id', 'conversation', 'user', 'user_username',
             'message_type', 'content', 'status', 'sources',
             'tokens_used', 'model_used', 'response_time_ms',
-            'error_message', 'is_helpful', 'feedback_comment',
-            'created_at', 'updated_at'
+            'time_to_first_token_ms', 'cache_status', 'error_message', 'is_helpful',
+            'feedback_comment', 'created_at', 'updated_at'
         )
         read_only_fields = (
             'id', 'user', 'user_username', 'tokens_used',
-            'model_used', 'response_time_ms', 'error_message',
-            'created_at', 'updated_at'
+            'model_used', 'response_time_ms', 'time_to_first_token_ms',
+            'cache_status', 'error_message', 'created_at', 'updated_at'
         )
     
     def validate_content(self, value):
@@ -99,25 +101,36 @@ class ConversationSerializer(serializers.ModelSerializer):
         )
     
     def get_last_message(self, obj):
-        """Get the last message in the conversation."""
-        last_message = obj.messages.last()
-        if last_message:
+        """Get the last message in the conversation (denormalized snapshot)."""
+        if obj.last_message_id:
             return {
-                'id': last_message.id,
-                'content': last_message.content[:100] + ('...' if len(last_message.content) > 100 else ''),
-                'message_type': last_message.message_type,
-                'created_at': last_message.created_at
+                'id': obj.last_message_id,
+                'content': obj.last_message_preview,
+                'message_type': obj.last_message_type,
+                'created_at': obj.last_message_at
             }
         return None
 
 
 class ConversationDetailSerializer(ConversationSerializer):
-    """Detailed serializer for conversations with messages."""
+    """Detailed serializer for conversations with their latest messages.
+    
+    Only one window of messages is embedded, newest first; the view passes
+    it in the context as ``messages`` together with ``messages_next``, the
+    history URL that loads older ones (None when there are none).
+    """
     
-    messages = ChatMessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
+    messages_next = serializers.SerializerMethodField()
     
     class Meta(ConversationSerializer.Meta):
-        fields = ConversationSerializer.Meta.fields + ('messages',)
+        fields = ConversationSerializer.Meta.fields + ('messages', 'messages_next')
+    
+    def get_messages(self, obj):
+        return ChatMessageSerializer(self.context.get('messages', []), many=True).data
+    
+    def get_messages_next(self, obj):
+        return self.context.get('messages_next')
 
 
 class ChatRequestSerializer(serializers.Serializer):
@@ -146,6 +159,12 @@ class ChatRequestSerializer(serializers.Serializer):
         help_text="Folder ID to organize the conversation (optional)"
     )
     
+    background = serializers.BooleanField(
+        required=False,
+        default=lambda: settings.CHAT_BACKGROUND_DEFAULT,
+        help_text="Queue the AI response and return 202 immediately (optional)"
+    )
+    
     def validate_message(self, value):
         """Validate message content."""
         if not value or not value.strip():
@@ -207,6 +226,63 @@ class MessageFeedbackSerializer(serializers.Serializer):
     )
 
 
+class FeedbackItemSerializer(serializers.Serializer):
+    """Serializer for one rating of a feedback batch."""
+    
+    message_id = serializers.UUIDField()
+    is_helpful = serializers.BooleanField()
+    comment = serializers.CharField(
+        max_length=1000,
+        required=False,
+        allow_blank=True
+    )
+
+
+class FeedbackBatchSerializer(serializers.Serializer):
+    """Serializer for batch feedback ingestion."""
+    
+    items = FeedbackItemSerializer(many=True, allow_empty=False)
+    
+    def validate_items(self, value):
+        """Limit the batch size."""
+        if len(value) > settings.FEEDBACK_BATCH_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"At most {settings.FEEDBACK_BATCH_MAX_ITEMS} feedback items can be sent at once."
+            )
+        return value
+
+
+class BulkConversationActionSerializer(serializers.Serializer):
+    """Serializer for bulk conversation actions."""
+    
+    ACTIONS = ('archive', 'unarchive', 'pin', 'unpin', 'move', 'delete')
+    
+    conversation_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False
+    )
+    action = serializers.ChoiceField(choices=ACTIONS)
+    folder_id = serializers.UUIDField(required=False, allow_null=True)
+    
+    def validate_conversation_ids(self, value):
+        """Limit the number of IDs and drop duplicates, keeping their order."""
+        if len(value) > settings.CHAT_BULK_MAX_IDS:
+            raise serializers.ValidationError(
+                f"At most {settings.CHAT_BULK_MAX_IDS} conversations can be changed at once."
+            )
+        return list(dict.fromkeys(value))
+
+
+class ConversationExportSerializer(serializers.Serializer):
+    """Serializer for streaming export query parameters."""
+    
+    output = serializers.ChoiceField(choices=('ndjson', 'zip'), default='ndjson')
+    conversation_id = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False
+    )
+
+
 class ChatTemplateSerializer(serializers.ModelSerializer):
     """Serializer for chat templates."""
     
@@ -214,6 +290,7 @@ class ChatTemplateSerializer(serializers.ModelSerializer):
         source='created_by.username',
         read_only=True
     )
+    usage_count = CounterField()
     
     class Meta:
         model = ChatTemplate
@@ -1,30 +1,64 @@
 import time
 import logging
+import threading
 import requests
+import httpx
 import json
-from typing import Dict, Any, Optional, Iterator
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
-from markdownify import markdownify as md
+from apps.core import outbox
+from apps.core.http import CircuitOpenError, get_upstream_client, get_async_upstream_client
+from apps.core.counters import counters
+from apps.core.singleflight import SingleFlight
+from apps.authentication.models import UserSession
+from apps.authentication.presence import presence
+from .cache import AnswerCache, answer_cache
+from .context import context_builder
+from . import export, feedback_cache
+from .events import StreamEventLog
+from .rollups import usage_totals
+from .search import schedule_search_indexing
+from .sse import TICK, awith_ticks, with_ticks
 from .models import Conversation, ChatMessage, ChatTemplate, Folder
+from .purge import hide_conversations, purge_conversations
+from .streaming import RAGStreamDecoder, StreamWriteBuffer, html_to_markdown
 
 logger = logging.getLogger(__name__)
 
+# Identical RAG questions in flight at the same time share one upstream call
+rag_flights = SingleFlight()
+
 
 class AIService:
     """Service for AI chat interactions (mock implementation)."""
     
+    RAG_WEBHOOK_URL = "https://n8n.omadligrouphq.com/webhook/b1d1a7e1-d8e2-4fc8-ba74-486e5a07e757"
+    STREAM_HEADERS = {
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream, application/x-ndjson, application/json"
+    }
+    
     def __init__(self):
         self.model_name = "mock-ai-model-v1"
         self.max_tokens = 4000
         self.temperature = 0.7
     
-    def generate_response(self, message: str, conversation_history: list = None) -> Dict[str, Any]:
+    def generate_response(
+        self,
+        message: str,
+        conversation_history: list = None,
+        template_id: Optional[int] = None
+    ) -> Dict[str, Any]:
         """Generate AI response to user message using external RAG API.
         
         Args:
             message: User's input message
             conversation_history: List of previous messages for context
+            template_id: ID of the ChatTemplate applied to the message, if any
             
         Returns:
             Dict containing response, tokens used, metadata, and sources
@@ -32,8 +66,8 @@ class AIService:
         start_time = time.time()
         
         try:
-            # Call external RAG API with conversation history
-            rag_result = self._call_rag_api(message, conversation_history)
+            # Serve from the answer cache or call external RAG API
+            rag_result = self._cached_rag_call(message, conversation_history, template_id)
             
             # Calculate response time
             response_time_ms = int((time.time() - start_time) * 1000)
@@ -47,6 +81,7 @@ class AIService:
                 'tokens_used': tokens_used,
                 'response_time_ms': response_time_ms,
                 'model_used': 'rag-instant-ai',
+                'cache_status': rag_result['cache_status'],
                 'success': True,
                 'error': None
             }
@@ -64,68 +99,262 @@ class AIService:
                 'error': str(e)
             }
     
-    def generate_response_stream(self, message: str, conversation_history: list = None) -> Iterator[Dict[str, Any]]:
+    def generate_response_stream(
+        self,
+        message: str,
+        conversation_history: list = None,
+        template_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
         """Generate streaming AI response to user message using external RAG API.
         
         Args:
             message: User's input message
             conversation_history: List of previous messages for context
+            template_id: ID of the ChatTemplate applied to the message, if any
             
         Yields:
             Dict containing streaming response data
         """
-        start_time = time.time()
+        timing = {'start': time.time(), 'first_token': None}
         
-        print("API ================== ")
-
         try:
-            # Call external RAG API with conversation history (streaming)
-            for chunk in self._call_rag_api_stream(message, conversation_history):
-                # Calculate response time for each chunk
-                response_time_ms = int((time.time() - start_time) * 1000)
-                
-                # Add metadata to each chunk
-                chunk.update({
-                    'response_time_ms': response_time_ms,
-                    'model_used': 'rag-instant-ai',
-                    'success': chunk.get('type') != 'error',
-                    'error': chunk.get('error')
-                })
-                
-                # Calculate tokens for complete responses
-                if chunk.get('type') == 'success':
-                    chunk['tokens_used'] = self._calculate_tokens(message, chunk.get('accumulated_response', ''))
-                
-                yield chunk
+            cached = self._lookup_answer(message, conversation_history, template_id)
+            if cached['fresh']:
+                for chunk in self._replay_cached_answer(cached['entry'], AnswerCache.HIT):
+                    yield self._annotate_stream_chunk(chunk, message, timing)
+                return
+            
+            # Call external RAG API with conversation history (streaming),
+            # joining an identical call already in flight if there is one
+            events = self._single_flight_stream(
+                message, conversation_history, template_id,
+                lambda: self._rag_stream_producer(message, conversation_history, cached)
+            )
+            state = {'streamed': False}
+            for chunk in events:
+                for resolved in self._resolve_cached_stream_chunk(dict(chunk), cached, state):
+                    yield self._annotate_stream_chunk(resolved, message, timing)
                 
         except Exception as e:
             logger.error(f"AI service streaming error: {str(e)}")
-            response_time_ms = int((time.time() - start_time) * 1000)
-            
-            yield {
-                'type': 'error',
-                'response': "I apologize, but I'm experiencing technical difficulties. Please try again later.",
-                'sources': [],
-                'tokens_used': 0,
-                'response_time_ms': response_time_ms,
-                'model_used': self.model_name,
-                'success': False,
-                'error': str(e)
-            }
+            yield self._stream_failure_chunk(e, timing)
+    
+    async def agenerate_response_stream(
+        self,
+        message: str,
+        conversation_history: list = None,
+        template_id: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of ``generate_response_stream`` for the ASGI path.
+        
+        Uses a non-blocking HTTP client so a single worker can hold many
+        open upstream streams at once.
+        """
+        timing = {'start': time.time(), 'first_token': None}
+        
+        try:
+            cached = await sync_to_async(self._lookup_answer)(message, conversation_history, template_id)
+            if cached['fresh']:
+                for chunk in self._replay_cached_answer(cached['entry'], AnswerCache.HIT):
+                    yield self._annotate_stream_chunk(chunk, message, timing)
+                return
+            
+            events = self._single_flight_astream(
+                message, conversation_history, template_id,
+                lambda: self._arag_stream_producer(message, conversation_history, cached)
+            )
+            state = {'streamed': False}
+            async for chunk in events:
+                for resolved in self._resolve_cached_stream_chunk(dict(chunk), cached, state):
+                    yield self._annotate_stream_chunk(resolved, message, timing)
+                
+        except Exception as e:
+            logger.error(f"AI service async streaming error: {str(e)}")
+            yield self._stream_failure_chunk(e, timing)
+    
+    def _cached_rag_call(
+        self,
+        message: str,
+        conversation_history: list = None,
+        template_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Call the RAG API through the answer cache.
+        
+        Fresh entries skip the upstream call. When the call fails (including
+        an open circuit) a stale entry is served instead of the error text.
+        """
+        cached = self._lookup_answer(message, conversation_history, template_id)
+        if cached['fresh']:
+            return {**cached['entry'], 'cache_status': AnswerCache.HIT}
+        
+        def fetch():
+            result = self._call_rag_api(message, conversation_history)
+            if not result.get('error'):
+                answer_cache.store(
+                    cached['key'], result['response'], result['sources']
+                )
+            return result
+        
+        rag_result = self._single_flight_call(message, conversation_history, template_id, fetch)
+        if rag_result.get('error') and cached['entry']:
+            logger.info(f"Serving stale cached answer after RAG API error: {rag_result['error']}")
+            return {**cached['entry'], 'cache_status': AnswerCache.STALE}
+        
+        return {**rag_result, 'cache_status': cached['status']}
+    
+    def _lookup_answer(self, message: str, conversation_history: list, template_id: Optional[int]) -> Dict[str, Any]:
+        """Look up the answer cache unless the question is a follow-up.
+        
+        Answers to follow-ups depend on the conversation, not just the
+        question text, so they are neither cached nor coalesced.
+        """
+        if conversation_history:
+            return answer_cache.bypass()
+        return answer_cache.lookup(message, template_id)
+    
+    def _single_flight_call(self, message: str, conversation_history: list, template_id: Optional[int], fetch) -> Dict[str, Any]:
+        """Run ``fetch`` once for all concurrent callers asking the same question."""
+        if conversation_history or not settings.RAG_SINGLE_FLIGHT_ENABLED:
+            return fetch()
+        
+        result, shared = rag_flights.do(('call', AnswerCache.fingerprint(message, template_id)), fetch)
+        if shared:
+            logger.info("Coalesced RAG request with an identical call in flight")
+        return dict(result)
+    
+    def _single_flight_stream(self, message: str, conversation_history: list, template_id: Optional[int], producer) -> Iterator[Dict[str, Any]]:
+        """Subscribe to the upstream stream for this question, starting it if needed."""
+        if conversation_history or not settings.RAG_SINGLE_FLIGHT_ENABLED:
+            return producer()
+        
+        events, shared = rag_flights.stream(('stream', AnswerCache.fingerprint(message, template_id)), producer)
+        if shared:
+            logger.info("Coalesced RAG stream with an identical stream in flight")
+        return events
+    
+    def _single_flight_astream(self, message: str, conversation_history: list, template_id: Optional[int], producer) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of ``_single_flight_stream``."""
+        if conversation_history or not settings.RAG_SINGLE_FLIGHT_ENABLED:
+            return producer()
+        
+        events, shared = rag_flights.astream(('stream', AnswerCache.fingerprint(message, template_id)), producer)
+        if shared:
+            logger.info("Coalesced RAG stream with an identical stream in flight")
+        return events
+    
+    def _rag_stream_producer(self, message: str, conversation_history: list, cached: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Upstream stream shared by all subscribers; stores the completed answer once."""
+        for chunk in self._call_rag_api_stream(message, conversation_history):
+            if chunk.get('type') == 'complete':
+                self._store_cached_answer(chunk, cached)
+            yield chunk
+    
+    async def _arag_stream_producer(self, message: str, conversation_history: list, cached: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of ``_rag_stream_producer``."""
+        async for chunk in self._acall_rag_api_stream(message, conversation_history):
+            if chunk.get('type') == 'complete':
+                await sync_to_async(self._store_cached_answer)(chunk, cached)
+            yield chunk
+    
+    def _resolve_cached_stream_chunk(
+        self,
+        chunk: Dict[str, Any],
+        cached: Dict[str, Any],
+        state: Dict[str, Any]
+    ) -> list:
+        """Apply the answer cache to one upstream stream chunk.
+        
+        Completed answers are tagged as a miss (or bypass). An error before
+        any delta was sent is replaced by the stale cached answer, if any.
+        """
+        chunk_type = chunk.get('type')
+        
+        if chunk_type == 'delta':
+            state['streamed'] = True
+        elif chunk_type == 'complete':
+            chunk['cache_status'] = cached['status']
+        elif chunk_type == 'error':
+            if cached['entry'] and not state['streamed']:
+                logger.info(f"Serving stale cached answer after RAG stream error: {chunk.get('error')}")
+                return self._replay_cached_answer(cached['entry'], AnswerCache.STALE)
+            chunk['cache_status'] = cached['status']
+        
+        return [chunk]
+    
+    def _store_cached_answer(self, chunk: Dict[str, Any], cached: Dict[str, Any]):
+        answer_cache.store(
+            cached['key'], chunk.get('response', ''), chunk.get('sources', [])
+        )
+    
+    def _replay_cached_answer(self, entry: Dict[str, Any], cache_status: str) -> list:
+        """Turn a cached answer into the chunk sequence of a live stream."""
+        chunks = [{
+            'type': 'delta',
+            'content': entry['response']
+        }]
+        if entry['sources']:
+            chunks.append({
+                'type': 'source_document',
+                'source': entry['sources']
+            })
+        chunks.append({
+            'type': 'complete',
+            'response': entry['response'],
+            'sources': entry['sources'],
+            'cache_status': cache_status
+        })
+        return chunks
+    
+    def _annotate_stream_chunk(self, chunk: Dict[str, Any], message: str, timing: Dict[str, Any]) -> Dict[str, Any]:
+        """Add latency, model and token metadata to a streamed chunk."""
+        now = time.time()
+        if timing['first_token'] is None and chunk.get('type') == 'delta':
+            timing['first_token'] = now
+        
+        # Add metadata to each chunk
+        chunk.update({
+            'response_time_ms': int((now - timing['start']) * 1000),
+            'model_used': 'rag-instant-ai',
+            'success': chunk.get('type') != 'error',
+            'error': chunk.get('error')
+        })
+        
+        # Time to first token vs. total latency for complete responses
+        if chunk.get('type') in ('complete', 'error'):
+            chunk['time_to_first_token_ms'] = (
+                int((timing['first_token'] - timing['start']) * 1000) if timing['first_token'] else None
+            )
+        
+        # Calculate tokens for complete responses
+        if chunk.get('type') == 'complete':
+            chunk['tokens_used'] = self._calculate_tokens(message, chunk.get('response', ''))
+        
+        return chunk
+    
+    def _stream_failure_chunk(self, error: Exception, timing: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'type': 'error',
+            'response': "I apologize, but I'm experiencing technical difficulties. Please try again later.",
+            'sources': [],
+            'tokens_used': 0,
+            'response_time_ms': int((time.time() - timing['start']) * 1000),
+            'time_to_first_token_ms': None,
+            'model_used': self.model_name,
+            'success': False,
+            'error': str(error)
+        }
     
     def _call_rag_api(self, message: str, conversation_history: list = None) -> Dict[str, Any]:
         """Call external RAG API to get AI response and sources (non-streaming)."""
         try:
-            url = "https://n8n.omadligrouphq.com/webhook/b1d1a7e1-d8e2-4fc8-ba74-486e5a07e757"
+            url = self.RAG_WEBHOOK_URL
             headers = {
                 "Content-Type": "application/json"
             }
             
-            # Send only the current user message to webhook
-            data = {"message": message}
-
+            data = self._build_rag_payload(message, conversation_history)
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = get_upstream_client(url).post(url, json=data, headers=headers)
             response.raise_for_status()
             
             result = response.json()
@@ -151,11 +380,12 @@ class AIService:
                 logger.warning(f"No response found in RAG API result: {result}")
                 return {
                     'response': "I apologize, but I couldn't generate a proper response. Please try again.",
-                    'sources': []
+                    'sources': [],
+                    'error': 'No response found in RAG API result'
                 }
             
             # Convert HTML to Markdown for better frontend rendering
-            markdown_response = md(ai_response, heading_style="ATX", bullets="-")
+            markdown_response = html_to_markdown(ai_response)
             
             return {
                 'response': markdown_response,
@@ -168,7 +398,8 @@ class AIService:
             
             return {
                 'response': error_response,
-                'sources': []
+                'sources': [],
+                'error': str(e)
             }
         except Exception as e:
             logger.error(f"RAG API processing error: {str(e)}")
@@ -176,106 +407,111 @@ class AIService:
             
             return {
                 'response': error_response,
-                'sources': []
+                'sources': [],
+                'error': str(e)
             }
     
     def _call_rag_api_stream(self, message: str, conversation_history: list = None) -> Iterator[Dict[str, Any]]:
-        """Call external RAG API to get streaming AI response and sources."""
+        """Call external RAG API to get streaming AI response and sources.
+        
+        The upstream body is read incrementally. SSE (``data: {...}``) and
+        chunked NDJSON bodies are forwarded as ``delta`` events as soon as each
+        line arrives; a plain JSON body (webhook without streaming enabled)
+        falls back to the buffered word-by-word replay.
+        """
+        response = None
         try:
-            url = "https://n8n.omadligrouphq.com/webhook/b1d1a7e1-d8e2-4fc8-ba74-486e5a07e757"
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "text/event-stream"
-            }
-            
-            # Send only the current user message to webhook
-            data = {"message": message}
+            url = self.RAG_WEBHOOK_URL
+            data = self._build_rag_payload(message, conversation_history)
             
-            response = requests.post(url, json=data, headers=headers, timeout=60)
+            response = get_upstream_client(url).post(
+                url, json=data, headers=self.STREAM_HEADERS, stream=True
+            )
             response.raise_for_status()
             
-            result = response.json()
-            
-            # Handle new webhook response format - array of objects
-            if isinstance(result, list) and len(result) > 0:
-                response_item = result[0]  # Get first item from array
-                
-                # Extract content from the response
-                if 'content' in response_item:
-                    content = response_item['content']
-                    
-                    # Stream the content character by character or word by word
-                    words = content.split(' ')
-                    accumulated_text = ""
-                    
-                    for word in words:
-                        accumulated_text += word + " "
-                        yield {
-                            'type': 'delta',
-                            'content': word + " "
-                        }
-                    
-                    # Extract document names from Document Names field
-                    sources = []
-                    if 'Document Names' in response_item:
-                        document_names = response_item['Document Names']
-                        if isinstance(document_names, list):
-                            sources = document_names
-                    
-                    # Yield sources
-                    if sources:
-                        yield {
-                            'type': 'source_document',
-                            'source': sources
-                        }
-                    
-                    # Convert HTML to Markdown for better frontend rendering
-                    markdown_response = md(content, heading_style="ATX", bullets="-")
-                    
-                    # Final complete response
-                    yield {
-                        'type': 'complete',
-                        'response': markdown_response,
-                        'sources': sources,
-                        'accumulated_response': content
-                    }
-                else:
-                    # No content found
-                    yield {
-                        'type': 'error',
-                        'error': 'No content found in webhook response'
-                    }
-            else:
-                # Invalid response format
-                yield {
-                    'type': 'error',
-                    'error': 'Invalid webhook response format'
-                }
+            decoder = RAGStreamDecoder()
+            # chunk_size=None hands back each transfer chunk as soon as it is read
+            for raw_line in response.iter_lines(chunk_size=None):
+                line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+                yield from decoder.feed_line(line)
+                if decoder.finished:
+                    return
+            yield from decoder.close()
 
         except requests.exceptions.RequestException as e:
             logger.error(f"RAG API streaming request failed: {str(e)}")
-            yield {
-                'type': 'error',
-                'response': "I apologize, but I'm having trouble connecting to the knowledge base. Please try again later.",
-                'sources': [],
-                'error': str(e)
-            }
+            yield self._stream_connection_error_chunk(e)
         except Exception as e:
             logger.error(f"RAG API streaming processing error: {str(e)}")
             logger.error(f"Exception type: {type(e).__name__}")
-            yield {
-                'type': 'error',
-                'response': "I apologize, but something went wrong while processing your request. Please try again.",
-                'sources': [],
-                'error': str(e)
-            }
+            yield self._stream_processing_error_chunk(e)
+        finally:
+            if response is not None:
+                response.close()
+    
+    async def _acall_rag_api_stream(self, message: str, conversation_history: list = None) -> AsyncIterator[Dict[str, Any]]:
+        """Non-blocking variant of ``_call_rag_api_stream`` built on httpx."""
+        try:
+            url = self.RAG_WEBHOOK_URL
+            data = self._build_rag_payload(message, conversation_history)
+            
+            client = get_async_upstream_client(url)
+            async with client.stream('POST', url, json=data, headers=self.STREAM_HEADERS) as response:
+                response.raise_for_status()
+                
+                decoder = RAGStreamDecoder()
+                async for line in response.aiter_lines():
+                    for chunk in await self._decode_off_loop(decoder.feed_line, line, size=len(line)):
+                        yield chunk
+                    if decoder.finished:
+                        return
+                for chunk in await self._decode_off_loop(decoder.close, size=decoder.pending_bytes):
+                    yield chunk
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logger.error(f"RAG API async streaming request failed: {str(e)}")
+            yield self._stream_connection_error_chunk(e)
+        except Exception as e:
+            logger.error(f"RAG API async streaming processing error: {str(e)}")
+            logger.error(f"Exception type: {type(e).__name__}")
+            yield self._stream_processing_error_chunk(e)
+    
+    async def _decode_off_loop(self, step, *args, size: int = 0) -> list:
+        """Run a decoder step, moving large HTML-to-Markdown conversions off the event loop."""
+        if size < settings.CHAT_MARKDOWN_OFFLOAD_BYTES:
+            return step(*args)
+        return await sync_to_async(step, thread_sensitive=False)(*args)
+    
+    def _build_rag_payload(self, message: str, conversation_history: list = None) -> Dict[str, Any]:
+        # Current message plus the budgeted history, most recent first
+        return {
+            "message": message,
+            "conversation": self._format_conversation_for_api(message, conversation_history)
+        }
+    
+    def _stream_connection_error_chunk(self, error: Exception) -> Dict[str, Any]:
+        return {
+            'type': 'error',
+            'response': "I apologize, but I'm having trouble connecting to the knowledge base. Please try again later.",
+            'sources': [],
+            'error': str(error)
+        }
+    
+    def _stream_processing_error_chunk(self, error: Exception) -> Dict[str, Any]:
+        return {
+            'type': 'error',
+            'response': "I apologize, but something went wrong while processing your request. Please try again.",
+            'sources': [],
+            'error': str(error)
+        }
     
     def _format_conversation_for_api(self, current_message: str, conversation_history: list = None) -> list:
         """Format conversation history for the RAG API according to the required structure.
         
         Args:
             current_message: The current user message
-            conversation_history: List of previous messages with 'role' and 'content' keys
+            conversation_history: List of prior messages (oldest first, without the
+                current message) with 'role' and 'content' keys
             
         Returns:
             List formatted for the API with message_type and content
@@ -296,11 +532,8 @@ class AIService:
             "content": current_message
         })
         
-        # Add previous messages in reverse order (most recent first, excluding current)
-        # Skip the last message if it's the current user message
-        history_to_process = conversation_history[:-1] if conversation_history else []
-        
-        for message in reversed(history_to_process):
+        # Add previous messages in reverse order (most recent first)
+        for message in reversed(conversation_history):
             message_type = "user" if message.get('role') == 'user' else "assistant"
             formatted_messages.append({
                 "message_type": message_type,
@@ -347,6 +580,14 @@ class AIService:
 class ChatService:
     """Service for managing chat conversations and messages."""
     
+    # Field updates of the bulk actions other than 'move' and 'delete'
+    BULK_ACTIONS = {
+        'archive': {'is_archived': True},
+        'unarchive': {'is_archived': False},
+        'pin': {'is_pinned': True},
+        'unpin': {'is_pinned': False},
+    }
+    
     def __init__(self):
         self.ai_service = AIService()
     
@@ -397,6 +638,9 @@ class ChatService:
                 message_content = f"{template.prompt}\n\n{message_content}"
                 template.increment_usage()
             
+            # Get prior turns for context (cached rolling window)
+            conversation_history = context_builder.history(conversation)
+            
             # Create user message
             user_message = ChatMessage.objects.create(
                 conversation=conversation,
@@ -406,13 +650,11 @@ class ChatService:
                 status=ChatMessage.MessageStatus.COMPLETED
             )
             
-            # Get conversation history for context
-            conversation_history = self._get_conversation_history(conversation)
-            
             # Generate AI response
             ai_result = self.ai_service.generate_response(
                 message_content,
-                conversation_history
+                conversation_history,
+                template_id=template_id
             )
             
             # Create assistant message
@@ -426,11 +668,12 @@ class ChatService:
                 tokens_used=ai_result['tokens_used'],
                 model_used=ai_result['model_used'],
                 response_time_ms=ai_result['response_time_ms'],
+                cache_status=ai_result.get('cache_status', ''),
                 error_message=ai_result['error'] or ''
             )
             
-            # Update conversation stats
-            conversation.update_stats()
+            # Conversation stats are kept current by ChatMessage.save()
+            context_builder.record_turn(conversation, user_message, assistant_message)
             
             # Update user session activity
             self._update_user_activity(user)
@@ -457,7 +700,8 @@ class ChatService:
         message_content: str,
         conversation_id: Optional[str] = None,
         template_id: Optional[int] = None,
-        folder_id: Optional[str] = None
+        folder_id: Optional[str] = None,
+        idle_tick: Optional[float] = None
     ) -> Iterator[Dict[str, Any]]:
         """Process a chat message and generate streaming AI response.
         
@@ -466,172 +710,566 @@ class ChatService:
             message_content: User's message content
             conversation_id: Optional existing conversation ID
             template_id: Optional template ID to use
+            idle_tick: If set, also yield ``sse.TICK`` whenever the upstream
+                was silent for this many seconds (for SSEEncoder)
             
         Yields:
             Dict containing streaming response data
         """
         try:
-            # Get or create conversation
-            if conversation_id:
-                conversation = Conversation.objects.get(
-                    id=conversation_id,
-                    user=user
-                )
-            else:
-                # Create new conversation with optional folder assignment
-                conversation_data = {'user': user}
-                if folder_id:
+            turn = self._start_stream_turn(
+                user, message_content, conversation_id, template_id, folder_id
+            )
+            yield from self._run_stream_turn(turn, user, template_id, idle_tick)
+        except Exception as e:
+            yield self._stream_error_response(e)
+    
+    def _run_stream_turn(
+        self,
+        turn: Dict[str, Any],
+        user,
+        template_id: Optional[int] = None,
+        idle_tick: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the AI response into the turn's assistant message.
+        
+        Every event is numbered and kept in the message's StreamEventLog. If
+        the client disconnects, the rest of the upstream stream is handed to
+        a background thread, so the request worker is released right away
+        while a reconnecting client can still resume instead of asking again.
+        """
+        buffer = self._stream_write_buffer(turn['assistant_message'])
+        log = StreamEventLog(turn['assistant_message'].id)
+        handed_off = False
+        
+        # Stream AI response
+        chunks = self.ai_service.generate_response_stream(
+            turn['message_content'],
+            turn['conversation_history'],
+            template_id=template_id
+        )
+        if idle_tick:
+            # Upstream is read on a thread; no database access happens there
+            chunks = with_ticks(chunks, idle_tick)
+        
+        try:
+            for chunk in chunks:
+                event = self._record_stream_chunk(chunk, turn, user, buffer, log)
+                try:
+                    yield event
+                except GeneratorExit:
+                    logger.info(f"Client left stream of message {turn['assistant_message'].id}, finishing in background")
+                    self._start_background(
+                        lambda: self._drain_stream_turn(chunks, turn, user, buffer, log),
+                        name=f"chat-stream-{turn['assistant_message'].id}"
+                    )
+                    handed_off = True
+                    return
+        finally:
+            if not handed_off:
+                self._close_stream_turn(turn, user, buffer, log)
+    
+    def _record_stream_chunk(self, chunk, turn: Dict[str, Any], user, buffer: StreamWriteBuffer, log: StreamEventLog):
+        """Persist one upstream chunk and append it to the event log; returns the client event."""
+        if chunk is TICK:
+            return chunk
+        if self._buffer_stream_chunk(buffer, chunk):
+            buffer.flush()
+        
+        if chunk.get('type') in ('complete', 'error'):
+            self._finish_stream_turn(turn, user)
+        
+        return log.append(*self._stream_event(chunk, turn))
+    
+    def _drain_stream_turn(self, chunks, turn: Dict[str, Any], user, buffer: StreamWriteBuffer, log: StreamEventLog):
+        """Record the rest of a turn whose client went away (runs on a background thread)."""
+        try:
+            for chunk in chunks:
+                self._record_stream_chunk(chunk, turn, user, buffer, log)
+        except Exception as e:
+            logger.error(f"Background stream of message {turn['assistant_message'].id} failed: {str(e)}")
+        finally:
+            self._close_stream_turn(turn, user, buffer, log)
+    
+    def _close_stream_turn(self, turn: Dict[str, Any], user, buffer: StreamWriteBuffer, log: StreamEventLog):
+        # Keep partial content if the stream failed part way
+        buffer.flush()
+        self._finish_stream_turn(turn, user)
+        log.close()
+    
+    def _start_background(self, target, name: str):
+        """Run ``target`` on a daemon thread that closes its database connections when done."""
+        def run():
+            try:
+                target()
+            finally:
+                connections.close_all()
+        
+        threading.Thread(target=run, name=name, daemon=True).start()
+    
+    async def _arun_stream_turn(
+        self,
+        turn: Dict[str, Any],
+        user,
+        template_id: Optional[int] = None,
+        idle_tick: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of ``_run_stream_turn``."""
+        buffer = self._stream_write_buffer(turn['assistant_message'])
+        log = StreamEventLog(turn['assistant_message'].id)
+        delivering = True
+        
+        chunks = self.ai_service.agenerate_response_stream(
+            turn['message_content'],
+            turn['conversation_history'],
+            template_id=template_id
+        )
+        if idle_tick:
+            chunks = awith_ticks(chunks, idle_tick)
+        
+        try:
+            async for chunk in chunks:
+                if chunk is TICK:
+                    event = chunk
+                else:
+                    if self._buffer_stream_chunk(buffer, chunk):
+                        await buffer.aflush()
+                    
+                    if chunk.get('type') in ('complete', 'error'):
+                        await sync_to_async(self._finish_stream_turn)(turn, user)
+                    
+                    event = await log.aappend(*self._stream_event(chunk, turn))
+                if delivering:
                     try:
-                        folder = Folder.objects.get(id=folder_id, user=user)
-                        conversation_data['folder'] = folder
-                    except Folder.DoesNotExist:
-                        # If folder doesn't exist or doesn't belong to user, create without folder
-                        pass
-                conversation = Conversation.objects.create(**conversation_data)
-            
-            # Apply template if specified
-            if template_id:
-                template = ChatTemplate.objects.get(
-                    id=template_id,
-                    is_public=True
-                )
-                message_content = f"{template.prompt}\n\n{message_content}"
-                template.increment_usage()
+                        yield event
+                    except GeneratorExit:
+                        logger.info(f"Client left stream of message {turn['assistant_message'].id}, finishing in background")
+                        delivering = False
+        finally:
+            # Keep partial content if the stream failed part way
+            await buffer.aflush()
+            if not turn['finished']:
+                await sync_to_async(self._finish_stream_turn)(turn, user)
+            await log.aclose()
+    
+    def _stream_event(self, chunk: Dict[str, Any], turn: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Build the client event for a chunk and its content offset for the event log."""
+        offset = 0
+        if chunk.get('type') == 'delta':
+            offset = len(turn['assistant_message'].content) - len(chunk.get('content', ''))
+        return self._stream_chunk_response(chunk, turn), offset
+    
+    def enqueue_chat_message(
+        self,
+        user,
+        message_content: str,
+        conversation_id: Optional[str] = None,
+        template_id: Optional[int] = None,
+        folder_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Store a chat turn and generate the AI response on the 'chat' Celery queue.
+        
+        The assistant message is created as PENDING; the worker streams the
+        response into it, so clients can poll it or subscribe to its events.
+        
+        Args:
+            user: User instance
+            message_content: User's message content
+            conversation_id: Optional existing conversation ID
+            template_id: Optional template ID to use
             
-            # Create user message
-            user_message = ChatMessage.objects.create(
-                conversation=conversation,
-                user=user,
-                message_type=ChatMessage.MessageType.USER,
-                content=message_content,
-                status=ChatMessage.MessageStatus.COMPLETED
+        Returns:
+            Dict containing conversation and message data
+        """
+        from .tasks import process_chat_message_task
+        
+        try:
+            turn = self._start_stream_turn(
+                user, message_content, conversation_id, template_id, folder_id,
+                assistant_status=ChatMessage.MessageStatus.PENDING
             )
-            
-            # Get conversation history for context
-            conversation_history = self._get_conversation_history(conversation)
-            
-            # Create assistant message placeholder
-            assistant_message = ChatMessage.objects.create(
-                conversation=conversation,
-                user=user,
-                message_type=ChatMessage.MessageType.ASSISTANT,
-                content="",
+        except Exception as e:
+            logger.error(f"Chat service error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        assistant_message = turn['assistant_message']
+        try:
+            process_chat_message_task.apply_async(kwargs={
+                'assistant_message_id': str(assistant_message.id),
+                'user_message_id': str(turn['user_message'].id),
+                'message_content': turn['message_content'],
+                'conversation_history': turn['conversation_history'],
+                'template_id': template_id
+            })
+        except Exception as e:
+            # Broker unavailable: fail the turn instead of leaving it pending forever
+            logger.error(f"Failed to enqueue chat message {assistant_message.id}: {str(e)}")
+            assistant_message.content = 'An error occurred while processing your message.'
+            assistant_message.status = ChatMessage.MessageStatus.FAILED
+            assistant_message.error_message = str(e)
+            assistant_message.save(
+                update_fields=['content', 'status', 'error_message', 'updated_at'],
+                touch_conversation=False
+            )
+            self._finish_stream_turn(turn, user)
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        return {
+            'success': True,
+            'conversation_id': turn['conversation'].id,
+            'user_message': turn['user_message'],
+            'assistant_message': assistant_message
+        }
+    
+    def run_background_turn(
+        self,
+        assistant_message_id: str,
+        user_message_id: str,
+        message_content: str,
+        conversation_history: list = None,
+        template_id: Optional[int] = None
+    ) -> Optional[str]:
+        """Generate the response for a turn queued by ``enqueue_chat_message``.
+        
+        The PENDING -> PROCESSING transition is a conditional UPDATE, so a
+        redelivered task never answers the same message twice.
+        
+        Returns:
+            Final status of the assistant message, or None if it was skipped
+        """
+        claimed = ChatMessage.objects.filter(
+            id=assistant_message_id,
+            status=ChatMessage.MessageStatus.PENDING
+        ).update(status=ChatMessage.MessageStatus.PROCESSING, updated_at=timezone.now())
+        if not claimed:
+            logger.info(f"Chat message {assistant_message_id} already claimed, skipping")
+            return None
+        
+        assistant_message = ChatMessage.objects.select_related('conversation', 'user').get(id=assistant_message_id)
+        user = assistant_message.user
+        turn = {
+            'conversation': assistant_message.conversation,
+            'user_message': ChatMessage.objects.get(id=user_message_id),
+            'assistant_message': assistant_message,
+            'message_content': message_content,
+            'conversation_history': conversation_history or [],
+            'finished': False
+        }
+        
+        try:
+            for _ in self._run_stream_turn(turn, user, template_id):
+                pass
+        except Exception as e:
+            logger.error(f"Background chat error for message {assistant_message_id}: {str(e)}")
+            ChatMessage.objects.filter(
+                id=assistant_message_id,
                 status=ChatMessage.MessageStatus.PROCESSING
+            ).update(
+                status=ChatMessage.MessageStatus.FAILED,
+                error_message=str(e),
+                updated_at=timezone.now()
+            )
+            raise
+        
+        return assistant_message.status
+    
+    def fail_stale_messages(self, max_age: Optional[int] = None) -> int:
+        """Fail assistant messages left PROCESSING by a producer that died.
+        
+        A turn drained on a daemon thread (client disconnected) or by a Celery
+        worker is lost when that process restarts; a redelivered task skips
+        the message because it is no longer PENDING. Live producers write at
+        least every flush, so a message whose ``updated_at`` is older than
+        ``max_age`` seconds (CHAT_STALE_MESSAGE_SECONDS) has no producer left.
+        
+        Returns:
+            Number of messages failed
+        """
+        max_age = settings.CHAT_STALE_MESSAGE_SECONDS if max_age is None else max_age
+        cutoff = timezone.now() - timezone.timedelta(seconds=max_age)
+        stale = ChatMessage.objects.filter(
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            status=ChatMessage.MessageStatus.PROCESSING,
+            updated_at__lt=cutoff
+        ).select_related('conversation')[:settings.CHAT_STALE_MESSAGE_BATCH_SIZE]
+        
+        failed = 0
+        for message in stale:
+            # Conditional, so a producer finishing right now wins
+            claimed = ChatMessage.objects.filter(
+                id=message.id,
+                status=ChatMessage.MessageStatus.PROCESSING,
+                updated_at__lt=cutoff
+            ).update(
+                status=ChatMessage.MessageStatus.FAILED,
+                content=message.content or 'An error occurred while processing your message.',
+                error_message='Response generation was interrupted',
+                updated_at=timezone.now()
+            )
+            if not claimed:
+                continue
+            message.refresh_from_db()
+            # The producer never got to count the turn
+            message.conversation.apply_stats_delta(
+                messages=2,
+                tokens=message.tokens_used or 0,
+                last_message=message
+            )
+            failed += 1
+        
+        if failed:
+            logger.warning(f"Failed {failed} chat messages left processing by a lost worker")
+        return failed
+    
+    async def aprocess_chat_message_stream(
+        self,
+        user,
+        message_content: str,
+        conversation_id: Optional[str] = None,
+        template_id: Optional[int] = None,
+        folder_id: Optional[str] = None,
+        idle_tick: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of ``process_chat_message_stream`` for the ASGI path.
+        
+        Setup runs in one thread hop; the upstream stream is read without
+        blocking and per-chunk persistence goes through the async ORM API.
+        """
+        try:
+            turn = await sync_to_async(self._start_stream_turn)(
+                user, message_content, conversation_id, template_id, folder_id
             )
-            
-            accumulated_response = ""
-            sources = []
-            
-            # Stream AI response
-            for chunk in self.ai_service.generate_response_stream(message_content, conversation_history):
-                # Update accumulated response for delta chunks
-                if chunk.get('type') == 'delta':
-                    accumulated_response = chunk.get('accumulated_response', '')
-                    assistant_message.content = accumulated_response
-                    assistant_message.save(update_fields=['content'])
-                    
-                elif chunk.get('type') == 'sources':
-                    sources = chunk.get('sources', [])
-                    assistant_message.sources = sources
-                    assistant_message.save(update_fields=['sources'])
-                    
-                elif chunk.get('type') == 'complete':
-                    accumulated_response = chunk.get('response', '')
-                    sources = chunk.get('sources', [])
-                    assistant_message.content = accumulated_response
-                    assistant_message.sources = sources
-                    assistant_message.status = ChatMessage.MessageStatus.COMPLETED
-                    assistant_message.tokens_used = chunk.get('tokens_used', 0)
-                    assistant_message.model_used = chunk.get('model_used', '')
-                    assistant_message.response_time_ms = chunk.get('response_time_ms', 0)
-                    assistant_message.save()
-                    
-                    # Update conversation stats
-                    conversation.update_stats()
-                    
-                    # Update user session activity
-                    self._update_user_activity(user)
-                    
-                elif chunk.get('type') == 'error':
-                    assistant_message.content = chunk.get('response', 'An error occurred')
-                    assistant_message.status = ChatMessage.MessageStatus.FAILED
-                    assistant_message.error_message = chunk.get('error', '')
-                    assistant_message.save()
-                
-                # Yield chunk with message and conversation info
-                chunk_response = {
-                    **chunk,
-                    'conversation_id': str(conversation.id),
-                    'user_message_id': str(user_message.id),
-                    'assistant_message_id': str(assistant_message.id)
-                }
-                
-                yield chunk_response
-                
         except Exception as e:
-            yield {
-                'type': 'error',
-                'response': 'An error occurred while processing your message.',
-                'sources': [],
-                'error': str(e),
-                 'success': False
-             }
-    
-    def _get_conversation_history(self, conversation: Conversation, limit: int = 10) -> list:
-        """Get recent conversation history for context."""
-        messages = conversation.messages.order_by('-created_at')[:limit]
-        history = []
-        
-        for message in reversed(messages):
-            history.append({
-                'role': 'user' if message.is_from_user else 'assistant',
-                'content': message.content,
-                'timestamp': message.created_at.isoformat()
-            })
+            yield self._stream_error_response(e)
+            return
+        
+        stream = self._arun_stream_turn(turn, user, template_id, idle_tick)
+        try:
+            async for event in stream:
+                yield event
+        except Exception as e:
+            yield self._stream_error_response(e)
+        finally:
+            # Lets the turn drain to the end if our client went away
+            await stream.aclose()
+    
+    def _start_stream_turn(
+        self,
+        user,
+        message_content: str,
+        conversation_id: Optional[str] = None,
+        template_id: Optional[int] = None,
+        folder_id: Optional[str] = None,
+        assistant_status: str = ChatMessage.MessageStatus.PROCESSING
+    ) -> Dict[str, Any]:
+        """Create the conversation, user message and assistant placeholder for a streamed turn."""
+        # Get or create conversation
+        if conversation_id:
+            conversation = Conversation.objects.get(
+                id=conversation_id,
+                user=user
+            )
+        else:
+            # Create new conversation with optional folder assignment
+            conversation_data = {'user': user}
+            if folder_id:
+                try:
+                    folder = Folder.objects.get(id=folder_id, user=user)
+                    conversation_data['folder'] = folder
+                except Folder.DoesNotExist:
+                    # If folder doesn't exist or doesn't belong to user, create without folder
+                    pass
+            conversation = Conversation.objects.create(**conversation_data)
         
-        return history
+        # Apply template if specified
+        if template_id:
+            template = ChatTemplate.objects.get(
+                id=template_id,
+                is_public=True
+            )
+            message_content = f"{template.prompt}\n\n{message_content}"
+            template.increment_usage()
+        
+        # Get prior turns for context (cached rolling window)
+        conversation_history = context_builder.history(conversation)
+        
+        # Create user message. Conversation stats and updated_at are written
+        # once when the turn finishes, not on every message write.
+        user_message = ChatMessage(
+            conversation=conversation,
+            user=user,
+            message_type=ChatMessage.MessageType.USER,
+            content=message_content,
+            status=ChatMessage.MessageStatus.COMPLETED
+        )
+        user_message.save(touch_conversation=False)
+        
+        # Create assistant message placeholder
+        assistant_message = ChatMessage(
+            conversation=conversation,
+            user=user,
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            content="",
+            status=assistant_status
+        )
+        assistant_message.save(touch_conversation=False)
+        
+        return {
+            'conversation': conversation,
+            'user_message': user_message,
+            'assistant_message': assistant_message,
+            'message_content': message_content,
+            'conversation_history': conversation_history,
+            'finished': False
+        }
+    
+    def _stream_write_buffer(self, assistant_message: ChatMessage) -> StreamWriteBuffer:
+        return StreamWriteBuffer(
+            assistant_message,
+            flush_interval_ms=settings.CHAT_STREAM_FLUSH_INTERVAL_MS,
+            flush_bytes=settings.CHAT_STREAM_FLUSH_BYTES
+        )
+    
+    def _buffer_stream_chunk(self, buffer: StreamWriteBuffer, chunk: Dict[str, Any]) -> bool:
+        """Apply a chunk to the buffered message and return True if it should be flushed now.
+        
+        Deltas are flushed on the buffer's time/size threshold; terminal
+        chunks (complete/error) are always flushed immediately.
+        """
+        update_fields = self._apply_stream_chunk(buffer.instance, chunk)
+        if not update_fields:
+            return False
+        
+        content = chunk.get('content') if chunk.get('type') == 'delta' else ''
+        due = buffer.add(update_fields, len((content or '').encode('utf-8')))
+        return due or chunk.get('type') in ('complete', 'error')
+    
+    def _apply_stream_chunk(self, assistant_message: ChatMessage, chunk: Dict[str, Any]) -> Optional[list]:
+        """Apply a streamed chunk to the assistant message in memory.
+        
+        Returns the fields that need persisting, or None if nothing changed.
+        """
+        chunk_type = chunk.get('type')
+        
+        if chunk_type == 'delta':
+            assistant_message.content += chunk.get('content', '')
+            return ['content']
+        
+        if chunk_type == 'source_document':
+            # Sent by RAGStreamDecoder (and cached replays) ahead of 'complete'
+            assistant_message.sources = chunk.get('source', [])
+            return ['sources']
+        
+        if chunk_type == 'complete':
+            # Deltas already carry the Markdown; response is their concatenation
+            assistant_message.content = chunk.get('response', assistant_message.content)
+            assistant_message.sources = chunk.get('sources', [])
+            assistant_message.status = ChatMessage.MessageStatus.COMPLETED
+            assistant_message.tokens_used = chunk.get('tokens_used', 0)
+            assistant_message.model_used = chunk.get('model_used', '')
+            assistant_message.response_time_ms = chunk.get('response_time_ms', 0)
+            assistant_message.time_to_first_token_ms = chunk.get('time_to_first_token_ms')
+            assistant_message.cache_status = chunk.get('cache_status', '')
+            return [
+                'content', 'sources', 'status', 'tokens_used', 'model_used',
+                'response_time_ms', 'time_to_first_token_ms', 'cache_status'
+            ]
+        
+        if chunk_type == 'error':
+            assistant_message.content = chunk.get('response', 'An error occurred')
+            assistant_message.status = ChatMessage.MessageStatus.FAILED
+            assistant_message.error_message = chunk.get('error', '')
+            assistant_message.response_time_ms = chunk.get('response_time_ms')
+            assistant_message.time_to_first_token_ms = chunk.get('time_to_first_token_ms')
+            assistant_message.cache_status = chunk.get('cache_status', '')
+            return [
+                'content', 'status', 'error_message', 'response_time_ms',
+                'time_to_first_token_ms', 'cache_status'
+            ]
+        
+        return None
+    
+    def _finish_stream_turn(self, turn: Dict[str, Any], user):
+        """Apply the turn's conversation stats and activity once, however the stream ended."""
+        if turn['finished']:
+            return
+        turn['finished'] = True
+        
+        # Both messages were saved without touching the conversation; count
+        # them, their tokens, the new updated_at and the answer as the
+        # latest message in one UPDATE
+        turn['conversation'].apply_stats_delta(
+            messages=2,
+            tokens=turn['assistant_message'].tokens_used or 0,
+            touch=True,
+            last_message=turn['assistant_message']
+        )
+        context_builder.record_turn(turn['conversation'], turn['user_message'], turn['assistant_message'])
+        # The answer is final now; make it searchable
+        schedule_search_indexing()
+        
+        # Update user session activity
+        self._update_user_activity(user)
+    
+    def _stream_chunk_response(self, chunk: Dict[str, Any], turn: Dict[str, Any]) -> Dict[str, Any]:
+        """Yield chunk with message and conversation info.
+        
+        The client already has the full answer from the deltas, so the
+        ``complete`` event does not repeat it.
+        """
+        if chunk.get('type') == 'complete':
+            chunk = {key: value for key, value in chunk.items() if key != 'response'}
+        return {
+            **chunk,
+            'conversation_id': str(turn['conversation'].id),
+            'user_message_id': str(turn['user_message'].id),
+            'assistant_message_id': str(turn['assistant_message'].id)
+        }
+    
+    def _stream_error_response(self, error: Exception) -> Dict[str, Any]:
+        return {
+            'type': 'error',
+            'response': 'An error occurred while processing your message.',
+            'sources': [],
+            'error': str(error),
+            'success': False
+        }
     
     def _update_user_activity(self, user):
         """Update user's last activity and session info."""
-        user.last_activity = timezone.now()
-        user.save(update_fields=['last_activity'])
+        # Persisted at most once per PRESENCE_PERSIST_INTERVAL
+        presence.touch(user)
         
-        # Update current session if exists
-        current_session = user.sessions.filter(
+        # Count the message on the current session if exists (buffered)
+        session_id = user.sessions.filter(
             session_end__isnull=True
-        ).first()
+        ).values_list('id', flat=True).first()
         
-        if current_session:
-            current_session.chat_messages_sent += 1
-            current_session.save(update_fields=['chat_messages_sent'])
+        if session_id:
+            counters.add(UserSession, session_id, 'chat_messages_sent')
     
     def get_conversation_stats(self, user) -> Dict[str, Any]:
         """Get conversation statistics for user."""
         conversations = user.conversations.all()
-        messages = ChatMessage.objects.filter(user=user)
         
         total_conversations = conversations.count()
-        total_messages = messages.count()
-        total_tokens = sum(msg.tokens_used or 0 for msg in messages)
+        # Message, token and latency totals come from the hourly rollups
+        usage = usage_totals(user=user)
+        total_messages = usage['message_count']
+        total_tokens = usage['tokens_used']
+        avg_response_time = usage['avg_response_time_ms']
         
         # Calculate averages
         avg_messages_per_conversation = (
             total_messages / total_conversations if total_conversations > 0 else 0
         )
         
-        # Calculate average response time
-        assistant_messages = messages.filter(
-            message_type=ChatMessage.MessageType.ASSISTANT,
-            response_time_ms__isnull=False
-        )
-        
-        if assistant_messages.exists():
-            avg_response_time = sum(
-                msg.response_time_ms for msg in assistant_messages
-            ) / assistant_messages.count()
-        else:
-            avg_response_time = 0
-        
         # Get time-based stats
         now = timezone.now()
         week_ago = now - timezone.timedelta(days=7)
@@ -676,42 +1314,79 @@ class ChatService:
             return False
     
     def delete_conversation(self, user, conversation_id: str) -> bool:
-        """Delete a conversation and all its messages."""
-        try:
-            conversation = Conversation.objects.get(
-                id=conversation_id,
-                user=user
-            )
-            conversation.delete()
-            return True
-        except Conversation.DoesNotExist:
-            return False
+        """Delete a conversation and all its messages.
+        
+        The conversation is hidden at once; it and its messages are purged
+        in batches in the background (see apps.chat.purge), which also
+        recomputes the usage rollups.
+        """
+        return bool(hide_conversations(Conversation.objects.filter(id=conversation_id, user=user)))
+    
+    def bulk_update_conversations(self, user, conversation_ids: list, action: str, folder_id: Optional[str] = None) -> Dict[str, Any]:
+        """Apply one action to many of a user's conversations at once.
+        
+        Ownership is checked with a single query; IDs the user does not own
+        are reported back and left alone. Every other action is one UPDATE.
+        Deletes are purged in batches (see apps.chat.purge); when they span
+        more than CHAT_BULK_DELETE_SYNC_MESSAGES messages the conversations
+        are hidden and purged in the background.
+        
+        Args:
+            user: Owner of the conversations
+            conversation_ids: Conversation IDs
+            action: One of BULK_ACTIONS
+            folder_id: Target folder for 'move' (None moves to the root)
+            
+        Returns:
+            Dict with the number of conversations ``affected``, the IDs
+            ``not_found`` and whether a delete was ``queued``
+        """
+        owned = dict(
+            Conversation.objects.filter(user=user, id__in=conversation_ids).values_list('id', 'total_messages')
+        )
+        not_found = [str(conversation_id) for conversation_id in conversation_ids if conversation_id not in owned]
+        result = {
+            'success': True,
+            'action': action,
+            'affected': 0,
+            'not_found': not_found,
+            'queued': False
+        }
+        if not owned:
+            return result
+        
+        conversations = Conversation.objects.filter(user=user, id__in=list(owned))
+        if action == 'delete':
+            if sum(owned.values()) > settings.CHAT_BULK_DELETE_SYNC_MESSAGES:
+                result['affected'] = hide_conversations(conversations)
+                result['queued'] = True
+            else:
+                result['affected'] = purge_conversations(list(owned))['conversations']
+            return result
+        
+        if action == 'move':
+            folder = None
+            if folder_id:
+                folder = Folder.objects.filter(id=folder_id, user=user).first()
+                if folder is None:
+                    return {'success': False, 'error': 'Folder not found or access denied'}
+            result['affected'] = conversations.update(folder=folder, updated_at=timezone.now())
+        else:
+            result['affected'] = conversations.update(**self.BULK_ACTIONS[action])
+        return result
     
     def export_conversation(self, user, conversation_id: str) -> Dict[str, Any]:
         """Export conversation data."""
         try:
-            conversation = Conversation.objects.get(
+            conversation = Conversation.objects.filter(
                 id=conversation_id,
                 user=user
-            )
-            
-            messages_data = []
-            for message in conversation.messages.all():
-                messages_data.append({
-                    'timestamp': message.created_at.isoformat(),
-                    'type': message.message_type,
-                    'content': message.content,
-                    'tokens_used': message.tokens_used,
-                    'response_time_ms': message.response_time_ms
-                })
+            ).values(*export.CONVERSATION_FIELDS).get()
             
+            # Whole histories are better streamed, see apps.chat.export
             return {
-                'conversation_id': str(conversation.id),
-                'title': conversation.title,
-                'created_at': conversation.created_at.isoformat(),
-                'total_messages': conversation.total_messages,
-                'total_tokens_used': conversation.total_tokens_used,
-                'messages': messages_data
+                **export.conversation_record(conversation),
+                'messages': [export.message_record(message) for message in export.message_rows(conversation['id'])]
             }
             
         except Conversation.DoesNotExist:
@@ -721,6 +1396,8 @@ class ChatService:
 class FeedbackService:
     """Service for handling feedback interactions with RAG API."""
     
+    FEEDBACK_WEBHOOK_URL = "https://n8n.omadligrouphq.com/webhook/8ab1aff6-af35-4fd3-8098-eceedfc97ac0"
+    
     def __init__(self):
         self.rag_base_url = "https://n8n.omadligrouphq.com"
     
@@ -740,20 +1417,7 @@ class FeedbackService:
         
         try:
             # Prepare feedback data for RAG API
-            feedback_data = {
-                "question": question,
-                "answer": answer,
-                "feedback_type": feedback_type,
-                "timestamp": timezone.now().isoformat()
-            }
-            
-            # Add comment for thumbs down feedback
-            if feedback_type == "thumbs_down" and comment:
-                feedback_data["comment"] = comment
-                self.get_feedbacks_by_status(False)
-            elif feedback_type == "thumbs_up":
-                feedback_data["comment"] = "thumb up"
-                self.get_feedbacks_by_status(True)
+            feedback_data = self.build_feedback_data(question, answer, feedback_type, comment)
             
             # Call RAG API feedback endpoint
             response = self._call_rag_feedback_api(feedback_data)
@@ -780,30 +1444,164 @@ class FeedbackService:
                 'error': str(e)
             }
     
-    def _call_rag_feedback_api(self, feedback_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call RAG API feedback endpoint (legacy support only)."""
-        try:
-            # Only send to original RAG API for backward compatibility
-            # Webhook is now handled in FeedbackView to avoid duplication
-            url = f"{self.rag_base_url}/feedback/"
-            response = requests.post(
-                url,
-                json=feedback_data,
-                timeout=30
-            )
+    @staticmethod
+    def build_feedback_data(question: str, answer: str, feedback_type: str, comment: str = None) -> Dict[str, Any]:
+        """Build the RAG API feedback payload."""
+        feedback_data = {
+            "question": question,
+            "answer": answer,
+            "feedback_type": feedback_type,
+            "timestamp": timezone.now().isoformat()
+        }
+        
+        # Add comment for thumbs down feedback
+        if feedback_type == "thumbs_down" and comment:
+            feedback_data["comment"] = comment
+        elif feedback_type == "thumbs_up":
+            feedback_data["comment"] = "thumb up"
+        return feedback_data
+    
+    def ingest_feedback_batch(self, user, items: list) -> Dict[str, Any]:
+        """Store many message ratings at once and queue them for the RAG API.
+        
+        The rated messages (with the question each one answered) are loaded
+        in one query, the ratings are written with one bulk UPDATE, and the
+        RAG API calls are queued in the same transaction with one INSERT
+        into the outbox, which delivers them in batches.
+        
+        Args:
+            user: User giving the feedback (admins may rate any message)
+            items: Dicts with ``message_id``, ``is_helpful`` and optional ``comment``
             
-            if response.status_code == 200:
-                logger.info(f"Feedback submitted successfully to RAG API")
-                return response.json()
+        Returns:
+            Dict with the number of messages ``updated`` and the IDs ``not_found``
+        """
+        ratings = {item['message_id']: item for item in items}
+        question = ChatMessage.objects.filter(
+            conversation_id=OuterRef('conversation_id'),
+            message_type=ChatMessage.MessageType.USER,
+            created_at__lte=OuterRef('created_at')
+        ).order_by('-created_at').values('content')[:1]
+        
+        messages = ChatMessage.objects.filter(id__in=list(ratings))
+        if not user.is_admin:
+            messages = messages.filter(user=user)
+        messages = list(
+            messages.only('id', 'content', 'message_type', 'created_at', 'conversation_id')
+            .annotate(question=Subquery(question))
+        )
+        
+        now = timezone.now()
+        forwards = []
+        for message in messages:
+            rating = ratings[message.id]
+            message.is_helpful = rating['is_helpful']
+            message.feedback_comment = rating.get('comment', '')
+            message.updated_at = now
+            if message.message_type == ChatMessage.MessageType.ASSISTANT:
+                feedback_type = 'thumbs_up' if message.is_helpful else 'thumbs_down'
+                forwards.append((
+                    'feedback.rag',
+                    f"{self.rag_base_url}/feedback/",
+                    self.build_feedback_data(
+                        message.question or '', message.content, feedback_type, message.feedback_comment
+                    )
+                ))
+        
+        with transaction.atomic():
+            ChatMessage.objects.bulk_update(messages, ['is_helpful', 'feedback_comment', 'updated_at'])
+            outbox.enqueue_many(forwards)
+        
+        found = {message.id for message in messages}
+        return {
+            'success': True,
+            'updated': len(messages),
+            'forwarded': len(forwards),
+            'not_found': [str(message_id) for message_id in ratings if message_id not in found]
+        }
+    
+    def _call_rag_feedback_api(self, feedback_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a call to the RAG API feedback endpoint (legacy support only).
+        
+        The call is made by the outbox worker once the current transaction
+        commits (see apps.core.outbox).
+        """
+        # Only send to original RAG API for backward compatibility
+        # Webhook is now handled in FeedbackView to avoid duplication
+        message = outbox.enqueue('feedback.rag', f"{self.rag_base_url}/feedback/", feedback_data)
+        return {'queued': True, 'outbox_id': message.pk}
+    
+    def get_cached_feedback_analytics(self, date_from: str = None, date_to: str = None) -> Dict[str, Any]:
+        """Feedback analytics through the local read-through cache (see apps.chat.feedback_cache)."""
+        return self._read_through(feedback_cache.ANALYTICS, None, date_from, date_to)
+    
+    def get_cached_feedbacks_by_status(self, status: bool = None, date_from: str = None, date_to: str = None) -> Dict[str, Any]:
+        """Feedbacks filtered by status through the local read-through cache."""
+        return self._read_through(feedback_cache.FEEDBACKS, status, date_from, date_to)
+    
+    def _read_through(self, kind: str, status: Optional[bool], date_from: str, date_to: str) -> Dict[str, Any]:
+        """Serve a remote feedback query from the cache, stale-while-revalidate.
+        
+        Fresh entries are served as they are. Stale ones are served too,
+        while a background task fetches a new copy. Only a query that has
+        never been cached (or has expired) waits for the remote service,
+        and one whose background refresh is overdue: it is refetched inline,
+        falling back to the stale copy if that fails.
+        
+        Returns:
+            Dict like ``get_feedback_analytics`` plus the precomputed
+            ``summary``, ``cache`` (hit/stale/miss) and ``fetched_at``
+        """
+        key = feedback_cache.make_key(kind, status, date_from, date_to)
+        found = feedback_cache.lookup(key)
+        entry = found['entry']
+        
+        if entry and found['overdue']:
+            result = self.refresh_feedback_cache(kind, status, date_from, date_to)
+            if result['success']:
+                entry = result['entry']
+                cache_status = feedback_cache.MISS
             else:
-                logger.error(f"Failed to submit feedback to RAG API: {response.status_code}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error calling RAG feedback API: {str(e)}")
-            return None
+                cache_status = feedback_cache.STALE
+        elif entry:
+            cache_status = feedback_cache.HIT
+            if not found['fresh']:
+                cache_status = feedback_cache.STALE
+                feedback_cache.schedule_refresh(kind, status, date_from, date_to)
+        else:
+            result = self.refresh_feedback_cache(kind, status, date_from, date_to)
+            if not result['success']:
+                return {**result, 'summary': None, 'cache': feedback_cache.MISS, 'fetched_at': None}
+            entry = result['entry']
+            cache_status = feedback_cache.MISS
+        
+        return {
+            'success': True,
+            'data': entry['data'],
+            'summary': entry['summary'],
+            'error': None,
+            'cache': cache_status,
+            'fetched_at': feedback_cache.fetched_at(entry)
+        }
     
-
+    def refresh_feedback_cache(self, kind: str, status: bool = None, date_from: str = None, date_to: str = None) -> Dict[str, Any]:
+        """Fetch a remote feedback query and store it in the cache.
+        
+        A failed fetch leaves the current entry in place, so readers keep
+        getting the last good copy until it expires.
+        
+        Returns:
+            The fetch result, with the stored ``entry`` on success
+        """
+        if kind == feedback_cache.ANALYTICS:
+            result = self.get_feedback_analytics(date_from=date_from, date_to=date_to)
+        else:
+            result = self.get_feedbacks_by_status(status=status, date_from=date_from, date_to=date_to)
+        
+        if result['success']:
+            key = feedback_cache.make_key(kind, status, date_from, date_to)
+            result['entry'] = feedback_cache.store(key, result['data'])
+        return result
     
     def get_feedback_analytics(self, date_from: str = None, date_to: str = None) -> Dict[str, Any]:
         """Get feedback analytics from RAG API.
@@ -816,7 +1614,7 @@ class FeedbackService:
             Dict containing feedback analytics data
         """
         try:
-            url = "https://n8n.omadligrouphq.com/webhook/8ab1aff6-af35-4fd3-8098-eceedfc97ac0"
+            url = self.FEEDBACK_WEBHOOK_URL
             params = {}
             
             if date_from:
@@ -828,7 +1626,7 @@ class FeedbackService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(url, params=params, headers=headers, timeout=30)
+            response = get_upstream_client(url).get(url, params=params, headers=headers)
             response.raise_for_status()
             
             result = response.json()
@@ -866,7 +1664,7 @@ class FeedbackService:
             Dict containing filtered feedbacks data
         """
         try:
-            url = "https://n8n.omadligrouphq.com/webhook/8ab1aff6-af35-4fd3-8098-eceedfc97ac0"
+            url = self.FEEDBACK_WEBHOOK_URL
             params = {}
             
             if status is not None:
@@ -880,7 +1678,7 @@ class FeedbackService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(url, params=params, headers=headers, timeout=30)
+            response = get_upstream_client(url).get(url, params=params, headers=headers)
             response.raise_for_status()
             
             result = response.json()
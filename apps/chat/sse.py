@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from apps.core import json as fast_json
+
+logger = logging.getLogger(__name__)
+
+# Internal event meaning "nothing arrived for a while"; never sent to clients
+TICK = {'type': 'tick'}
+
+# Constant for a whole stream, so only sent once in the ``start`` event
+ID_FIELDS = ('conversation_id', 'user_message_id', 'assistant_message_id')
+
+HEARTBEAT = b': keep-alive\n\n'
+
+_END = object()
+
+
+def sse_frame(event: Dict[str, Any]) -> bytes:
+    """Format an event as a Server-Sent Event frame.
+
+    Numbered events carry an ``id:`` line, which browsers send back as
+    ``Last-Event-ID`` when they reconnect.
+    """
+    frame = b'data: ' + fast_json.dumps(event) + b'\n\n'
+    if event.get('event_id'):
+        frame = b'id: %d\n' % event['event_id'] + frame
+    return frame
+
+
+class SSEEncoder:
+    """Encode chat stream events as SSE frames.
+
+    - Consecutive deltas are merged into one frame until ``flush_bytes`` of
+      content are pending or ``flush_interval_ms`` passed since the last
+      frame. The merged frame carries the last merged ``event_id``, so
+      ``Last-Event-ID`` resumption stays exact.
+    - Conversation and message IDs are sent once, in a leading ``start``
+      event, and stripped from every later event. Per-delta metadata
+      (latency, model) is dropped; the ``complete`` event carries it.
+    - A ``: keep-alive`` comment is sent when nothing was written for
+      ``heartbeat_seconds``, so proxies do not close an idle stream.
+
+    Waiting for the next event is the source's job: sources wrapped with
+    ``with_ticks``/``awith_ticks`` yield ``TICK`` when idle, which is when
+    pending deltas and heartbeats become due. The encoder is pull-based, so
+    a client that stops reading stops the stream (see ``with_ticks``).
+    """
+
+    def __init__(
+        self,
+        flush_bytes: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        heartbeat_seconds: Optional[float] = None
+    ):
+        self.flush_bytes = settings.CHAT_SSE_FLUSH_BYTES if flush_bytes is None else flush_bytes
+        self.flush_interval = (
+            settings.CHAT_SSE_FLUSH_INTERVAL_MS if flush_interval_ms is None else flush_interval_ms
+        ) / 1000
+        self.heartbeat = settings.CHAT_SSE_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+        self.started = False
+        self._pending = []
+        self._pending_bytes = 0
+        self._pending_id = None
+        self._last_write = time.monotonic()
+
+    def feed(self, event: Dict[str, Any]) -> List[bytes]:
+        """Take one event and return the frames that are due."""
+        if event.get('type') == TICK['type']:
+            return self.tick()
+
+        frames = self._start(event)
+        event = {key: value for key, value in event.items() if key not in ID_FIELDS}
+
+        if event.get('type') == 'delta':
+            content = event.get('content') or ''
+            self._pending.append(content)
+            self._pending_bytes += len(content.encode('utf-8'))
+            self._pending_id = event.get('event_id') or self._pending_id
+            if self._pending_bytes >= self.flush_bytes or self._interval_elapsed():
+                frames += self._flush()
+            return frames
+
+        frames += self._flush()
+        frames.append(self._write(event))
+        return frames
+
+    def tick(self) -> List[bytes]:
+        """Return pending deltas or a heartbeat if either is due."""
+        if self._pending and self._interval_elapsed():
+            return self._flush()
+        if self.heartbeat and time.monotonic() - self._last_write >= self.heartbeat:
+            return [self._write(None)]
+        return []
+
+    def close(self) -> List[bytes]:
+        """Return whatever is still pending at the end of the stream."""
+        return self._flush()
+
+    def encode(self, events: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        for event in events:
+            yield from self.feed(event)
+        yield from self.close()
+
+    async def aencode(self, events: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[bytes]:
+        async for event in events:
+            for frame in self.feed(event):
+                yield frame
+        for frame in self.close():
+            yield frame
+
+    def _start(self, event: Dict[str, Any]) -> List[bytes]:
+        if self.started or not any(event.get(field) for field in ID_FIELDS):
+            return []
+        self.started = True
+        start = {'type': 'start'}
+        start.update({field: event[field] for field in ID_FIELDS if event.get(field)})
+        return [self._write(start)]
+
+    def _interval_elapsed(self) -> bool:
+        return time.monotonic() - self._last_write >= self.flush_interval
+
+    def _flush(self) -> List[bytes]:
+        if not self._pending:
+            return []
+        event = {'type': 'delta', 'content': ''.join(self._pending)}
+        if self._pending_id:
+            event['event_id'] = self._pending_id
+        self._pending = []
+        self._pending_bytes = 0
+        self._pending_id = None
+        return [self._write(event)]
+
+    def _write(self, event: Optional[Dict[str, Any]]) -> bytes:
+        self._last_write = time.monotonic()
+        return sse_frame(event) if event is not None else HEARTBEAT
+
+
+def with_ticks(iterable: Iterable[Any], interval: float, max_pending: Optional[int] = None) -> Iterator[Any]:
+    """Yield items of ``iterable``, and ``TICK`` whenever none arrived for ``interval`` seconds.
+
+    The iterable is consumed on a reader thread through a bounded queue:
+    when the consumer (ultimately the client socket) stops draining, the
+    reader blocks after ``max_pending`` items and stops pulling from the
+    upstream connection. Only use it on sources that do not touch the
+    database, since the reader thread has its own connection.
+    """
+    pending = queue.Queue(maxsize=max_pending or settings.CHAT_SSE_MAX_PENDING_EVENTS)
+    stop = threading.Event()
+
+    def read():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        pending.put(item, timeout=interval)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            pending.put(_END)
+        except BaseException as e:
+            pending.put(e)
+
+    threading.Thread(target=read, name='sse-reader', daemon=True).start()
+    try:
+        while True:
+            try:
+                item = pending.get(timeout=interval)
+            except queue.Empty:
+                yield TICK
+                continue
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+async def awith_ticks(iterable: AsyncIterable[Any], interval: float) -> AsyncIterator[Any]:
+    """Async counterpart of ``with_ticks``.
+
+    Only one item is requested ahead, so a client that is not draining
+    (the ASGI server awaits the socket before asking for more) pauses the
+    upstream read as well.
+    """
+    iterator = iterable.__aiter__()
+    step = None
+    try:
+        while True:
+            if step is None:
+                step = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({step}, timeout=interval)
+            if not done:
+                yield TICK
+                continue
+            try:
+                item = step.result()
+            except StopAsyncIteration:
+                step = None
+                return
+            step = None
+            yield item
+    finally:
+        if step is not None:
+            step.cancel()
@@ -0,0 +1,414 @@
+import json
+import logging
+import re
+import time
+from typing import Dict, Any, Iterable, List, Optional
+
+from django.db import models
+from django.utils import timezone
+from markdownify import markdownify as md
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_OPTIONS = {'heading_style': 'ATX', 'bullets': '-'}
+
+TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^<>]*?(/?)>')
+
+
+def html_to_markdown(html: str) -> str:
+    """Convert a complete HTML document to Markdown."""
+    return md(html, **MARKDOWN_OPTIONS)
+
+
+class IncrementalMarkdownConverter:
+    """Convert an HTML answer to Markdown as its fragments arrive.
+    
+    Input is buffered only until it can be converted safely: complete
+    top-level blocks are converted as a whole, while text inside a
+    top-level ``<p>`` (and bare top-level text) is released at word
+    boundaries, so prose streams with little delay. Concatenating the
+    returned pieces gives the Markdown of the whole document, without a
+    full-document conversion at the end.
+    """
+    
+    BLOCK_TAGS = {
+        'p', 'div', 'ul', 'ol', 'dl', 'table', 'pre', 'blockquote', 'hr',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'figure',
+    }
+    VOID_TAGS = {
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+        'meta', 'source', 'track', 'wbr',
+    }
+    
+    def __init__(self):
+        self._buffer = ''
+        self._depth = 0
+        self._top_tag = None
+        self._tail = ''
+    
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
+    
+    def feed(self, html: str) -> str:
+        """Add an HTML fragment and return the Markdown that is now final."""
+        self._buffer += html
+        return self._drain(final=False)
+    
+    def close(self) -> str:
+        """Convert whatever is still buffered."""
+        return self._drain(final=True)
+    
+    def _drain(self, final: bool) -> str:
+        out = []
+        buffer = self._buffer
+        pos = 0
+        depth = self._depth
+        top_tag = self._top_tag
+        # Parser state at ``pos``, where the unconverted buffer will start
+        saved = (depth, top_tag)
+        
+        for match in TAG_RE.finditer(buffer):
+            closing, name, self_closing = match.group(1), match.group(2).lower(), match.group(3)
+            
+            if closing:
+                depth = max(depth - 1, 0)
+                if depth == 0 and top_tag == 'p':
+                    out.append(self._inline(buffer[pos:match.start()]))
+                    out.append(self._end_block())
+                    pos = match.end()
+                    top_tag = None
+                    saved = (depth, top_tag)
+                elif depth == 0 and top_tag in self.BLOCK_TAGS:
+                    out.append(self._block(buffer[pos:match.end()]))
+                    pos = match.end()
+                    top_tag = None
+                    saved = (depth, top_tag)
+                elif depth == 0:
+                    top_tag = None
+                continue
+            
+            if name in self.VOID_TAGS or self_closing:
+                if depth == 0 and name in self.BLOCK_TAGS:
+                    out.append(self._inline(buffer[pos:match.start()]))
+                    out.append(self._block(buffer[match.start():match.end()]))
+                    pos = match.end()
+                    saved = (depth, top_tag)
+                continue
+            
+            if depth == 0:
+                top_tag = name
+                if name == 'p':
+                    # Stream the paragraph's text instead of waiting for </p>
+                    out.append(self._inline(buffer[pos:match.start()]))
+                    out.append(self._start_block())
+                    pos = match.end()
+                    saved = (depth + 1, top_tag)
+                elif name in self.BLOCK_TAGS:
+                    out.append(self._inline(buffer[pos:match.start()]))
+                    pos = match.start()
+                    saved = (depth, None)
+            depth += 1
+        
+        rest = buffer[pos:]
+        if final:
+            if top_tag in self.BLOCK_TAGS and top_tag != 'p':
+                out.append(self._block(rest))
+            else:
+                out.append(self._inline(rest))
+                if top_tag == 'p':
+                    out.append(self._end_block())
+            rest = ''
+            saved = (0, None)
+        elif depth == 0 or (depth == 1 and top_tag == 'p'):
+            # Release text up to the last word boundary outside any tag
+            cut = self._safe_cut(rest)
+            if cut:
+                out.append(self._inline(rest[:cut]))
+                rest = rest[cut:]
+                saved = (depth, top_tag)
+        
+        self._buffer = rest
+        self._depth, self._top_tag = saved
+        return ''.join(out)
+    
+    @staticmethod
+    def _safe_cut(text: str) -> int:
+        partial_tag = text.rfind('<')
+        if partial_tag != -1 and text.find('>', partial_tag) == -1:
+            text = text[:partial_tag]
+        cut = max(text.rfind(' '), text.rfind('\n')) + 1
+        # Only cut where everything after the cut is plain text, so the
+        # parser state at the cut equals the state at the end of the buffer
+        if cut and TAG_RE.search(text, cut):
+            return 0
+        return cut
+    
+    def _emit(self, markdown: str) -> str:
+        if markdown:
+            self._tail = (self._tail + markdown)[-2:]
+        return markdown
+    
+    def _separator(self) -> str:
+        if not self._tail or self._tail.endswith('\n\n'):
+            return ''
+        return '\n' if self._tail.endswith('\n') else '\n\n'
+    
+    def _inline(self, html: str) -> str:
+        if not html or (not html.strip() and (not self._tail or self._tail.endswith('\n'))):
+            return ''
+        return self._emit(md(html, **MARKDOWN_OPTIONS))
+    
+    def _block(self, html: str) -> str:
+        markdown = md(html, **MARKDOWN_OPTIONS).strip('\n')
+        if not markdown:
+            return ''
+        return self._emit(self._separator() + markdown + '\n\n')
+    
+    def _start_block(self) -> str:
+        return self._emit(self._separator())
+    
+    def _end_block(self) -> str:
+        return self._emit(self._separator())
+
+
+class RAGStreamDecoder:
+    """Incrementally turn an upstream RAG response body into chat chunks.
+
+    Lines are fed one at a time as they arrive. The first line decides the
+    mode: SSE (``data: {...}``) or chunked NDJSON events are translated into
+    ``delta`` chunks immediately; anything else is treated as a plain JSON
+    webhook body, buffered, and replayed block by block on ``close()``.
+
+    Upstream HTML is converted to Markdown incrementally, so ``delta``
+    chunks carry Markdown and the ``complete`` chunk's ``response`` is just
+    their concatenation.
+
+    The decoder does no I/O, so the sync (requests) and async (httpx) code
+    paths share it.
+    """
+
+    STREAM_MODE = 'stream'
+    BUFFERED_MODE = 'buffered'
+
+    DELTA_TYPES = ('item', 'delta', 'chunk', 'token')
+    END_TYPES = ('end', 'done')
+
+    # Buffered bodies are converted in pieces of about this size
+    REPLAY_CHUNK_CHARS = 512
+
+    def __init__(self):
+        self.mode = None
+        self.sources = []
+        self.finished = False
+        self.received_content = False
+        self.converter = IncrementalMarkdownConverter()
+        self._markdown = []
+        self._buffered_lines = []
+
+    @property
+    def pending_bytes(self) -> int:
+        """Upstream text not yet converted (drives off-thread conversion)."""
+        buffered = sum(len(line) for line in self._buffered_lines)
+        return buffered + self.converter.pending_bytes
+
+    def feed_line(self, line: str) -> List[Dict[str, Any]]:
+        """Consume one line of the upstream body and return ready chunks."""
+        if self.finished or not line.strip():
+            return []
+
+        if self.mode == self.BUFFERED_MODE:
+            self._buffered_lines.append(line)
+            return []
+
+        event = self.parse_line(line)
+        if self.mode is None:
+            if event is None:
+                self.mode = self.BUFFERED_MODE
+                self._buffered_lines.append(line)
+                return []
+            self.mode = self.STREAM_MODE
+
+        if event is None:
+            return []
+        return self._handle_event(event)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Finish decoding once the upstream body is exhausted."""
+        if self.finished:
+            return []
+        self.finished = True
+
+        if self.mode == self.BUFFERED_MODE:
+            return self._replay_buffered(json.loads('\n'.join(self._buffered_lines)))
+
+        if not self.received_content:
+            return [{
+                'type': 'error',
+                'error': 'No content found in webhook response'
+            }]
+
+        chunks = self._delta(self.converter.close())
+        return chunks + self._finish()
+
+    def _delta(self, markdown: str) -> List[Dict[str, Any]]:
+        if not markdown:
+            return []
+        self._markdown.append(markdown)
+        return [{
+            'type': 'delta',
+            'content': markdown
+        }]
+
+    def _finish(self) -> List[Dict[str, Any]]:
+        chunks = []
+        if self.sources:
+            chunks.append({
+                'type': 'source_document',
+                'source': self.sources
+            })
+
+        chunks.append({
+            'type': 'complete',
+            'response': ''.join(self._markdown),
+            'sources': self.sources
+        })
+        return chunks
+
+    @staticmethod
+    def parse_line(line: str) -> Optional[Dict[str, Any]]:
+        """Parse one SSE or NDJSON line into a stream event.
+
+        Returns None when the line is not a recognizable stream event, which
+        is how a plain (buffered) JSON body is detected.
+        """
+        line = line.strip()
+        if line.startswith(':') or line.startswith(('event:', 'id:', 'retry:')):
+            return {'type': 'ignore'}
+
+        is_sse = line.startswith('data:')
+        payload = line[5:].strip() if is_sse else line
+        if payload == '[DONE]':
+            return {'type': 'end'}
+
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return None
+
+        if not isinstance(event, dict):
+            return None
+        if not event.get('type'):
+            # SSE frames are events by definition; bare JSON lines are not
+            return {**event, 'type': 'delta'} if is_sse else None
+        return event
+
+    def _handle_event(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        event_type = event.get('type')
+
+        if event_type == 'error':
+            self.finished = True
+            return [{
+                'type': 'error',
+                'response': "I apologize, but something went wrong while processing your request. Please try again.",
+                'sources': [],
+                'error': event.get('error') or event.get('content') or 'Upstream stream error'
+            }]
+
+        document_names = event.get('Document Names') or event.get('sources')
+        if isinstance(document_names, list) and document_names:
+            self.sources = document_names
+
+        if event_type in self.END_TYPES:
+            return self.close()
+
+        content = event.get('content') or event.get('delta') or event.get('text')
+        if event_type in self.DELTA_TYPES and isinstance(content, str) and content:
+            self.received_content = True
+            return self._delta(self.converter.feed(content))
+        return []
+
+    def _replay_buffered(self, result: Any) -> List[Dict[str, Any]]:
+        """Replay a non-streaming webhook body as Markdown delta events."""
+        # Handle new webhook response format - array of objects
+        if not (isinstance(result, list) and len(result) > 0):
+            # Invalid response format
+            return [{
+                'type': 'error',
+                'error': 'Invalid webhook response format'
+            }]
+
+        response_item = result[0]  # Get first item from array
+        if 'content' not in response_item:
+            # No content found
+            return [{
+                'type': 'error',
+                'error': 'No content found in webhook response'
+            }]
+
+        content = response_item['content']
+
+        # Extract document names from Document Names field
+        document_names = response_item.get('Document Names')
+        if isinstance(document_names, list):
+            self.sources = document_names
+
+        # Convert piecewise so a large body never needs one big conversion
+        chunks = []
+        for start in range(0, len(content), self.REPLAY_CHUNK_CHARS):
+            chunks.extend(self._delta(self.converter.feed(content[start:start + self.REPLAY_CHUNK_CHARS])))
+        chunks.extend(self._delta(self.converter.close()))
+        return chunks + self._finish()
+
+
+class StreamWriteBuffer:
+    """Write-behind persistence for a message that is being streamed.
+    
+    Chunks are applied to the in-memory instance by the caller; the buffer
+    only tracks which fields are dirty and decides when they are due to be
+    written. Flushes go through ``QuerySet.update`` so they skip
+    ``Model.save()`` side effects such as touching the parent conversation.
+    """
+    
+    def __init__(self, instance: models.Model, flush_interval_ms: int = 250, flush_bytes: int = 2048):
+        self.instance = instance
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_bytes = flush_bytes
+        self._dirty = set()
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+    
+    def add(self, fields: Iterable[str], size: int = 0) -> bool:
+        """Mark ``fields`` dirty and return True when a flush is due."""
+        self._dirty.update(fields)
+        self._pending_bytes += size
+        return (
+            self._pending_bytes >= self.flush_bytes
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+    
+    def _pop_updates(self) -> Dict[str, Any]:
+        if not self._dirty:
+            return {}
+        updates = {field: getattr(self.instance, field) for field in self._dirty}
+        # update() bypasses auto_now, so stamp updated_at explicitly
+        updates['updated_at'] = self.instance.updated_at = timezone.now()
+        self._dirty.clear()
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+        return updates
+    
+    def _queryset(self):
+        return type(self.instance)._default_manager.filter(pk=self.instance.pk)
+    
+    def flush(self):
+        """Write all dirty fields in a single UPDATE."""
+        updates = self._pop_updates()
+        if updates:
+            self._queryset().update(**updates)
+    
+    async def aflush(self):
+        """Async variant of ``flush`` for the ASGI code path."""
+        updates = self._pop_updates()
+        if updates:
+            await self._queryset().aupdate(**updates)
@@ -0,0 +1,115 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from . import feedback_cache
+from .purge import PURGE_RUNNING_KEY, PURGE_SCHEDULED_KEY, purge_hidden, schedule_purge
+from .rollups import REFRESH_SCHEDULED_KEY, refresh_usage_rollups
+from .search import INDEX_SCHEDULED_KEY, index_pending, schedule_search_indexing
+from .services import ChatService, FeedbackService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name='chat.process_chat_message',
+    acks_late=True,
+    ignore_result=True,
+    soft_time_limit=settings.CHAT_BACKGROUND_TIME_LIMIT,
+)
+def process_chat_message_task(
+    assistant_message_id: str,
+    user_message_id: str,
+    message_content: str,
+    conversation_history: list = None,
+    template_id: int = None
+):
+    """Generate the AI response for a message queued by ``ChatService.enqueue_chat_message``.
+    
+    Routed to the 'chat' queue (CELERY_TASK_ROUTES). The response is
+    streamed into the PENDING assistant message, which clients poll or
+    subscribe to.
+    """
+    status = ChatService().run_background_turn(
+        assistant_message_id,
+        user_message_id,
+        message_content,
+        conversation_history,
+        template_id
+    )
+    logger.info(f"Background chat message {assistant_message_id} finished with status {status}")
+    return status
+
+
+@shared_task(name='chat.fail_stale_messages', ignore_result=True)
+def fail_stale_messages_task():
+    """Fail assistant messages whose producer died mid-turn (see ``ChatService.fail_stale_messages``)."""
+    return ChatService().fail_stale_messages()
+
+
+@shared_task(name='chat.index_search', ignore_result=True)
+def index_search_task():
+    """Index conversations and messages changed since the last run (see apps.chat.search).
+    
+    Runs are bounded by CHAT_SEARCH_INDEX_MAX_BATCHES; a backlog larger than
+    that (e.g. right after the migration) continues in a follow-up run.
+    """
+    # Writes from now on need another run
+    cache.delete(INDEX_SCHEDULED_KEY)
+    result = index_pending(max_batches=settings.CHAT_SEARCH_INDEX_MAX_BATCHES)
+    logger.info(
+        f"Indexed {result['conversations']} conversations and {result['messages']} messages for search"
+    )
+    if not result['done']:
+        schedule_search_indexing()
+    return result
+
+
+@shared_task(name='chat.refresh_usage_rollups', ignore_result=True)
+def refresh_usage_rollups_task():
+    """Refresh chat usage rollups from their high-water mark (see apps.chat.rollups)."""
+    cache.delete(REFRESH_SCHEDULED_KEY)
+    result = refresh_usage_rollups()
+    return {'buckets': result['buckets'], 'high_water': result['high_water'].isoformat()}
+
+
+@shared_task(name='chat.purge_conversations', ignore_result=True)
+def purge_conversations_task():
+    """Purge deleted conversations and their messages in throttled batches (see apps.chat.purge).
+    
+    Only one purger runs at a time. A run stops after CHAT_PURGE_MAX_SECONDS
+    and queues a follow-up while hidden conversations remain.
+    """
+    cache.delete(PURGE_SCHEDULED_KEY)
+    if not cache.add(PURGE_RUNNING_KEY, True, timeout=settings.CHAT_PURGE_MAX_SECONDS + 60):
+        # Look again once the running purger is done
+        schedule_purge(countdown=settings.CHAT_PURGE_MAX_SECONDS)
+        return None
+    try:
+        result = purge_hidden()
+    finally:
+        cache.delete(PURGE_RUNNING_KEY)
+    if not result['done']:
+        schedule_purge()
+    return result
+
+
+@shared_task(name='chat.refresh_feedback_cache', ignore_result=True)
+def refresh_feedback_cache_task(kind: str, status: bool = None, date_from: str = None, date_to: str = None):
+    """Refetch one stale remote feedback query (see apps.chat.feedback_cache).
+    
+    The refresh lock taken by ``schedule_refresh`` is held until the fetch
+    is done, so readers of the stale entry do not queue duplicate fetches.
+    """
+    if kind not in feedback_cache.KINDS:
+        logger.warning(f"Unknown feedback cache kind: {kind}")
+        return None
+    try:
+        result = FeedbackService().refresh_feedback_cache(kind, status, date_from, date_to)
+    finally:
+        cache.delete(feedback_cache.refreshing_key(feedback_cache.make_key(kind, status, date_from, date_to)))
+    if not result['success']:
+        logger.warning(f"Feedback cache refresh of {kind} failed: {result['error']}")
+    return result['success']
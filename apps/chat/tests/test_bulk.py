@@ -0,0 +1,151 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.chat.models import ChatMessage, Conversation, Folder
+from apps.chat.purge import PURGE_SCHEDULED_KEY
+
+
+class BulkConversationActionTest(TestCase):
+    """Test cases for the bulk conversation action endpoint"""
+    
+    url = '/api/chat/conversations/bulk/'
+    
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='bulk',
+            email='bulk@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.conversations = [Conversation.objects.create(user=self.user, title=f'Chat {i}') for i in range(3)]
+        self.foreign = Conversation.objects.create(user=self.other, title='Not yours')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.delete(PURGE_SCHEDULED_KEY)
+    
+    def ids(self, conversations):
+        return [str(conversation.id) for conversation in conversations]
+    
+    def add_messages(self, conversation, count):
+        for i in range(count):
+            ChatMessage.objects.create(
+                conversation=conversation,
+                user=conversation.user,
+                message_type=ChatMessage.MessageType.USER,
+                content=f'Message {i}'
+            )
+    
+    def test_archive_is_one_update(self):
+        """Test archiving many conversations checks ownership and updates in two queries"""
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {
+                'conversation_ids': self.ids(self.conversations),
+                'action': 'archive'
+            }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['affected'], 3)
+        self.assertEqual(Conversation.objects.filter(user=self.user, is_archived=True).count(), 3)
+    
+    def test_foreign_ids_are_reported_and_untouched(self):
+        """Test IDs owned by another user are returned as not found"""
+        response = self.client.post(self.url, {
+            'conversation_ids': self.ids([self.conversations[0], self.foreign]),
+            'action': 'pin'
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['affected'], 1)
+        self.assertEqual(response.data['not_found'], [str(self.foreign.id)])
+        self.foreign.refresh_from_db()
+        self.assertFalse(self.foreign.is_pinned)
+    
+    def test_move_to_folder_and_back(self):
+        """Test moving into a folder and back to the root"""
+        folder = Folder.objects.create(user=self.user, name='Work')
+        response = self.client.post(self.url, {
+            'conversation_ids': self.ids(self.conversations),
+            'action': 'move',
+            'folder_id': str(folder.id)
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(folder.conversations.count(), 3)
+        
+        self.client.post(self.url, {
+            'conversation_ids': self.ids(self.conversations),
+            'action': 'move',
+            'folder_id': None
+        }, format='json')
+        self.assertEqual(folder.conversations.count(), 0)
+    
+    def test_move_to_foreign_folder_fails(self):
+        """Test another user's folder cannot be a move target"""
+        folder = Folder.objects.create(user=self.other, name='Theirs')
+        response = self.client.post(self.url, {
+            'conversation_ids': self.ids(self.conversations),
+            'action': 'move',
+            'folder_id': str(folder.id)
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(folder.conversations.count(), 0)
+    
+    def test_small_delete_runs_inline(self):
+        """Test small deletes remove conversations and messages right away"""
+        self.add_messages(self.conversations[0], 3)
+        response = self.client.post(self.url, {
+            'conversation_ids': self.ids(self.conversations[:2]),
+            'action': 'delete'
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['queued'])
+        self.assertEqual(Conversation.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(ChatMessage.objects.filter(conversation_id=self.conversations[0].id).exists())
+    
+    @override_settings(CHAT_BULK_DELETE_SYNC_MESSAGES=2)
+    def test_large_delete_is_queued(self):
+        """Test deletes spanning many messages are handed to the purge task"""
+        self.add_messages(self.conversations[0], 3)
+        with patch('apps.chat.tasks.purge_conversations_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, {
+                    'conversation_ids': self.ids(self.conversations),
+                    'action': 'delete'
+                }, format='json')
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data['queued'])
+        apply_async.assert_called_once()
+        # Hidden at once, purged later
+        self.assertEqual(Conversation.objects.filter(user=self.user).count(), 0)
+        self.assertEqual(Conversation.all_objects.filter(user=self.user).count(), 3)
+    
+    @override_settings(CHAT_BULK_MAX_IDS=2)
+    def test_id_limit(self):
+        """Test requests over CHAT_BULK_MAX_IDS are rejected"""
+        response = self.client.post(self.url, {
+            'conversation_ids': self.ids(self.conversations),
+            'action': 'archive'
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 400)
+    
+    def test_unknown_action(self):
+        """Test unknown actions are rejected"""
+        response = self.client.post(self.url, {
+            'conversation_ids': self.ids(self.conversations),
+            'action': 'explode'
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 400)
+
@@ -0,0 +1,115 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from apps.chat.cache import AnswerCache, answer_cache
+from apps.chat.services import AIService
+
+
+@override_settings(ANSWER_CACHE_ALLOW_LOCAL=True)
+class AnswerCacheTest(SimpleTestCase):
+    """Test cases for the RAG answer cache"""
+    
+    def setUp(self):
+        caches['answers'].clear()
+        self.service = AIService()
+        patcher = patch('apps.chat.services.get_upstream_client')
+        self.mock_client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+    
+    def upstream_answers(self, content='<p>Use form 12.</p>'):
+        response = MagicMock()
+        response.json.return_value = [{'content': content, 'Document Names': ['Guide.pdf']}]
+        self.mock_client.post.return_value = response
+        self.mock_client.post.side_effect = None
+    
+    def upstream_fails(self):
+        self.mock_client.post.side_effect = requests.exceptions.ConnectionError('down')
+    
+    def test_normalize(self):
+        """Test questions differing only in case, spacing and punctuation share a key"""
+        self.assertEqual(AnswerCache.normalize('  How do I   file?'), 'how do i file')
+        self.assertEqual(
+            answer_cache.make_key('How do I file?', 3),
+            answer_cache.make_key('how do i  file', 3)
+        )
+        self.assertNotEqual(
+            answer_cache.make_key('How do I file?', 3),
+            answer_cache.make_key('How do I file?', None)
+        )
+    
+    def test_hit_skips_upstream(self):
+        """Test a repeated question is served from the cache"""
+        self.upstream_answers()
+        first = self.service.generate_response('How do I file?')
+        second = self.service.generate_response('how do i file')
+        
+        self.assertEqual(first['cache_status'], AnswerCache.MISS)
+        self.assertEqual(second['cache_status'], AnswerCache.HIT)
+        self.assertEqual(second['response'], first['response'])
+        self.assertEqual(second['sources'], ['Guide.pdf'])
+        self.assertEqual(self.mock_client.post.call_count, 1)
+    
+    def test_stale_if_error(self):
+        """Test an expired entry is served when the upstream fails"""
+        self.upstream_answers()
+        self.service.generate_response('How do I file?')
+        
+        self.upstream_fails()
+        with self.settings(ANSWER_CACHE_TTL=0):
+            result = self.service.generate_response('How do I file?')
+        
+        self.assertEqual(result['cache_status'], AnswerCache.STALE)
+        self.assertEqual(result['sources'], ['Guide.pdf'])
+    
+    def test_errors_are_not_cached(self):
+        """Test upstream failures are not stored"""
+        self.upstream_fails()
+        result = self.service.generate_response('How do I file?')
+        
+        self.assertEqual(result['cache_status'], AnswerCache.MISS)
+        self.assertIsNone(answer_cache.lookup('How do I file?')['entry'])
+    
+    @override_settings(ANSWER_CACHE_ALLOW_LOCAL=False)
+    def test_disabled_on_process_local_backend(self):
+        """Test the cache stays off when invalidations could not reach other workers"""
+        self.upstream_answers()
+        self.service.generate_response('How do I file?')
+        result = self.service.generate_response('How do I file?')
+        
+        self.assertFalse(answer_cache.shared)
+        self.assertEqual(result['cache_status'], AnswerCache.MISS)
+        self.assertEqual(self.mock_client.post.call_count, 2)
+    
+    def test_invalidate(self):
+        """Test invalidation drops previously cached answers"""
+        self.upstream_answers()
+        self.service.generate_response('How do I file?')
+        
+        answer_cache.invalidate()
+        
+        self.assertIsNone(answer_cache.lookup('How do I file?')['entry'])
+    
+    def test_evicted_generation_is_not_reused(self):
+        """Test answers from before an eviction of the generation key stay unreachable"""
+        self.upstream_answers()
+        self.service.generate_response('How do I file?')
+        
+        caches['answers'].delete(AnswerCache.GENERATION_KEY)
+        
+        self.assertIsNone(answer_cache.lookup('How do I file?')['entry'])
+    
+    def test_stream_replays_cached_answer(self):
+        """Test the streaming path replays a cached answer without calling upstream"""
+        self.upstream_answers()
+        self.service.generate_response('How do I file?')
+        self.mock_client.post.reset_mock()
+        
+        chunks = list(self.service.generate_response_stream('How do I file?'))
+        
+        self.assertEqual(chunks[0]['type'], 'delta')
+        self.assertEqual(chunks[-1]['type'], 'complete')
+        self.assertEqual(chunks[-1]['cache_status'], AnswerCache.HIT)
+        self.mock_client.post.assert_not_called()
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from apps.chat.context import context_builder
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.services import AIService
+
+
+class ConversationContextBuilderTest(TestCase):
+    """Test cases for the cached, token-budgeted conversation context"""
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            username='context',
+            email='context@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+    
+    def add_turn(self, question, answer):
+        user_message = ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content=question
+        )
+        assistant_message = ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            content=answer
+        )
+        context_builder.record_turn(self.conversation, user_message, assistant_message)
+    
+    def test_cached_window_skips_messages_query(self):
+        """Test follow-up turns read history from the cache"""
+        with self.assertNumQueries(0):
+            self.assertEqual(context_builder.history(self.conversation), [])
+        self.add_turn('What is GSR?', 'A report.')
+        
+        with self.assertNumQueries(0):
+            history = context_builder.history(self.conversation)
+        
+        self.assertEqual([m['role'] for m in history], ['user', 'assistant'])
+        self.assertEqual(history[-1]['content'], 'A report.')
+    
+    def test_window_reloaded_after_external_change(self):
+        """Test a counter mismatch (another worker wrote) reloads from the database"""
+        context_builder.history(self.conversation)
+        self.add_turn('First?', 'One.')
+        
+        # A turn written elsewhere bypasses this process' window
+        ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content='Second?'
+        )
+        
+        history = context_builder.history(self.conversation)
+        
+        self.assertEqual([m['content'] for m in history], ['First?', 'One.', 'Second?'])
+    
+    @override_settings(CHAT_CONTEXT_TOKEN_BUDGET=10)
+    def test_trimmed_to_token_budget(self):
+        """Test the oldest messages are dropped to fit the token budget"""
+        context_builder.history(self.conversation)
+        self.add_turn('a' * 40, 'b' * 20)
+        
+        history = context_builder.history(self.conversation)
+        
+        self.assertEqual([m['content'] for m in history], ['b' * 20])
+    
+    def test_history_sent_upstream(self):
+        """Test the payload carries the current message and prior turns, newest first"""
+        history = [
+            {'role': 'user', 'content': 'First?'},
+            {'role': 'assistant', 'content': 'One.'},
+        ]
+        
+        payload = AIService()._build_rag_payload('Second?', history)
+        
+        self.assertEqual(payload['message'], 'Second?')
+        self.assertEqual(
+            [(m['message_type'], m['content']) for m in payload['conversation']],
+            [('user', 'Second?'), ('assistant', 'One.'), ('user', 'First?')]
+        )
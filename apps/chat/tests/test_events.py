@@ -0,0 +1,142 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from unittest.mock import patch
+
+from apps.chat.events import StreamEventLog, afollow_message_events, follow_message_events
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.services import ChatService
+
+
+def collect(message_id, after=0):
+    async def run():
+        return [event async for event in afollow_message_events(message_id, after=after)]
+    return async_to_sync(run)()
+
+
+@override_settings(CHAT_BACKGROUND_POLL_INTERVAL_MS=1, CHAT_STREAM_BUFFER_ALLOW_LOCAL=True)
+class StreamEventLogTest(TestCase):
+    """Test cases for resumable stream events"""
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            username='resumer',
+            email='resumer@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+        self.message = ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            content='',
+            status=ChatMessage.MessageStatus.PROCESSING
+        )
+    
+    def publish(self, words, size=None):
+        log = StreamEventLog(self.message.id, size=size)
+        offset = 0
+        for word in words:
+            log.append({'type': 'delta', 'content': word}, offset)
+            offset += len(word)
+        log.append({'type': 'complete', 'sources': []})
+        log.close()
+        return log
+    
+    def test_replays_after_last_event_id(self):
+        """Test a reconnect only receives events after the one it last saw"""
+        self.publish(['One ', 'two ', 'three'])
+        
+        events = collect(self.message.id, after=2)
+        
+        self.assertEqual([e['event_id'] for e in events], [3, 4])
+        self.assertEqual(events[0]['content'], 'three')
+        self.assertEqual(events[-1]['type'], 'complete')
+    
+    def test_gap_is_filled_with_snapshot(self):
+        """Test evicted events are replaced by the persisted content, without duplicates"""
+        ChatMessage.objects.filter(id=self.message.id).update(content='One two ')
+        with self.settings(CHAT_STREAM_BUFFER_EVENTS=3):
+            self.publish(['One ', 'two ', 'three ', 'four'])
+            events = collect(self.message.id, after=0)
+        
+        self.assertEqual(events[0]['type'], 'snapshot')
+        self.assertNotIn('event_id', events[0])
+        self.assertEqual(events[0]['content'], 'One two ')
+        deltas = [e['content'] for e in events if e['type'] == 'delta']
+        self.assertEqual(events[0]['content'] + ''.join(deltas), 'One two three four')
+    
+    def test_finished_message_without_log(self):
+        """Test an expired log is served from the message row"""
+        ChatMessage.objects.filter(id=self.message.id).update(
+            content='Done', status=ChatMessage.MessageStatus.COMPLETED
+        )
+        
+        events = collect(self.message.id, after=7)
+        
+        self.assertEqual([e['type'] for e in events], ['snapshot', 'complete'])
+        self.assertEqual(events[0]['content'], 'Done')
+    
+    def test_disconnect_keeps_streaming_into_log(self):
+        """Test a client leaving mid-stream does not abort the turn"""
+        chunks = [
+            {'type': 'delta', 'content': 'Hi '},
+            {'type': 'delta', 'content': 'there'},
+            {'type': 'complete', 'response': 'Hi there', 'sources': [], 'tokens_used': 3},
+        ]
+        service = ChatService()
+        
+        # The remainder is drained on a background thread; run it inline here
+        with patch.object(service.ai_service, 'generate_response_stream', return_value=iter(chunks)), \
+                patch.object(service, '_start_background', side_effect=lambda target, name: target()) as background:
+            stream = service.process_chat_message_stream(self.user, 'Hello')
+            first = next(stream)
+            stream.close()
+        
+        background.assert_called_once()
+        message = ChatMessage.objects.get(id=first['assistant_message_id'])
+        self.assertEqual(message.status, ChatMessage.MessageStatus.COMPLETED)
+        self.assertEqual(message.content, 'Hi there')
+        
+        events = collect(message.id, after=first['event_id'])
+        self.assertEqual([e['event_id'] for e in events], [2, 3])
+        self.assertEqual(events[-1]['type'], 'complete')
+    
+    def test_blocking_follow_matches_async(self):
+        """Test the WSGI variant replays the same events"""
+        self.publish(['One ', 'two ', 'three'])
+        
+        events = list(follow_message_events(self.message.id, after=2))
+        
+        self.assertEqual(events, collect(self.message.id, after=2))
+    
+    def test_events_view_streams_under_wsgi(self):
+        """Test the sync events view sends the replayed events as SSE frames"""
+        self.publish(['One ', 'two'])
+        
+        response = self.client.get(
+            f'/api/chat/messages/{self.message.id}/events/',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}',
+            HTTP_LAST_EVENT_ID='1'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('"content":"two"', body.replace(' ', ''))
+        self.assertIn('"type":"complete"', body.replace(' ', ''))
+    
+    @override_settings(CHAT_STREAM_BUFFER_ALLOW_LOCAL=False)
+    def test_log_is_off_on_process_local_cache(self):
+        """Test readers fall back to the persisted message when the log cannot be shared"""
+        log = self.publish(['One ', 'two'])
+        ChatMessage.objects.filter(id=self.message.id).update(
+            content='One two', status=ChatMessage.MessageStatus.COMPLETED
+        )
+        
+        self.assertIsNone(log.read())
+        events = list(follow_message_events(self.message.id))
+        self.assertEqual([e['type'] for e in events], ['snapshot', 'complete'])
+        self.assertEqual(events[0]['content'], 'One two')
@@ -0,0 +1,88 @@
+import io
+import json
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.services import ChatService
+
+
+@override_settings(CHAT_EXPORT_CHUNK_SIZE=2, CHAT_EXPORT_FLUSH_BYTES=64)
+class ConversationExportTest(TestCase):
+    """Test cases for streaming conversation exports"""
+    
+    url = '/api/chat/conversations/export/'
+    
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='export',
+            email='export@example.com',
+            password='testpass123'
+        )
+        other = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.conversations = []
+        for title in ('First', 'Second'):
+            conversation = Conversation.objects.create(user=self.user, title=title)
+            for i in range(3):
+                ChatMessage.objects.create(
+                    conversation=conversation,
+                    user=self.user,
+                    message_type=ChatMessage.MessageType.USER if i % 2 == 0 else ChatMessage.MessageType.ASSISTANT,
+                    content=f'{title} message {i}'
+                )
+            self.conversations.append(conversation)
+        Conversation.objects.create(user=other, title='Not yours')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_ndjson_export(self):
+        """Test NDJSON lists each conversation followed by its messages"""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        
+        lines = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual([line['record'] for line in lines], ['conversation'] + ['message'] * 3 + ['conversation'] + ['message'] * 3)
+        self.assertEqual(lines[0]['title'], 'First')
+        self.assertEqual(lines[1]['conversation_id'], str(self.conversations[0].id))
+        self.assertEqual([line['content'] for line in lines[1:4]], [f'First message {i}' for i in range(3)])
+    
+    def test_zip_export_matches_single_export(self):
+        """Test each ZIP entry has the shape of the single-conversation export"""
+        response = self.client.get(self.url, {'output': 'zip'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(f'{conversation.id}.json' for conversation in self.conversations)
+        )
+        for conversation in self.conversations:
+            data = json.loads(archive.read(f'{conversation.id}.json'))
+            self.assertEqual(data, ChatService().export_conversation(self.user, conversation.id))
+    
+    def test_export_selected_conversations(self):
+        """Test conversation_id parameters limit the export"""
+        response = self.client.get(self.url, {'conversation_id': [str(self.conversations[1].id)]})
+        
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual({line.get('title') for line in lines if line['record'] == 'conversation'}, {'Second'})
+    
+    def test_invalid_output(self):
+        """Test unknown output formats are rejected"""
+        response = self.client.get(self.url, {'output': 'xml'})
+        
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,235 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.chat import feedback_cache
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.services import FeedbackService
+from apps.core.models import OutboxMessage
+
+
+class FeedbackBatchTest(TestCase):
+    """Test cases for batch feedback ingestion"""
+    
+    url = '/api/chat/feedback/batch/'
+    
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='rater',
+            email='rater@example.com',
+            password='testpass123'
+        )
+        other = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        conversation = Conversation.objects.create(user=self.user)
+        self.answers = []
+        for i in range(3):
+            ChatMessage.objects.create(
+                conversation=conversation,
+                user=self.user,
+                message_type=ChatMessage.MessageType.USER,
+                content=f'Question {i}'
+            )
+            self.answers.append(ChatMessage.objects.create(
+                conversation=conversation,
+                user=self.user,
+                message_type=ChatMessage.MessageType.ASSISTANT,
+                content=f'Answer {i}'
+            ))
+        self.foreign = ChatMessage.objects.create(
+            conversation=Conversation.objects.create(user=other),
+            user=other,
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            content='Not yours'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_batch_is_stored_in_bulk_and_queued(self):
+        """Test ratings are written locally and queued for the RAG API without remote calls"""
+        before = timezone.now()
+        items = [
+            {'message_id': str(self.answers[0].id), 'is_helpful': True},
+            {'message_id': str(self.answers[1].id), 'is_helpful': False, 'comment': 'Wrong'},
+            {'message_id': str(self.foreign.id), 'is_helpful': False},
+        ]
+        
+        with patch('apps.chat.services.get_upstream_client') as client, \
+                patch('apps.core.outbox.get_upstream_client') as outbox_client:
+            with self.assertNumQueries(5):
+                response = self.client.post(self.url, {'items': items}, format='json')
+        
+        client.assert_not_called()
+        outbox_client.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['not_found'], [str(self.foreign.id)])
+        
+        helpful = ChatMessage.objects.get(pk=self.answers[0].pk)
+        unhelpful = ChatMessage.objects.get(pk=self.answers[1].pk)
+        self.assertTrue(helpful.is_helpful)
+        self.assertFalse(unhelpful.is_helpful)
+        self.assertEqual(unhelpful.feedback_comment, 'Wrong')
+        self.assertGreaterEqual(unhelpful.updated_at, before)
+        self.assertIsNone(ChatMessage.objects.get(pk=self.foreign.pk).is_helpful)
+        
+        payloads = sorted(
+            OutboxMessage.objects.filter(topic='feedback.rag').values_list('payload', flat=True),
+            key=lambda payload: payload['answer']
+        )
+        self.assertEqual(
+            [(p['question'], p['answer'], p['feedback_type'], p['comment']) for p in payloads],
+            [
+                ('Question 0', 'Answer 0', 'thumbs_up', 'thumb up'),
+                ('Question 1', 'Answer 1', 'thumbs_down', 'Wrong'),
+            ]
+        )
+    
+    @override_settings(FEEDBACK_BATCH_MAX_ITEMS=1)
+    def test_batch_size_limit(self):
+        """Test batches over FEEDBACK_BATCH_MAX_ITEMS are rejected"""
+        items = [{'message_id': str(answer.id), 'is_helpful': True} for answer in self.answers]
+        
+        response = self.client.post(self.url, {'items': items}, format='json')
+        
+        self.assertEqual(response.status_code, 400)
+    
+    def test_thumbs_feedback_does_not_fetch_feedback_lists(self):
+        """Test a single rating no longer fetches the remote feedback lists"""
+        with patch.object(FeedbackService, 'get_feedbacks_by_status') as get_feedbacks:
+            result = FeedbackService().submit_thumbs_feedback('Q', 'A', 'thumbs_down', 'Bad')
+        
+        self.assertTrue(result['success'])
+        get_feedbacks.assert_not_called()
+
+
+class FeedbackCacheTest(TestCase):
+    """Test cases for the remote feedback read-through cache"""
+    
+    analytics_url = '/api/chat/feedback/analytics/'
+    
+    remote = {
+        'success': True,
+        'data': {'feedbacks': [
+            {'feedback_type': 'thumbs_up'},
+            {'feedback_type': 'thumbs_up'},
+            {'feedback_type': 'thumbs_up'},
+            {'feedback_type': 'thumbs_down'},
+        ]},
+        'error': None
+    }
+    
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_summary_counts(self):
+        """Test thumbs counts and satisfaction rate are precomputed"""
+        self.assertEqual(feedback_cache.summarize(self.remote['data']), {
+            'total_feedback': 4,
+            'thumbs_up_count': 3,
+            'thumbs_down_count': 1,
+            'satisfaction_rate': 75.0
+        })
+        self.assertEqual(feedback_cache.summarize(None)['satisfaction_rate'], 0)
+    
+    def test_keys_depend_on_status_and_date_range(self):
+        """Test every status filter and date range has its own entry"""
+        keys = {
+            feedback_cache.make_key(feedback_cache.FEEDBACKS, status, date_from)
+            for status in (None, True, False)
+            for date_from in (None, '2024-01-01')
+        }
+        
+        self.assertEqual(len(keys), 6)
+        self.assertNotEqual(
+            feedback_cache.make_key(feedback_cache.ANALYTICS),
+            feedback_cache.make_key(feedback_cache.FEEDBACKS)
+        )
+    
+    def test_read_through(self):
+        """Test the remote service is called on a miss only"""
+        with patch.object(FeedbackService, 'get_feedback_analytics', return_value=self.remote) as fetch:
+            first = self.client.get(self.analytics_url, {'date_from': '2024-01-01'})
+            second = self.client.get(self.analytics_url, {'date_from': '2024-01-01'})
+        
+        fetch.assert_called_once_with(date_from='2024-01-01', date_to=None)
+        self.assertEqual(first.data['cache'], 'miss')
+        self.assertEqual(second.data['cache'], 'hit')
+        self.assertEqual(second.data['summary']['thumbs_up_count'], 3)
+        self.assertEqual(second.data['analytics'], self.remote['data'])
+    
+    def test_stale_entry_is_served_and_refreshed_in_background(self):
+        """Test stale entries are returned at once while one refresh is queued"""
+        with patch.object(FeedbackService, 'get_feedbacks_by_status', return_value=self.remote):
+            FeedbackService().get_cached_feedbacks_by_status(status=True)
+        
+        with override_settings(FEEDBACK_CACHE_TTL=0), \
+                patch.object(FeedbackService, 'get_feedbacks_by_status') as fetch, \
+                patch('apps.chat.tasks.refresh_feedback_cache_task.apply_async') as apply_async:
+            response = self.client.get('/api/chat/feedbacks/', {'status': 'true'})
+            self.client.get('/api/chat/feedbacks/', {'status': 'true'})
+        
+        fetch.assert_not_called()
+        apply_async.assert_called_once_with(args=['feedbacks', True, None, None])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cache'], 'stale')
+        self.assertEqual(response.data['count'], 4)
+    
+    def test_overdue_refresh_is_done_inline(self):
+        """Test an entry whose background refresh never landed is refetched by the reader"""
+        with patch.object(FeedbackService, 'get_feedback_analytics', return_value=self.remote):
+            FeedbackService().get_cached_feedback_analytics()
+        
+        failure = {'success': False, 'data': None, 'error': 'timeout'}
+        with override_settings(FEEDBACK_CACHE_TTL=0, FEEDBACK_CACHE_REFRESH_TIMEOUT=0), \
+                patch('apps.chat.tasks.refresh_feedback_cache_task.apply_async') as apply_async:
+            with patch.object(FeedbackService, 'get_feedback_analytics', return_value=self.remote) as fetch:
+                refreshed = FeedbackService().get_cached_feedback_analytics()
+            with patch.object(FeedbackService, 'get_feedback_analytics', return_value=failure):
+                fallback = FeedbackService().get_cached_feedback_analytics()
+        
+        fetch.assert_called_once()
+        apply_async.assert_not_called()
+        self.assertEqual(refreshed['cache'], 'miss')
+        self.assertEqual(fallback['cache'], 'stale')
+        self.assertEqual(fallback['summary']['total_feedback'], 4)
+    
+    def test_failed_refresh_keeps_last_entry(self):
+        """Test a failing remote service does not drop the cached copy"""
+        from apps.chat.tasks import refresh_feedback_cache_task
+        
+        with patch.object(FeedbackService, 'get_feedback_analytics', return_value=self.remote):
+            FeedbackService().get_cached_feedback_analytics()
+        
+        failure = {'success': False, 'data': None, 'error': 'timeout'}
+        with patch.object(FeedbackService, 'get_feedback_analytics', return_value=failure):
+            self.assertFalse(refresh_feedback_cache_task('analytics'))
+            result = FeedbackService().get_cached_feedback_analytics()
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(result['summary']['total_feedback'], 4)
+    
+    def test_cold_miss_failure(self):
+        """Test a miss the remote service cannot answer is reported as an error"""
+        failure = {'success': False, 'data': None, 'error': 'timeout'}
+        with patch.object(FeedbackService, 'get_feedback_analytics', return_value=failure):
+            response = self.client.get(self.analytics_url)
+        
+        self.assertEqual(response.status_code, 500)
+        self.assertIsNone(cache.get(feedback_cache.make_key(feedback_cache.ANALYTICS)))
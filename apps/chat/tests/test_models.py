@@ -0,0 +1,176 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.chat.models import ChatMessage, Conversation
+
+
+class ConversationStatsTest(TestCase):
+    """Test cases for incrementally maintained conversation statistics"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='counter',
+            email='counter@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+    
+    def add_message(self, tokens=None):
+        return ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            content='Answer',
+            tokens_used=tokens
+        )
+    
+    def assertStats(self, messages, tokens):
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.total_messages, messages)
+        self.assertEqual(self.conversation.total_tokens_used, tokens)
+    
+    def test_create_increments(self):
+        """Test creating messages adds to the counters"""
+        self.add_message(tokens=10)
+        self.add_message()
+        
+        self.assertStats(2, 10)
+    
+    def test_update_applies_token_delta(self):
+        """Test changing tokens_used moves the total by the difference"""
+        message = self.add_message(tokens=10)
+        
+        message = ChatMessage.objects.get(pk=message.pk)
+        message.tokens_used = 25
+        message.save(update_fields=['tokens_used'])
+        message.mark_as_helpful()
+        
+        self.assertStats(1, 25)
+    
+    def test_delete_decrements(self):
+        """Test deleting a message subtracts it from the counters"""
+        self.add_message(tokens=10)
+        message = self.add_message(tokens=5)
+        
+        ChatMessage.objects.get(pk=message.pk).delete()
+        
+        self.assertStats(1, 10)
+    
+    def test_counters_never_negative(self):
+        """Test a drifted counter is clamped at zero"""
+        message = self.add_message(tokens=10)
+        Conversation.objects.filter(pk=self.conversation.pk).update(total_messages=0, total_tokens_used=0)
+        
+        message.delete()
+        
+        self.assertStats(0, 0)
+    
+    def test_reconcile_command(self):
+        """Test the reconcile command repairs drifted counters"""
+        self.add_message(tokens=10)
+        self.add_message(tokens=7)
+        empty = Conversation.objects.create(user=self.user)
+        Conversation.objects.filter(pk=self.conversation.pk).update(total_messages=9, total_tokens_used=1)
+        Conversation.objects.filter(pk=empty.pk).update(total_messages=3)
+        
+        out = StringIO()
+        call_command('reconcile_conversation_stats', stdout=out)
+        
+        self.assertIn('Reconciled counters for 2 conversations', out.getvalue())
+        self.assertStats(2, 17)
+        empty.refresh_from_db()
+        self.assertEqual(empty.total_messages, 0)
+
+
+class LastMessageSnapshotTest(TestCase):
+    """Test cases for the denormalized latest-message snapshot on Conversation"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='snapshot',
+            email='snapshot@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+    
+    def add_message(self, content, message_type=ChatMessage.MessageType.USER):
+        return ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=message_type,
+            content=content
+        )
+    
+    def test_create_updates_snapshot(self):
+        """Test a new message becomes the conversation's last message"""
+        self.add_message('Question')
+        answer = self.add_message('x' * 150, ChatMessage.MessageType.ASSISTANT)
+        
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, answer.id)
+        self.assertEqual(self.conversation.last_message_type, ChatMessage.MessageType.ASSISTANT)
+        self.assertEqual(self.conversation.last_message_preview, 'x' * 100 + '...')
+        self.assertEqual(self.conversation.last_message_at, answer.created_at)
+    
+    def test_content_edit_refreshes_preview(self):
+        """Test editing the latest message updates its preview"""
+        answer = self.add_message('Partial', ChatMessage.MessageType.ASSISTANT)
+        
+        answer.content = 'Partial answer, now complete'
+        answer.save(update_fields=['content'])
+        
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_preview, 'Partial answer, now complete')
+    
+    def test_delete_falls_back_to_previous(self):
+        """Test deleting the latest message restores the one before it"""
+        question = self.add_message('Question')
+        answer = self.add_message('Answer', ChatMessage.MessageType.ASSISTANT)
+        
+        answer.delete()
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, question.id)
+        self.assertEqual(self.conversation.last_message_preview, 'Question')
+        
+        question.delete()
+        self.conversation.refresh_from_db()
+        self.assertIsNone(self.conversation.last_message_id)
+        self.assertEqual(self.conversation.last_message_preview, '')
+    
+    def test_reconcile_repairs_snapshot(self):
+        """Test the reconcile command rebuilds a drifted snapshot"""
+        answer = self.add_message('Answer', ChatMessage.MessageType.ASSISTANT)
+        Conversation.objects.filter(pk=self.conversation.pk).update(
+            last_message_id=None, last_message_preview='', last_message_type=''
+        )
+        
+        call_command('reconcile_conversation_stats', stdout=StringIO())
+        
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, answer.id)
+        self.assertEqual(self.conversation.last_message_preview, 'Answer')
+    
+    def test_list_query_count_is_constant(self):
+        """Test the conversation list does not query messages per conversation"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.add_message('Question')
+        
+        with CaptureQueriesContext(connection) as single:
+            response = client.get('/api/chat/conversations/')
+        self.assertEqual(response.status_code, 200)
+        
+        for _ in range(5):
+            self.conversation = Conversation.objects.create(user=self.user)
+            self.add_message('Question')
+        
+        with CaptureQueriesContext(connection) as many:
+            response = client.get('/api/chat/conversations/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(single))
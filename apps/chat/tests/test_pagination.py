@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.chat.models import ChatMessage, Conversation
+
+
+@override_settings(CHAT_HISTORY_PAGE_SIZE=3)
+class MessageHistoryPaginationTest(TestCase):
+    """Test cases for cursor-paginated conversation history"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='history',
+            email='history@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+        start = timezone.now() - timedelta(hours=1)
+        self.messages = []
+        for i in range(7):
+            message = ChatMessage.objects.create(
+                conversation=self.conversation,
+                user=self.user,
+                message_type=ChatMessage.MessageType.USER,
+                content=f'Message {i}'
+            )
+            # Distinct timestamps in creation order
+            ChatMessage.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=i))
+            self.messages.append(message)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def contents(self, results):
+        return [message['content'] for message in results]
+    
+    def test_history_pages_newest_first(self):
+        """Test following next cursors walks back through the whole history"""
+        url = f'/api/chat/conversations/{self.conversation.id}/history/'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(self.contents(response.data['results']))
+            url = response.data['next']
+        
+        self.assertEqual(pages, [
+            ['Message 6', 'Message 5', 'Message 4'],
+            ['Message 3', 'Message 2', 'Message 1'],
+            ['Message 0'],
+        ])
+    
+    def test_history_page_size_param(self):
+        """Test clients can ask for a different window size"""
+        response = self.client.get(
+            f'/api/chat/conversations/{self.conversation.id}/history/', {'page_size': 5}
+        )
+        
+        self.assertEqual(len(response.data['results']), 5)
+    
+    def test_detail_embeds_latest_window(self):
+        """Test the detail endpoint returns only the newest messages and an older cursor"""
+        response = self.client.get(f'/api/chat/conversations/{self.conversation.id}/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.contents(response.data['messages']), ['Message 6', 'Message 5', 'Message 4'])
+        self.assertIn('/history/', response.data['messages_next'])
+        
+        older = self.client.get(response.data['messages_next'])
+        self.assertEqual(self.contents(older.data['results']), ['Message 3', 'Message 2', 'Message 1'])
+    
+    def test_detail_short_conversation_has_no_cursor(self):
+        """Test a conversation that fits in one window has no older cursor"""
+        conversation = Conversation.objects.create(user=self.user)
+        ChatMessage.objects.create(
+            conversation=conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content='Only message'
+        )
+        
+        response = self.client.get(f'/api/chat/conversations/{conversation.id}/')
+        
+        self.assertEqual(self.contents(response.data['messages']), ['Only message'])
+        self.assertIsNone(response.data['messages_next'])
@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.chat.models import ChatMessage, Conversation, Folder
+from apps.chat.purge import PURGE_SCHEDULED_KEY, purge_conversations, purge_hidden
+
+
+class ConversationPurgeTest(TestCase):
+    """Test cases for hiding deleted conversations and purging them in the background"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='purge',
+            email='purge@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.delete(PURGE_SCHEDULED_KEY)
+    
+    def create_conversation(self, messages=3, **kwargs):
+        conversation = Conversation.objects.create(user=self.user, **kwargs)
+        for i in range(messages):
+            ChatMessage.objects.create(
+                conversation=conversation,
+                user=self.user,
+                message_type=ChatMessage.MessageType.USER,
+                content=f'Message {i}'
+            )
+        return conversation
+    
+    def test_purge_in_batches(self):
+        """Test messages and conversations are deleted across several batches"""
+        conversations = [self.create_conversation() for _ in range(3)]
+        keep = self.create_conversation(messages=0)
+        
+        result = purge_conversations([conversation.id for conversation in conversations], batch_size=2)
+        
+        self.assertEqual(result, {'conversations': 3, 'messages': 9, 'done': True})
+        self.assertEqual(list(Conversation.all_objects.values_list('id', flat=True)), [keep.id])
+        self.assertFalse(ChatMessage.objects.exists())
+    
+    def test_clear_all_hides_and_queues_purge(self):
+        """Test clear-all hides every conversation at once and leaves deletion to the purger"""
+        for _ in range(2):
+            self.create_conversation()
+        Folder.objects.create(user=self.user, name='Old')
+        
+        with patch('apps.chat.tasks.purge_conversations_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete('/api/chat/conversations/clear-all/')
+        
+        self.assertEqual(response.status_code, 200)
+        apply_async.assert_called_once()
+        self.assertFalse(Conversation.objects.filter(user=self.user).exists())
+        self.assertFalse(Folder.objects.filter(user=self.user).exists())
+        self.assertEqual(ChatMessage.objects.count(), 6)
+        self.assertEqual(self.client.get('/api/chat/conversations/').data, [])
+        
+        result = purge_hidden()
+        self.assertEqual(result, {'conversations': 2, 'messages': 6, 'done': True})
+        self.assertFalse(Conversation.all_objects.exists())
+    
+    def test_folder_delete_hides_its_conversations(self):
+        """Test deleting a folder hides its conversations instead of moving them to the root"""
+        folder = Folder.objects.create(user=self.user, name='Work')
+        inside = self.create_conversation(folder=folder)
+        outside = self.create_conversation()
+        
+        with patch('apps.chat.tasks.purge_conversations_task.apply_async'):
+            response = self.client.delete(f'/api/chat/folders/{folder.id}/')
+        
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(Conversation.objects.values_list('id', flat=True)), [outside.id])
+        self.assertIsNotNone(Conversation.all_objects.get(id=inside.id).deleted_at)
+    
+    def test_single_delete_hides_and_queues_purge(self):
+        """Test deleting one conversation leaves its messages to the purger"""
+        conversation = self.create_conversation()
+        
+        with patch('apps.chat.tasks.purge_conversations_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(f'/api/chat/conversations/{conversation.id}/delete/')
+        
+        self.assertEqual(response.status_code, 200)
+        apply_async.assert_called_once()
+        self.assertFalse(Conversation.objects.filter(id=conversation.id).exists())
+        self.assertEqual(ChatMessage.objects.count(), 3)
+        
+        response = self.client.delete(f'/api/chat/conversations/{conversation.id}/delete/')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_purge_stops_at_deadline(self):
+        """Test a run out of time reports that work remains"""
+        conversation = self.create_conversation()
+        Conversation.objects.filter(id=conversation.id).update(deleted_at=conversation.created_at)
+        
+        result = purge_hidden(max_seconds=0)
+        
+        self.assertFalse(result['done'])
+        self.assertTrue(Conversation.all_objects.filter(id=conversation.id).exists())
+    
+    def test_purge_status(self):
+        """Test the progress endpoint reports pending work and queues a purger run"""
+        conversation = self.create_conversation()
+        Conversation.objects.filter(id=conversation.id).update(deleted_at=conversation.created_at)
+        
+        with patch('apps.chat.tasks.purge_conversations_task.apply_async') as apply_async:
+            response = self.client.get('/api/chat/conversations/purge-status/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pending_conversations'], 1)
+        self.assertEqual(response.data['pending_messages'], 3)
+        self.assertFalse(response.data['done'])
+        apply_async.assert_called_once()
+        
+        purge_hidden()
+        response = self.client.get('/api/chat/conversations/purge-status/')
+        self.assertTrue(response.data['done'])
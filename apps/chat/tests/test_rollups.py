@@ -0,0 +1,169 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+
+from apps.chat.models import ChatMessage, ChatUsageRollup, Conversation, RollupWatermark
+from apps.chat.purge import purge_conversations
+from apps.chat.rollups import REFRESH_SCHEDULED_KEY, WATERMARK, refresh_usage_rollups, usage_by_day, usage_totals
+from apps.chat.services import ChatService
+
+
+@override_settings(CHAT_ROLLUP_LAG_SECONDS=0)
+class UsageRollupTest(TestCase):
+    """Test cases for incrementally refreshed chat usage rollups"""
+    
+    def setUp(self):
+        cache.delete(REFRESH_SCHEDULED_KEY)
+        self.user = get_user_model().objects.create_user(
+            username='rollup',
+            email='rollup@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    
+    def add_turn(self, hour, tokens, response_time_ms, model='gpt-4'):
+        created_at = self.start + timedelta(hours=hour, minutes=10)
+        question = ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content='Question'
+        )
+        answer = ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.ASSISTANT,
+            content='Answer',
+            tokens_used=tokens,
+            model_used=model,
+            response_time_ms=response_time_ms
+        )
+        ChatMessage.objects.filter(pk__in=[question.pk, answer.pk]).update(
+            created_at=created_at, updated_at=created_at
+        )
+        return answer
+    
+    def refresh(self, **kwargs):
+        return refresh_usage_rollups(**kwargs)
+    
+    def test_refresh_builds_hourly_rows(self):
+        """Test rollups are keyed by hour, user and model"""
+        self.add_turn(0, tokens=10, response_time_ms=100)
+        self.add_turn(0, tokens=5, response_time_ms=300, model='gpt-3.5')
+        self.add_turn(2, tokens=7, response_time_ms=200)
+        
+        result = self.refresh()
+        
+        self.assertEqual(result['buckets'], 2)
+        row = ChatUsageRollup.objects.get(bucket=self.start, model_used='gpt-4')
+        self.assertEqual(row.assistant_message_count, 1)
+        self.assertEqual(row.tokens_used, 10)
+        user_row = ChatUsageRollup.objects.get(bucket=self.start, model_used='')
+        self.assertEqual(user_row.user_message_count, 2)
+        
+        with patch('apps.chat.tasks.refresh_usage_rollups_task.apply_async'):
+            totals = usage_totals(user=self.user)
+        self.assertEqual(totals['message_count'], 6)
+        self.assertEqual(totals['tokens_used'], 22)
+        self.assertEqual(totals['avg_response_time_ms'], 200)
+    
+    def test_incremental_refresh_recomputes_changed_buckets(self):
+        """Test only buckets with updated messages are recomputed, exactly"""
+        answer = self.add_turn(0, tokens=10, response_time_ms=100)
+        self.add_turn(3, tokens=1, response_time_ms=100)
+        self.refresh()
+        
+        # A late update (e.g. final token count) after the high-water mark
+        answer.tokens_used = 40
+        answer.save(update_fields=['tokens_used', 'updated_at'])
+        result = self.refresh()
+        
+        self.assertEqual(result['buckets'], 1)
+        self.assertEqual(ChatUsageRollup.objects.get(bucket=self.start, model_used='gpt-4').tokens_used, 40)
+        self.assertEqual(self.refresh()['buckets'], 0)
+    
+    def test_rebuild_drops_deleted_messages(self):
+        """Test a rebuild recomputes every bucket from current messages"""
+        answer = self.add_turn(1, tokens=10, response_time_ms=100)
+        self.refresh()
+        answer.delete()
+        
+        out = StringIO()
+        call_command('refresh_chat_rollups', '--rebuild', stdout=out)
+        
+        self.assertIn('Refreshed 1 buckets', out.getvalue())
+        self.assertEqual(ChatUsageRollup.objects.filter(model_used='gpt-4').count(), 0)
+    
+    def test_purge_recomputes_buckets_of_deleted_messages(self):
+        """Test purged messages drop out of the rollups without a rebuild"""
+        self.add_turn(1, tokens=10, response_time_ms=100)
+        other = Conversation.objects.create(user=self.user)
+        kept = ChatMessage.objects.create(
+            conversation=other,
+            user=self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content='Kept'
+        )
+        ChatMessage.objects.filter(pk=kept.pk).update(
+            created_at=self.start + timedelta(hours=1, minutes=20), updated_at=self.start
+        )
+        self.refresh()
+        
+        purge_conversations([self.conversation.id])
+        
+        with patch('apps.chat.tasks.refresh_usage_rollups_task.apply_async'):
+            totals = usage_totals(user=self.user)
+        self.assertEqual(totals['message_count'], 1)
+        self.assertEqual(totals['tokens_used'], 0)
+    
+    def test_first_read_queues_build(self):
+        """Test reads before any refresh queue the build instead of running it"""
+        self.add_turn(0, tokens=10, response_time_ms=100)
+        
+        with patch('apps.chat.tasks.refresh_usage_rollups_task.apply_async') as apply_async:
+            totals = usage_totals(user=self.user)
+        
+        self.assertEqual(totals['message_count'], 0)
+        self.assertIsNone(totals['refreshed_at'])
+        self.assertFalse(RollupWatermark.objects.exists())
+        apply_async.assert_called_once()
+    
+    def test_daily_usage(self):
+        """Test hourly rows are summed per day"""
+        self.add_turn(0, tokens=10, response_time_ms=100)
+        self.add_turn(1, tokens=20, response_time_ms=300)
+        self.refresh()
+        
+        days = {day['date']: day for day in usage_by_day(user=self.user)}
+        
+        self.assertEqual(sum(day['tokens_used'] for day in days.values()), 30)
+        self.assertEqual(sum(day['messages'] for day in days.values()), 4)
+    
+    @patch('apps.chat.tasks.refresh_usage_rollups_task.apply_async')
+    def test_stale_read_queues_one_refresh(self, mock_apply_async):
+        """Test reads queue a background refresh once while the rollups are stale"""
+        RollupWatermark.objects.create(name=WATERMARK, high_water=timezone.now() - timedelta(days=1))
+        usage_totals()
+        usage_totals()
+        
+        mock_apply_async.assert_called_once_with()
+    
+    @patch('apps.chat.tasks.refresh_usage_rollups_task.apply_async')
+    def test_conversation_stats_read_rollups(self, mock_apply_async):
+        """Test user statistics come from the rollups"""
+        self.add_turn(0, tokens=10, response_time_ms=100)
+        self.refresh()
+        
+        stats = ChatService().get_conversation_stats(self.user)
+        
+        self.assertEqual(stats['total_messages'], 2)
+        self.assertEqual(stats['total_tokens_used'], 10)
+        self.assertEqual(stats['avg_response_time_ms'], 100)
+        mock_apply_async.assert_not_called()
@@ -0,0 +1,203 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from unittest.mock import patch
+
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.search import (
+    INDEX_SCHEDULED_KEY, decode_cursor, encode_cursor, index_pending, schedule_search_indexing
+)
+
+
+class ChatSearchViewTest(TestCase):
+    """Test cases for the chat search endpoint (full-text on PostgreSQL, substring matching elsewhere)"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='searcher',
+            email='searcher@example.com',
+            password='testpass123'
+        )
+        self.other = get_user_model().objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user, title='Invoice questions')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def add_message(self, content, user=None, conversation=None):
+        return ChatMessage.objects.create(
+            conversation=conversation or self.conversation,
+            user=user or self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content=content
+        )
+    
+    def test_requires_query(self):
+        """Test an empty query is rejected"""
+        response = self.client.get('/api/chat/search/')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_finds_own_messages_and_titles(self):
+        """Test matches are limited to the user's conversations and highlighted"""
+        message = self.add_message('Where is my <b>invoice</b> for March?')
+        other_conversation = Conversation.objects.create(user=self.other, title='Invoice')
+        self.add_message('My invoice is missing', user=self.other, conversation=other_conversation)
+        index_pending()
+        
+        response = self.client.get('/api/chat/search/', {'q': 'invoice'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([hit['message_id'] for hit in response.data['results']], [str(message.id)])
+        self.assertEqual(
+            response.data['results'][0]['snippet'],
+            'Where is my &lt;b&gt;<mark>invoice</mark>&lt;/b&gt; for March?'
+        )
+        self.assertEqual(
+            [hit['conversation_id'] for hit in response.data['conversations']],
+            [str(self.conversation.id)]
+        )
+        self.assertIsNone(response.data['next'])
+    
+    def test_keyset_pagination(self):
+        """Test following next visits every match exactly once"""
+        expected = {str(self.add_message(f'refund request {i}').id) for i in range(5)}
+        index_pending()
+        
+        seen = []
+        url = '/api/chat/search/?q=refund&limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += [hit['message_id'] for hit in response.data['results']]
+            url = response.data['next']
+        
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), expected)
+    
+    def search_all(self, q, limit):
+        """Follow ``next`` from the first page; returns the message IDs of every page."""
+        pages = []
+        url = f'/api/chat/search/?q={q}&limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([hit['message_id'] for hit in response.data['results']])
+            url = response.data['next']
+        return pages
+    
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+    def test_results_are_ranked(self):
+        """Test messages matching more often rank first"""
+        once = self.add_message('A refund was mentioned once in this long message about other things')
+        often = self.add_message('Refund refund refund')
+        index_pending()
+        
+        response = self.client.get('/api/chat/search/', {'q': 'refund'})
+        
+        results = response.data['results']
+        self.assertEqual([hit['message_id'] for hit in results], [str(often.id), str(once.id)])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertIn('<mark>Refund</mark>', results[0]['snippet'])
+    
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+    def test_keyset_pagination_across_ranks(self):
+        """Test pages after the first are returned when ranks differ"""
+        expected = [
+            str(self.add_message(' '.join(['refund'] * (i + 1) + ['filler'] * 10)).id)
+            for i in range(7)
+        ]
+        index_pending()
+        
+        pages = self.search_all('refund', limit=5)
+        
+        self.assertEqual([len(page) for page in pages], [5, 2])
+        # Most occurrences rank highest
+        self.assertEqual(sum(pages, []), expected[::-1])
+    
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is a client error"""
+        response = self.client.get('/api/chat/search/', {'q': 'refund', 'cursor': 'not-a-cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_cursor_round_trip(self):
+        """Test cursors preserve rank and id exactly"""
+        self.assertEqual(decode_cursor(encode_cursor(0.0607927, 'abc')), (0.0607927, 'abc'))
+
+
+class SearchIndexingTest(TestCase):
+    """Test cases for marking rows stale and scheduling the background indexer"""
+    
+    def setUp(self):
+        cache.delete(INDEX_SCHEDULED_KEY)
+        self.user = get_user_model().objects.create_user(
+            username='indexed',
+            email='indexed@example.com',
+            password='testpass123'
+        )
+        self.conversation = Conversation.objects.create(user=self.user, title='Title')
+    
+    def test_content_edit_clears_vector(self):
+        """Test editing content marks the message for reindexing"""
+        message = ChatMessage.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            message_type=ChatMessage.MessageType.USER,
+            content='Before'
+        )
+        ChatMessage.objects.filter(pk=message.pk).update(search_vector="'before':1")
+        
+        message.mark_as_helpful()
+        self.assertIsNotNone(ChatMessage.objects.get(pk=message.pk).search_vector)
+        
+        message.content = 'After'
+        message.save(update_fields=['content'])
+        self.assertIsNone(ChatMessage.objects.get(pk=message.pk).search_vector)
+    
+    def test_title_edit_clears_vector(self):
+        """Test renaming a conversation marks it for reindexing"""
+        Conversation.objects.filter(pk=self.conversation.pk).update(search_vector="'title':1")
+        
+        self.conversation.is_pinned = True
+        self.conversation.save(update_fields=['is_pinned'])
+        self.assertIsNotNone(Conversation.objects.get(pk=self.conversation.pk).search_vector)
+        
+        self.conversation.title = 'Renamed'
+        self.conversation.save(update_fields=['title'])
+        self.assertIsNone(Conversation.objects.get(pk=self.conversation.pk).search_vector)
+    
+    @override_settings(CHAT_SEARCH_INDEX_DELAY=7)
+    @patch('apps.chat.search.full_text_supported', return_value=True)
+    @patch('apps.chat.tasks.index_search_task.apply_async')
+    def test_writes_queue_one_run(self, mock_apply_async, mock_supported):
+        """Test a burst of writes queues a single delayed indexing run"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for content in ('one', 'two', 'three'):
+                ChatMessage.objects.create(
+                    conversation=self.conversation,
+                    user=self.user,
+                    message_type=ChatMessage.MessageType.USER,
+                    content=content
+                )
+        
+        mock_apply_async.assert_called_once_with(countdown=7, retry=False)
+    
+    @patch('apps.chat.search.full_text_supported', return_value=True)
+    @patch('apps.chat.tasks.index_search_task.apply_async', side_effect=ConnectionError('broker down'))
+    def test_schedule_failure_is_not_retried_per_write(self, mock_apply_async, mock_supported):
+        """Test writes after a failed enqueue do not each wait on the broker again"""
+        schedule_search_indexing()
+        schedule_search_indexing()
+        
+        mock_apply_async.assert_called_once()
+        self.assertTrue(cache.get(INDEX_SCHEDULED_KEY))
@@ -0,0 +1,203 @@
+import json
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch, MagicMock
+
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.services import AIService, ChatService
+from apps.core.http import AsyncUpstreamClient, CircuitBreaker
+
+
+def make_response(lines):
+    """Build a fake streamed upstream response yielding the given lines."""
+    response = MagicMock()
+    response.iter_lines.return_value = [line.encode('utf-8') for line in lines]
+    return response
+
+
+class AIServiceStreamTest(SimpleTestCase):
+    """Test cases for AIService streaming against the RAG upstream"""
+    
+    def setUp(self):
+        caches['answers'].clear()
+        self.service = AIService()
+        patcher = patch('apps.chat.services.get_upstream_client')
+        self.mock_client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+    
+    def stream(self, lines):
+        self.mock_client.post.return_value = make_response(lines)
+        return list(self.service._call_rag_api_stream('How do GSRs work?'))
+    
+    def test_ndjson_stream_forwards_deltas(self):
+        """Test chunked NDJSON items are forwarded as Markdown deltas"""
+        chunks = self.stream([
+            json.dumps({'type': 'begin'}),
+            json.dumps({'type': 'item', 'content': '<p>Hello '}),
+            json.dumps({'type': 'item', 'content': 'world</p>'}),
+            json.dumps({'type': 'end', 'Document Names': ['Guide.docx']}),
+        ])
+        
+        deltas = [c['content'] for c in chunks if c['type'] == 'delta']
+        self.assertEqual(deltas, ['Hello ', 'world\n\n'])
+        self.assertEqual(chunks[-1]['type'], 'complete')
+        self.assertEqual(chunks[-1]['response'], 'Hello world\n\n')
+        
+        _, kwargs = self.mock_client.post.call_args
+        self.assertTrue(kwargs['stream'])
+        # The client applies RAG_HTTP_CONNECT_TIMEOUT / RAG_HTTP_READ_TIMEOUT
+        self.assertNotIn('timeout', kwargs)
+    
+    def test_sse_stream_forwards_deltas(self):
+        """Test SSE data frames are forwarded as deltas"""
+        chunks = self.stream([
+            ': keep-alive',
+            'data: {"type": "delta", "content": "Hi"}',
+            'data: {"content": " there", "sources": ["Doc.pdf"]}',
+            'data: [DONE]',
+        ])
+        
+        deltas = [c['content'] for c in chunks if c['type'] == 'delta']
+        self.assertEqual(''.join(deltas), 'Hi there')
+        self.assertEqual(chunks[-1]['sources'], ['Doc.pdf'])
+    
+    def test_buffered_body_falls_back_to_replay(self):
+        """Test a plain JSON body is replayed as deltas"""
+        body = json.dumps([{'content': 'One two', 'Document Names': ['A.docx']}], indent=2)
+        chunks = self.stream(body.splitlines())
+        
+        deltas = [c['content'] for c in chunks if c['type'] == 'delta']
+        self.assertEqual(''.join(deltas), 'One two')
+        self.assertEqual(chunks[-1]['type'], 'complete')
+        self.assertEqual(chunks[-1]['sources'], ['A.docx'])
+    
+    @override_settings(ANSWER_CACHE_ENABLED=False)
+    @patch('apps.chat.services.time.time')
+    def test_records_time_to_first_token(self, mock_time):
+        """Test TTFB and total latency are reported separately"""
+        mock_time.side_effect = [10.0, 10.25, 10.5, 11.0]
+        self.mock_client.post.return_value = make_response([
+            json.dumps({'type': 'item', 'content': 'a '}),
+            json.dumps({'type': 'item', 'content': 'b '}),
+        ])
+        
+        chunks = list(self.service.generate_response_stream('q'))
+        
+        complete = chunks[-1]
+        self.assertEqual(complete['type'], 'complete')
+        self.assertEqual(complete['time_to_first_token_ms'], 250)
+        self.assertEqual(complete['response_time_ms'], 1000)
+
+
+class AIServiceAsyncStreamTest(SimpleTestCase):
+    """Test cases for the non-blocking (ASGI) streaming path"""
+    
+    def setUp(self):
+        caches['answers'].clear()
+    
+    def stream(self, handler):
+        client = AsyncUpstreamClient('rag', CircuitBreaker('rag'))
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        
+        async def collect():
+            with patch('apps.chat.services.get_async_upstream_client', return_value=client):
+                return [chunk async for chunk in AIService().agenerate_response_stream('q')]
+        
+        return async_to_sync(collect)()
+    
+    def test_async_stream_forwards_deltas(self):
+        """Test the async path yields the same chunks as the sync one"""
+        body = '\n'.join([
+            json.dumps({'type': 'item', 'content': 'Hello '}),
+            json.dumps({'type': 'item', 'content': 'world'}),
+            json.dumps({'type': 'end'}),
+        ])
+        chunks = self.stream(lambda request: httpx.Response(200, text=body))
+        
+        deltas = [c['content'] for c in chunks if c['type'] == 'delta']
+        self.assertEqual(deltas, ['Hello ', 'world'])
+        self.assertEqual(chunks[-1]['type'], 'complete')
+        self.assertIsNotNone(chunks[-1]['time_to_first_token_ms'])
+    
+    def test_async_stream_upstream_error(self):
+        """Test an upstream 5xx becomes an error chunk"""
+        chunks = self.stream(lambda request: httpx.Response(503))
+        
+        self.assertEqual(chunks[-1]['type'], 'error')
+        self.assertFalse(chunks[-1]['success'])
+
+
+class ChatServiceStreamPersistenceTest(TestCase):
+    """Test cases for write-behind persistence of streamed turns"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='streamer',
+            email='streamer@example.com',
+            password='testpass123'
+        )
+        self.service = ChatService()
+    
+    def run_turn(self, chunks):
+        with patch.object(self.service.ai_service, 'generate_response_stream', return_value=iter(chunks)):
+            with CaptureQueriesContext(connection) as ctx:
+                events = list(self.service.process_chat_message_stream(self.user, 'Hello'))
+        return events, ctx
+    
+    def count_updates(self, ctx, table):
+        return sum(
+            1 for query in ctx.captured_queries
+            if query['sql'].startswith('UPDATE') and f'"{table}"' in query['sql']
+        )
+    
+    @override_settings(CHAT_STREAM_FLUSH_INTERVAL_MS=60000, CHAT_STREAM_FLUSH_BYTES=2048)
+    def test_deltas_are_batched(self):
+        """Test deltas are flushed on the size threshold instead of per chunk"""
+        deltas = [{'type': 'delta', 'content': 'x' * 100} for _ in range(50)]
+        complete = {'type': 'complete', 'response': 'x' * 5000, 'sources': [], 'tokens_used': 10}
+        
+        events, ctx = self.run_turn(deltas + [complete])
+        
+        # 5000 bytes of deltas -> two size-triggered flushes, plus the final one
+        self.assertEqual(self.count_updates(ctx, 'chat_messages'), 3)
+        self.assertEqual(self.count_updates(ctx, 'chat_conversations'), 1)
+        
+        message = ChatMessage.objects.get(id=events[-1]['assistant_message_id'])
+        self.assertEqual(message.status, ChatMessage.MessageStatus.COMPLETED)
+        self.assertEqual(message.content, 'x' * 5000)
+        
+        conversation = Conversation.objects.get(id=events[-1]['conversation_id'])
+        self.assertEqual(conversation.total_messages, 2)
+    
+    @override_settings(CHAT_STREAM_FLUSH_INTERVAL_MS=60000, CHAT_STREAM_FLUSH_BYTES=2048)
+    def test_partial_content_flushed_on_disconnect(self):
+        """Test the rest of the stream is drained and persisted when the client goes away"""
+        deltas = [{'type': 'delta', 'content': 'partial '} for _ in range(3)]
+        with patch.object(self.service.ai_service, 'generate_response_stream', return_value=iter(deltas)), \
+                patch.object(self.service, '_start_background', side_effect=lambda target, name: target()):
+            stream = self.service.process_chat_message_stream(self.user, 'Hello')
+            first = next(stream)
+            stream.close()
+        
+        message = ChatMessage.objects.get(id=first['assistant_message_id'])
+        self.assertEqual(message.content, 'partial ' * 3)
+    
+    def test_streamed_sources_kept_when_turn_fails(self):
+        """Test sources from a source_document event survive a stream that ends in an error"""
+        chunks = [
+            {'type': 'delta', 'content': 'Partial'},
+            {'type': 'source_document', 'source': ['Guide.pdf']},
+            {'type': 'error', 'response': 'An error occurred', 'error': 'upstream reset'},
+        ]
+        
+        events, _ = self.run_turn(chunks)
+        
+        message = ChatMessage.objects.get(id=events[-1]['assistant_message_id'])
+        self.assertEqual(message.status, ChatMessage.MessageStatus.FAILED)
+        self.assertEqual(message.sources, ['Guide.pdf'])
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from apps.chat.sse import TICK, SSEEncoder, awith_ticks, with_ticks
+
+
+def parse(frames):
+    """Decode data frames, skipping comments."""
+    return [json.loads(frame.split(b'data: ', 1)[1]) for frame in frames if not frame.startswith(b':')]
+
+
+class SSEEncoderTest(SimpleTestCase):
+    """Test cases for SSE frame encoding"""
+    
+    IDS = {'conversation_id': 'c1', 'user_message_id': 'u1', 'assistant_message_id': 'a1'}
+    
+    def deltas(self, words):
+        return [
+            {'type': 'delta', 'content': word, 'event_id': i, 'model_used': 'rag', **self.IDS}
+            for i, word in enumerate(words, start=1)
+        ]
+    
+    def test_deltas_are_merged_by_size(self):
+        """Test deltas are coalesced until the byte threshold"""
+        encoder = SSEEncoder(flush_bytes=8, flush_interval_ms=60000, heartbeat_seconds=0)
+        events = self.deltas(['one ', 'two ', 'three ', 'four']) + [{'type': 'complete', 'event_id': 5, **self.IDS}]
+        
+        frames = list(encoder.encode(events))
+        decoded = parse(frames)
+        
+        self.assertEqual(decoded[0], {'type': 'start', **self.IDS})
+        self.assertEqual(decoded[1], {'type': 'delta', 'content': 'one two ', 'event_id': 2})
+        self.assertEqual(decoded[2], {'type': 'delta', 'content': 'three four', 'event_id': 4})
+        self.assertEqual(decoded[3], {'type': 'complete', 'event_id': 5})
+        self.assertTrue(frames[1].startswith(b'id: 2\n'))
+    
+    def test_tick_flushes_after_interval(self):
+        """Test pending deltas go out on an idle tick once the interval passed"""
+        encoder = SSEEncoder(flush_bytes=1024, flush_interval_ms=10, heartbeat_seconds=0)
+        encoder.feed(self.deltas(['Hi'])[0])
+        
+        time.sleep(0.02)
+        
+        self.assertEqual(parse(encoder.feed(TICK)), [{'type': 'delta', 'content': 'Hi', 'event_id': 1}])
+    
+    def test_heartbeat_when_idle(self):
+        """Test a comment frame is sent after the heartbeat interval"""
+        encoder = SSEEncoder(heartbeat_seconds=0.01)
+        self.assertEqual(encoder.tick(), [])
+        
+        time.sleep(0.02)
+        
+        self.assertEqual(encoder.tick(), [b': keep-alive\n\n'])
+
+
+class TickSourceTest(SimpleTestCase):
+    """Test cases for idle ticks and read-ahead limits"""
+    
+    def test_ticks_while_source_is_idle(self):
+        """Test TICK is yielded while waiting, then the item"""
+        def slow():
+            time.sleep(0.05)
+            yield 'item'
+        
+        items = list(with_ticks(slow(), interval=0.01))
+        
+        self.assertIn(TICK, items)
+        self.assertEqual([item for item in items if item is not TICK], ['item'])
+    
+    def test_reader_stops_when_consumer_stalls(self):
+        """Test the reader thread does not run ahead of a stalled consumer"""
+        pulled = []
+        
+        def source():
+            for i in range(100):
+                pulled.append(i)
+                yield i
+        
+        stream = with_ticks(source(), interval=0.01, max_pending=2)
+        self.assertEqual(next(stream), 0)
+        time.sleep(0.05)
+        
+        self.assertLessEqual(len(pulled), 4)
+        stream.close()
+    
+    def test_errors_are_raised_to_consumer(self):
+        """Test a failing source raises in the consuming thread"""
+        def failing():
+            yield 'first'
+            raise ValueError('upstream broke')
+        
+        stream = with_ticks(failing(), interval=1)
+        self.assertEqual(next(stream), 'first')
+        with self.assertRaises(ValueError):
+            next(stream)
+    
+    def test_async_ticks(self):
+        """Test the async variant ticks without losing the pending item"""
+        async def slow():
+            await asyncio.sleep(0.05)
+            yield 'item'
+        
+        async def run():
+            return [item async for item in awith_ticks(slow(), interval=0.01)]
+        
+        items = async_to_sync(run)()
+        
+        self.assertIn(TICK, items)
+        self.assertEqual([item for item in items if item is not TICK], ['item'])
@@ -0,0 +1,47 @@
+import re
+
+from django.test import SimpleTestCase
+
+from apps.chat.streaming import IncrementalMarkdownConverter, html_to_markdown
+
+
+def normalize(markdown):
+    return re.sub(r'\n{3,}', '\n\n', markdown).strip()
+
+
+class IncrementalMarkdownConverterTest(SimpleTestCase):
+    """Test cases for streaming HTML-to-Markdown conversion"""
+    
+    DOCUMENT = (
+        '<h2>Filing</h2><p>Use <b>form 12</b> for snake_case fields, see '
+        '<a href="https://example.com/a_b">the guide</a>.</p>'
+        '<ul><li>Step one</li><li>Step <i>two</i></li></ul><p>Done.</p>'
+    )
+    
+    def convert(self, html, size):
+        converter = IncrementalMarkdownConverter()
+        pieces = [converter.feed(html[i:i + size]) for i in range(0, len(html), size)]
+        pieces.append(converter.close())
+        return pieces
+    
+    def test_matches_full_conversion(self):
+        """Test any split of the input yields the same Markdown as one conversion"""
+        expected = normalize(html_to_markdown(self.DOCUMENT))
+        
+        for size in (1, 3, 7, 50, len(self.DOCUMENT)):
+            with self.subTest(size=size):
+                self.assertEqual(normalize(''.join(self.convert(self.DOCUMENT, size))), expected)
+    
+    def test_paragraph_text_streams_before_close(self):
+        """Test words inside an open paragraph are released without waiting for </p>"""
+        converter = IncrementalMarkdownConverter()
+        
+        self.assertEqual(converter.feed('<p>Hello wor'), 'Hello ')
+        self.assertEqual(converter.feed('ld</p>'), 'world\n\n')
+    
+    def test_blocks_are_held_until_closed(self):
+        """Test a list is only converted once it is complete"""
+        converter = IncrementalMarkdownConverter()
+        
+        self.assertEqual(converter.feed('<ul><li>one</li>'), '')
+        self.assertEqual(converter.feed('<li>two</li></ul>'), '- one\n- two\n\n')
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.utils import timezone
+from unittest.mock import patch
+
+from apps.chat.models import ChatMessage, Conversation
+from apps.chat.services import ChatService
+from apps.chat.tasks import fail_stale_messages_task, process_chat_message_task
+
+
+class BackgroundChatTest(TestCase):
+    """Test cases for chat turns answered on the Celery 'chat' queue"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='queued',
+            email='queued@example.com',
+            password='testpass123'
+        )
+        self.service = ChatService()
+    
+    @patch('apps.chat.tasks.process_chat_message_task.apply_async')
+    def test_enqueue_creates_pending_turn(self, mock_apply_async):
+        """Test enqueueing stores the turn and passes IDs to the task"""
+        result = self.service.enqueue_chat_message(self.user, 'Hello')
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(result['assistant_message'].status, ChatMessage.MessageStatus.PENDING)
+        kwargs = mock_apply_async.call_args.kwargs['kwargs']
+        self.assertEqual(kwargs['assistant_message_id'], str(result['assistant_message'].id))
+        self.assertEqual(kwargs['user_message_id'], str(result['user_message'].id))
+        self.assertEqual(kwargs['message_content'], 'Hello')
+    
+    @patch('apps.chat.tasks.process_chat_message_task.apply_async', side_effect=ConnectionError('broker down'))
+    def test_enqueue_failure_fails_message(self, mock_apply_async):
+        """Test a broker outage fails the turn instead of leaving it pending"""
+        result = self.service.enqueue_chat_message(self.user, 'Hello')
+        
+        self.assertFalse(result['success'])
+        message = ChatMessage.objects.get(message_type=ChatMessage.MessageType.ASSISTANT)
+        self.assertEqual(message.status, ChatMessage.MessageStatus.FAILED)
+        self.assertEqual(message.conversation.total_messages, 2)
+    
+    @patch('apps.chat.tasks.process_chat_message_task.apply_async')
+    def test_task_answers_message_once(self, mock_apply_async):
+        """Test the worker completes the message and ignores redelivery"""
+        self.service.enqueue_chat_message(self.user, 'Hello')
+        kwargs = mock_apply_async.call_args.kwargs['kwargs']
+        chunks = [
+            {'type': 'delta', 'content': 'Hi there'},
+            {'type': 'complete', 'response': 'Hi there', 'sources': ['Doc.pdf'], 'tokens_used': 5},
+        ]
+        
+        with patch('apps.chat.services.AIService.generate_response_stream', return_value=iter(chunks)) as mock_stream:
+            first = process_chat_message_task(**kwargs)
+            second = process_chat_message_task(**kwargs)
+        
+        self.assertEqual(first, ChatMessage.MessageStatus.COMPLETED)
+        self.assertIsNone(second)
+        self.assertEqual(mock_stream.call_count, 1)
+        
+        message = ChatMessage.objects.get(id=kwargs['assistant_message_id'])
+        self.assertEqual(message.content, 'Hi there')
+        self.assertEqual(message.sources, ['Doc.pdf'])
+        self.assertEqual(message.conversation.total_messages, 2)
+        self.assertEqual(message.conversation.total_tokens_used, 5)
+    
+    @patch('apps.chat.tasks.process_chat_message_task.apply_async')
+    def test_chat_view_returns_202(self, mock_apply_async):
+        """Test background requests return IDs and status URLs immediately"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        
+        response = client.post('/api/chat/', {'message': 'Hello', 'background': True}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['assistant_message']['status'], ChatMessage.MessageStatus.PENDING)
+        self.assertTrue(Conversation.objects.filter(id=response.data['conversation_id']).exists())
+        
+        poll = client.get(response.data['status_url'])
+        self.assertEqual(poll.status_code, status.HTTP_200_OK)
+        self.assertEqual(poll.data['id'], response.data['assistant_message']['id'])
+    
+    @patch('apps.chat.tasks.process_chat_message_task.apply_async')
+    def test_sweep_fails_messages_of_lost_workers(self, mock_apply_async):
+        """Test a turn whose producer died is failed and counted, a live one is left alone"""
+        lost = self.service.enqueue_chat_message(self.user, 'Hello')['assistant_message']
+        live = self.service.enqueue_chat_message(self.user, 'Hi')['assistant_message']
+        ChatMessage.objects.filter(id=lost.id).update(
+            status=ChatMessage.MessageStatus.PROCESSING,
+            content='Partial',
+            updated_at=timezone.now() - timezone.timedelta(hours=1)
+        )
+        ChatMessage.objects.filter(id=live.id).update(status=ChatMessage.MessageStatus.PROCESSING)
+        
+        self.assertEqual(fail_stale_messages_task(), 1)
+        
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, ChatMessage.MessageStatus.FAILED)
+        self.assertEqual(lost.content, 'Partial')
+        self.assertEqual(lost.conversation.total_messages, 2)
+        live.refresh_from_db()
+        self.assertEqual(live.status, ChatMessage.MessageStatus.PROCESSING)
@@ -1,28 +1,46 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'chat'
 
+# Streaming endpoints need their async views under ASGI and the sync ones under WSGI
+EventsView = views.AsyncChatMessageEventsView if settings.CHAT_ASYNC_STREAMING else views.ChatMessageEventsView
+
 urlpatterns = [
     # Main chat endpoint
     path('', views.ChatView.as_view(), name='chat'),
-    path('stream/', views.ChatStreamView.as_view(), name='chat_stream'),
+    path(
+        'stream/',
+        views.AsyncChatStreamView.as_view() if settings.CHAT_ASYNC_STREAMING else views.ChatStreamView.as_view(),
+        name='chat_stream'
+    ),
     
     # Conversation management
     path('conversations/', views.ConversationListView.as_view(), name='conversation_list'),
     path('conversations/<uuid:pk>/', views.ConversationDetailView.as_view(), name='conversation_detail'),
     path('conversations/<uuid:conversation_id>/history/', views.ConversationHistoryView.as_view(), name='conversation_history'),
+    path('conversations/<uuid:conversation_id>/events/', EventsView.as_view(), name='conversation_events'),
     path('conversations/<uuid:conversation_id>/archive/', views.archive_conversation, name='archive_conversation'),
     path('conversations/<uuid:conversation_id>/delete/', views.delete_conversation, name='delete_conversation'),
     path('conversations/<uuid:conversation_id>/export/', views.export_conversation, name='export_conversation'),
     path('conversations/<uuid:conversation_id>/pin/', views.pin_conversation, name='pin_conversation'),
+    path('conversations/bulk/', views.bulk_conversation_action, name='bulk_conversation_action'),
     path('conversations/clear-all/', views.clear_all_conversations, name='clear_all_conversations'),
+    path('conversations/export/', views.export_conversations, name='export_conversations'),
+    path('conversations/purge-status/', views.purge_status, name='purge_status'),
+    path('search/', views.ChatSearchView.as_view(), name='chat_search'),
+    
+    # Background messages (poll or subscribe)
+    path('messages/<uuid:message_id>/', views.ChatMessageDetailView.as_view(), name='message_detail'),
+    path('messages/<uuid:message_id>/events/', EventsView.as_view(), name='message_events'),
     
     # Message feedback
     path('messages/<uuid:message_id>/feedback/', views.MessageFeedbackView.as_view(), name='message_feedback'),
     
     # New feedback APIs
     path('feedback/', views.FeedbackView.as_view(), name='feedback'),
+    path('feedback/batch/', views.FeedbackBatchView.as_view(), name='feedback_batch'),
     path('feedbacks/', views.FeedbackListView.as_view(), name='feedbacks'),
     path('feedback/analytics/', views.RAGFeedbackAnalyticsView.as_view(), name='rag_feedback_analytics'),
     
@@ -2,26 +2,72 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.http import StreamingHttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.exceptions import InvalidToken
+from django.conf import settings
+from django.urls import reverse
 import json
 
+from apps.authentication.authentication import PresenceJWTAuthentication
 from .models import Conversation, ChatMessage, ChatTemplate, Folder
 from .serializers import (
+    BulkConversationActionSerializer,
     ConversationSerializer,
     ConversationDetailSerializer,
+    ConversationExportSerializer,
     ChatMessageSerializer,
     ChatRequestSerializer,
     MessageFeedbackSerializer,
     ChatTemplateSerializer,
     ConversationStatsSerializer,
+    FeedbackBatchSerializer,
     FolderSerializer,
     RAGMessageSerializer
 )
+from . import export
+from .events import afollow_message_events, follow_message_events
+from .pagination import MessageCursorPagination
+from .purge import hide_conversations, purge_progress
+from .rollups import usage_by_day, usage_totals
+from .search import search_conversations
 from .services import ChatService, FeedbackService
+from .sse import TICK, SSEEncoder, awith_ticks, sse_frame
 from apps.authentication.permissions import IsOwnerOrAdmin, IsAdminUser
+from apps.core import outbox
+from apps.core.counters import counters
+
+
+async def authenticate_jwt(request):
+    """Authenticate an async (non-DRF) view request with the API's JWT scheme.
+    
+    Returns:
+        Tuple of (user, None) on success or (None, error response)
+    """
+    return await sync_to_async(authenticate_jwt_sync)(request)
+
+
+def authenticate_jwt_sync(request):
+    """Blocking variant of ``authenticate_jwt`` for plain sync views."""
+    try:
+        auth_result = PresenceJWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed) as e:
+        return None, JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if auth_result is None:
+        return None, JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    return auth_result[0], None
 
 
 class ChatView(APIView):
@@ -38,6 +84,9 @@ class ChatView(APIView):
         serializer.is_valid(raise_exception=True)
         
         chat_service = ChatService()
+        if serializer.validated_data.get('background'):
+            return self._enqueue(chat_service, request, serializer.validated_data)
+        
         result = chat_service.process_chat_message(
             user=request.user,
             message_content=serializer.validated_data['message'],
@@ -60,6 +109,31 @@ class ChatView(APIView):
                 'error': 'Failed to process chat message',
                 'detail': result.get('error', 'Unknown error')
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def _enqueue(self, chat_service, request, validated_data):
+        """Queue the AI response and return 202 with the IDs to poll or subscribe to."""
+        result = chat_service.enqueue_chat_message(
+            user=request.user,
+            message_content=validated_data['message'],
+            conversation_id=validated_data.get('conversation_id'),
+            template_id=validated_data.get('template_id'),
+            folder_id=validated_data.get('folder_id')
+        )
+        
+        if not result['success']:
+            return Response({
+                'error': 'Failed to queue chat message',
+                'detail': result.get('error', 'Unknown error')
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        assistant_message_id = result['assistant_message'].id
+        return Response({
+            'conversation_id': result['conversation_id'],
+            'user_message': ChatMessageSerializer(result['user_message']).data,
+            'assistant_message': ChatMessageSerializer(result['assistant_message']).data,
+            'status_url': reverse('chat:message_detail', args=[assistant_message_id]),
+            'events_url': reverse('chat:message_events', args=[assistant_message_id])
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class ChatStreamView(APIView):
@@ -102,23 +176,23 @@ class ChatStreamView(APIView):
             """Generator function for streaming response."""
             logger.info("Starting generate_stream function")
             chat_service = ChatService()
+            encoder = SSEEncoder()
             
             try:
                 logger.info("About to call process_chat_message_stream")
-                chunk_count = 0
-                for chunk in chat_service.process_chat_message_stream(
+                frame_count = 0
+                for frame in encoder.encode(chat_service.process_chat_message_stream(
                     user=request.user,
                     message_content=serializer.validated_data['message'],
                     conversation_id=serializer.validated_data.get('conversation_id'),
                     template_id=serializer.validated_data.get('template_id'),
-                    folder_id=serializer.validated_data.get('folder_id')
-                ):
-                    chunk_count += 1
-                    # Format chunk as Server-Sent Event
-                    event_data = json.dumps(chunk)
-                    yield f"data: {event_data}\n\n"
+                    folder_id=serializer.validated_data.get('folder_id'),
+                    idle_tick=encoder.flush_interval
+                )):
+                    frame_count += 1
+                    yield frame
                 
-                logger.info(f"Stream completed with {chunk_count} chunks")
+                logger.info(f"Stream completed with {frame_count} frames")
                     
             except Exception as e:
                 # Send error event
@@ -129,8 +203,7 @@ class ChatStreamView(APIView):
                     'error': str(e),
                     'success': False
                 }
-                event_data = json.dumps(error_chunk)
-                yield f"data: {event_data}\n\n"
+                yield sse_frame(error_chunk)
         
         response = StreamingHttpResponse(
             generate_stream(),
@@ -145,6 +218,184 @@ class ChatStreamView(APIView):
         return response
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatStreamView(View):
+    """Async streaming chat endpoint, served under ASGI (ai_agent.asgi).
+    
+    Mirrors ChatStreamView but never blocks the worker while waiting on the
+    RAG webhook, so one worker can hold many open streams. DRF views are
+    sync-only, so authentication and validation are done explicitly here.
+    """
+    
+    CORS_HEADERS = {
+        'Access-Control-Allow-Headers': 'Cache-Control, Authorization, Content-Type',
+        'Access-Control-Allow-Methods': 'POST, OPTIONS',
+        'Access-Control-Allow-Credentials': 'true',
+    }
+    
+    async def options(self, request, *args, **kwargs):
+        """Handle preflight CORS requests."""
+        response = HttpResponse()
+        response['Access-Control-Allow-Origin'] = 'http://localhost:3000, https://omadligrouphq.com'
+        for header, value in self.CORS_HEADERS.items():
+            response[header] = value
+        return response
+    
+    async def post(self, request):
+        """Send a chat message and get streaming AI response."""
+        user, error_response = await authenticate_jwt(request)
+        if error_response:
+            return error_response
+        
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Serializer validators hit the database, so run them in a thread
+        request.user = user
+        serializer = ChatRequestSerializer(data=data, context={'request': request})
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        validated_data = serializer.validated_data
+        
+        async def generate_stream():
+            """Async generator for streaming response."""
+            chat_service = ChatService()
+            encoder = SSEEncoder()
+            try:
+                async for frame in encoder.aencode(chat_service.aprocess_chat_message_stream(
+                    user=user,
+                    message_content=validated_data['message'],
+                    conversation_id=validated_data.get('conversation_id'),
+                    template_id=validated_data.get('template_id'),
+                    folder_id=validated_data.get('folder_id'),
+                    idle_tick=encoder.flush_interval
+                )):
+                    yield frame
+            except Exception as e:
+                error_chunk = {
+                    'type': 'error',
+                    'response': 'An error occurred while processing your message.',
+                    'sources': [],
+                    'error': str(e),
+                    'success': False
+                }
+                yield sse_frame(error_chunk)
+        
+        response = StreamingHttpResponse(
+            generate_stream(),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['Access-Control-Allow-Origin'] = 'http://localhost:3000'
+        for header, value in self.CORS_HEADERS.items():
+            response[header] = value
+        
+        return response
+
+
+class ChatMessageDetailView(generics.RetrieveAPIView):
+    """Poll a single message, e.g. a background response queued by ChatView."""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ChatMessageSerializer
+    lookup_url_kwarg = 'message_id'
+    
+    def get_queryset(self):
+        if self.request.user.is_admin:
+            return ChatMessage.objects.all()
+        return ChatMessage.objects.filter(user=self.request.user)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatMessageEventsView(View):
+    """Server-sent events of a streamed or background message, resumable.
+    
+    Replays the events numbered after ``Last-Event-ID`` (header, or
+    ``last_event_id`` query parameter for fetch-based clients) from the
+    message's StreamEventLog, then follows the live stream until it ends.
+    Nothing is sent upstream again, so reconnecting tabs and additional
+    tabs share the one RAG call.
+    
+    Sync view for WSGI, where Django would buffer an async iterator whole;
+    each subscriber holds a worker thread while it waits. With
+    CHAT_ASYNC_STREAMING the urls use AsyncChatMessageEventsView instead.
+    """
+    
+    def get(self, request, message_id=None, conversation_id=None):
+        """Stream the events of a message, or of a conversation's latest answer."""
+        user, error_response = authenticate_jwt_sync(request)
+        if error_response:
+            return error_response
+        
+        message_id = self.get_messages(user, message_id, conversation_id).values_list('id', flat=True).first()
+        if message_id is None:
+            return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return self.event_stream_response(self.generate_events(message_id, self._last_event_id(request)))
+    
+    def generate_events(self, message_id, last_event_id):
+        """Generator of SSE frames for one message."""
+        def events():
+            for event in follow_message_events(message_id, after=last_event_id, ticks=True):
+                if event is not TICK:
+                    event.setdefault('assistant_message_id', str(message_id))
+                yield event
+        
+        yield from SSEEncoder().encode(events())
+    
+    def get_messages(self, user, message_id=None, conversation_id=None):
+        messages = ChatMessage.objects.filter(message_type=ChatMessage.MessageType.ASSISTANT)
+        if not user.is_admin:
+            messages = messages.filter(user=user)
+        if conversation_id:
+            return messages.filter(conversation_id=conversation_id).order_by('-created_at')
+        return messages.filter(id=message_id)
+    
+    def event_stream_response(self, frames):
+        response = StreamingHttpResponse(frames, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    def _last_event_id(self, request):
+        value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            return 0
+
+
+class AsyncChatMessageEventsView(ChatMessageEventsView):
+    """Async variant of ChatMessageEventsView, served under ASGI (ai_agent.asgi).
+    
+    Waiting uses asyncio.sleep, so a subscriber does not hold a worker thread.
+    """
+    
+    async def get(self, request, message_id=None, conversation_id=None):
+        """Stream the events of a message, or of a conversation's latest answer."""
+        user, error_response = await authenticate_jwt(request)
+        if error_response:
+            return error_response
+        
+        message_id = await self.get_messages(user, message_id, conversation_id).values_list('id', flat=True).afirst()
+        if message_id is None:
+            return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return self.event_stream_response(self.generate_events(message_id, self._last_event_id(request)))
+    
+    async def generate_events(self, message_id, last_event_id):
+        """Async generator of SSE frames for one message."""
+        async def events():
+            async for event in afollow_message_events(message_id, after=last_event_id):
+                event.setdefault('assistant_message_id', str(message_id))
+                yield event
+        
+        encoder = SSEEncoder()
+        async for frame in encoder.aencode(awith_ticks(events(), encoder.flush_interval)):
+            yield frame
+
+
 class ConversationListView(generics.ListCreateAPIView):
     """List and create user's conversations."""
     
@@ -152,7 +403,7 @@ class ConversationListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        queryset = self.request.user.conversations.all()
+        queryset = self.request.user.conversations.select_related('user', 'folder')
         
         # Filter by archived status
         is_archived = self.request.query_params.get('archived')
@@ -198,13 +449,41 @@ class ConversationDetailView(generics.RetrieveUpdateDestroyAPIView):
         if self.request.method == 'GET':
             return ConversationDetailSerializer
         return ConversationSerializer
+    
+    def perform_destroy(self, instance):
+        """Hide the conversation; it and its messages are purged in the background."""
+        hide_conversations(Conversation.objects.filter(pk=instance.pk))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Return the conversation with its latest window of messages."""
+        conversation = self.get_object()
+        
+        paginator = MessageCursorPagination()
+        messages = paginator.paginate_queryset(
+            conversation.messages.select_related('user'), request, view=self
+        )
+        # Older windows are served by the history endpoint
+        paginator.base_url = request.build_absolute_uri(
+            reverse('chat:conversation_history', kwargs={'conversation_id': conversation.id})
+        )
+        
+        context = self.get_serializer_context()
+        context['messages'] = messages
+        context['messages_next'] = paginator.get_next_link()
+        serializer = self.get_serializer(conversation, context=context)
+        return Response(serializer.data)
 
 
 class ConversationHistoryView(generics.ListAPIView):
-    """Get chat history for a specific conversation."""
+    """Get chat history for a specific conversation, newest messages first.
+    
+    Cursor paginated (see MessageCursorPagination): follow ``next`` to load
+    older messages.
+    """
     
     serializer_class = ChatMessageSerializer
     permission_classes = [IsOwnerOrAdmin]
+    pagination_class = MessageCursorPagination
     
     def get_queryset(self):
         conversation_id = self.kwargs['conversation_id']
@@ -219,7 +498,45 @@ class ConversationHistoryView(generics.ListAPIView):
                 user=self.request.user
             )
         
-        return conversation.messages.all().order_by('created_at')
+        return conversation.messages.select_related('user')
+
+
+class ChatSearchView(APIView):
+    """Search the user's conversation titles and message contents.
+    
+    Results are ranked by relevance with highlighted snippets. Follow
+    ``next`` for more messages; conversation title matches come with the
+    first page only.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({
+                'error': 'q is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = min(int(request.query_params.get('limit', settings.CHAT_SEARCH_PAGE_SIZE)), settings.CHAT_SEARCH_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = settings.CHAT_SEARCH_PAGE_SIZE
+        
+        try:
+            result = search_conversations(
+                request.user, text,
+                cursor=request.query_params.get('cursor'),
+                limit=max(limit, 1)
+            )
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if result['next']:
+            result['next'] = replace_query_param(request.build_absolute_uri(), 'cursor', result['next'])
+        return Response(result, status=status.HTTP_200_OK)
 
 
 class MessageFeedbackView(APIView):
@@ -280,12 +597,12 @@ class FolderDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def perform_destroy(self, instance):
         """Delete all conversations in the folder before deleting the folder."""
-        # Delete all conversations in this folder
-        conversations_in_folder = instance.conversations.all()
-        conversations_in_folder.delete()
-        
-        # Now delete the folder
-        super().perform_destroy(instance)
+        with transaction.atomic():
+            # Hide the folder's conversations; they are purged in the background
+            hide_conversations(instance.conversations.all())
+            
+            # Now delete the folder
+            super().perform_destroy(instance)
 
 
 @api_view(['POST'])
@@ -341,7 +658,7 @@ def folder_conversations(request, folder_id):
         conversations = Conversation.objects.filter(
             folder=folder,
             user=request.user
-        ).order_by('-updated_at')
+        ).select_related('user', 'folder').order_by('-updated_at')
         
         serializer = ConversationSerializer(conversations, many=True)
         return Response({
@@ -391,52 +708,34 @@ class FeedbackView(APIView):
         # Set action based on feedback_type for webhook
         webhook_action = 'Good Response' if feedback_type == 'thumbs_up' else 'Bad Response'
         
-        # Send to webhook first
-        import requests
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        try:
-            webhook_url = "https://n8n.omadligrouphq.com/webhook/8ab1aff6-af35-4fd3-8098-eceedfc97ac0"
-            webhook_data = {
-                'userQuestion': user_question,
-                'content': content,
-                'sources': sources,
-                'action': webhook_action,
-                'messageId': message_id,
-                'timestamp': timestamp,
-                'formattedReport': formatted_report,
-                'feedback_type': feedback_type,
-                'user_id': request.user.id if request.user.is_authenticated else None
-            }
+        webhook_data = {
+            'userQuestion': user_question,
+            'content': content,
+            'sources': sources,
+            'action': webhook_action,
+            'messageId': message_id,
+            'timestamp': timestamp,
+            'formattedReport': formatted_report,
+            'feedback_type': feedback_type,
+            'user_id': request.user.id if request.user.is_authenticated else None
+        }
+        
+        # Both notifications are queued together and delivered in the background
+        with transaction.atomic():
+            outbox.enqueue('feedback.webhook', FeedbackService.FEEDBACK_WEBHOOK_URL, webhook_data)
             
-            webhook_response = requests.post(
-                webhook_url,
-                json=webhook_data,
-                timeout=10
+            # Use FeedbackService to submit to RAG API (legacy support)
+            feedback_service = FeedbackService()
+            result = feedback_service.submit_thumbs_feedback(
+                question=question,
+                answer=answer,
+                feedback_type=feedback_type,
+                comment=comment or action
             )
-            
-            if webhook_response.status_code == 200:
-                logger.info(f"Webhook feedback sent successfully: {message_id}")
-            else:
-                logger.warning(f"Webhook feedback failed with status {webhook_response.status_code}: {message_id}")
-                
-        except Exception as webhook_error:
-            logger.error(f"Webhook feedback error: {str(webhook_error)}")
-            # Don't fail the request if webhook fails
-        
-        # Use FeedbackService to submit to RAG API (legacy support)
-        feedback_service = FeedbackService()
-        result = feedback_service.submit_thumbs_feedback(
-            question=question,
-            answer=answer,
-            feedback_type=feedback_type,
-            comment=comment or action
-        )
         
         if result['success']:
             return Response({
-                'message': 'Feedback submitted successfully to RAG API and webhook',
+                'message': 'Feedback queued for RAG API and webhook',
                 'feedback_type': result['feedback_type'],
                 'response_time_ms': result['response_time_ms'],
                 'rag_response': result['response'],
@@ -451,6 +750,22 @@ class FeedbackView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class FeedbackBatchView(APIView):
+    """Store many message ratings at once; forwarding to the RAG API happens in the background."""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        """Rate many messages in one request."""
+        serializer = FeedbackBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        feedback_service = FeedbackService()
+        result = feedback_service.ingest_feedback_batch(request.user, serializer.validated_data['items'])
+        
+        return Response(result, status=status.HTTP_200_OK)
+
+
 class FeedbackListView(APIView):
     """List feedbacks with status filtering from RAG API."""
     
@@ -467,9 +782,9 @@ class FeedbackListView(APIView):
         if status_filter is not None:
             status_bool = status_filter.lower() == 'true'
         
-        # Use FeedbackService to get feedbacks from RAG API
+        # Served from the local cache; stale entries are refreshed in the background
         feedback_service = FeedbackService()
-        result = feedback_service.get_feedbacks_by_status(
+        result = feedback_service.get_cached_feedbacks_by_status(
             status=status_bool,
             date_from=date_from,
             date_to=date_to
@@ -480,9 +795,11 @@ class FeedbackListView(APIView):
             
             return Response({
                 'feedbacks': feedbacks,
-                'count': len(feedbacks),
+                'count': result['summary']['total_feedback'],
                 'status_filter': status_filter,
-                'source': 'RAG API'
+                'source': 'RAG API',
+                'cache': result['cache'],
+                'fetched_at': result['fetched_at']
             }, status=status.HTTP_200_OK)
         else:
             return Response({
@@ -504,31 +821,19 @@ class RAGFeedbackAnalyticsView(APIView):
         date_to = request.query_params.get('date_to')
         
         feedback_service = FeedbackService()
-        result = feedback_service.get_feedback_analytics(
+        result = feedback_service.get_cached_feedback_analytics(
             date_from=date_from,
             date_to=date_to
         )
         
         if result['success']:
-            analytics_data = result['data']
-            
-            # Add summary statistics
-            feedbacks = analytics_data.get('feedbacks', [])
-            thumbs_up_count = len([f for f in feedbacks if f.get('feedback_type') == 'thumbs_up'])
-            thumbs_down_count = len([f for f in feedbacks if f.get('feedback_type') == 'thumbs_down'])
-            total_feedback = len(feedbacks)
-            
-            satisfaction_rate = (thumbs_up_count / total_feedback * 100) if total_feedback > 0 else 0
-            
             return Response({
-                'analytics': analytics_data,
-                'summary': {
-                    'total_feedback': total_feedback,
-                    'thumbs_up_count': thumbs_up_count,
-                    'thumbs_down_count': thumbs_down_count,
-                    'satisfaction_rate': round(satisfaction_rate, 2)
-                },
+                'analytics': result['data'],
+                # Counted once per fetch, not per request
+                'summary': result['summary'],
                 'source': 'RAG API',
+                'cache': result['cache'],
+                'fetched_at': result['fetched_at'],
                 'date_range': {
                     'from': date_from,
                     'to': date_to
@@ -645,19 +950,47 @@ def delete_conversation(request, conversation_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_conversation_action(request):
+    """Archive, unarchive, pin, unpin, move or delete many conversations at once."""
+    serializer = BulkConversationActionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    chat_service = ChatService()
+    result = chat_service.bulk_update_conversations(
+        request.user,
+        serializer.validated_data['conversation_ids'],
+        serializer.validated_data['action'],
+        folder_id=serializer.validated_data.get('folder_id')
+    )
+    
+    if not result['success']:
+        return Response({
+            'error': result['error']
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(
+        result,
+        status=status.HTTP_202_ACCEPTED if result['queued'] else status.HTTP_200_OK
+    )
+
+
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def clear_all_conversations(request):
     """Clear all conversations and folders for the authenticated user."""
     try:
-        # Delete all conversations for the user
-        conversations_deleted = Conversation.objects.filter(user=request.user).delete()[0]
-        
-        # Delete all folders for the user
-        folders_deleted = Folder.objects.filter(user=request.user).delete()[0]
+        with transaction.atomic():
+            # Hide all conversations for the user; they are purged in the background
+            conversations_deleted = hide_conversations(Conversation.objects.filter(user=request.user))
+            
+            # Delete all folders for the user
+            folders_deleted = Folder.objects.filter(user=request.user).delete()[0]
         
         return Response({
-            'message': f'Successfully cleared {conversations_deleted} conversations and {folders_deleted} folders'
+            'message': f'Successfully cleared {conversations_deleted} conversations and {folders_deleted} folders',
+            'purge_status_url': reverse('chat:purge_status')
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -666,6 +999,13 @@ def clear_all_conversations(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def purge_status(request):
+    """Progress of the background purge of the user's deleted conversations."""
+    return Response(purge_progress(request.user), status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def export_conversation(request, conversation_id):
@@ -681,6 +1021,29 @@ def export_conversation(request, conversation_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_conversations(request):
+    """Stream all (or the selected) conversations as NDJSON or a ZIP of JSON files."""
+    serializer = ConversationExportSerializer(data={
+        'output': request.query_params.get('output', export.NDJSON),
+        'conversation_id': request.query_params.getlist('conversation_id')
+    })
+    serializer.is_valid(raise_exception=True)
+    output = serializer.validated_data['output']
+    conversation_ids = serializer.validated_data.get('conversation_id')
+    
+    if output == export.ZIP:
+        stream = export.export_zip(request.user, conversation_ids)
+    else:
+        stream = export.export_ndjson(request.user, conversation_ids)
+    
+    response = StreamingHttpResponse(stream, content_type=export.CONTENT_TYPES[output])
+    filename = f"conversations-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def pin_conversation(request, conversation_id):
@@ -713,29 +1076,15 @@ class AdminChatAnalyticsView(APIView):
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        """Get comprehensive chat analytics."""
+        """Get comprehensive chat analytics.
+        
+        Message, token and latency figures come from the hourly usage
+        rollups (apps.chat.rollups), current to ``refreshed_at``.
+        """
         # Total statistics
         total_conversations = Conversation.objects.count()
-        total_messages = ChatMessage.objects.count()
         total_users_with_chats = Conversation.objects.values('user').distinct().count()
-        
-        # Token usage
-        total_tokens = sum(
-            msg.tokens_used or 0 for msg in ChatMessage.objects.all()
-        )
-        
-        # Average response time
-        assistant_messages = ChatMessage.objects.filter(
-            message_type=ChatMessage.MessageType.ASSISTANT,
-            response_time_ms__isnull=False
-        )
-        
-        if assistant_messages.exists():
-            avg_response_time = sum(
-                msg.response_time_ms for msg in assistant_messages
-            ) / assistant_messages.count()
-        else:
-            avg_response_time = 0
+        usage = usage_totals()
         
         # Template usage
         template_stats = []
@@ -743,15 +1092,15 @@ class AdminChatAnalyticsView(APIView):
             template_stats.append({
                 'name': template.name,
                 'category': template.category,
-                'usage_count': template.usage_count,
+                'usage_count': counters.value(template, 'usage_count'),
                 'created_by': template.created_by.username if template.created_by else 'System'
             })
         
         # User activity
         top_users = []
         for conversation in Conversation.objects.values('user__username').annotate(
-            conversation_count=models.Count('id'),
-            message_count=models.Count('messages')
+            conversation_count=Count('id'),
+            message_count=Sum('total_messages')
         ).order_by('-conversation_count')[:10]:
             top_users.append({
                 'username': conversation['user__username'],
@@ -762,13 +1111,15 @@ class AdminChatAnalyticsView(APIView):
         return Response({
             'overview': {
                 'total_conversations': total_conversations,
-                'total_messages': total_messages,
+                'total_messages': usage['message_count'],
                 'total_users_with_chats': total_users_with_chats,
-                'total_tokens_used': total_tokens,
-                'avg_response_time_ms': round(avg_response_time, 2)
+                'total_tokens_used': usage['tokens_used'],
+                'avg_response_time_ms': round(usage['avg_response_time_ms'], 2)
             },
+            'daily_usage': usage_by_day(since=timezone.now() - timezone.timedelta(days=30)),
             'template_usage': template_stats,
-            'top_users': top_users
+            'top_users': top_users,
+            'refreshed_at': usage['refreshed_at']
         }, status=status.HTTP_200_OK)
 
 
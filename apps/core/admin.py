@@ -0,0 +1,36 @@
+from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .outbox import schedule_drain
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'topic', 'status', 'attempts', 'next_attempt_at',
+        'created_at', 'sent_at'
+    ]
+    list_filter = ['status', 'topic', 'created_at']
+    search_fields = ['topic', 'url', 'last_error']
+    readonly_fields = [
+        'topic', 'url', 'payload', 'attempts', 'last_error',
+        'created_at', 'sent_at'
+    ]
+    ordering = ['-created_at']
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        """Retry selected pending or dead messages right away"""
+        updated = queryset.exclude(status=OutboxMessage.Status.SENT).update(
+            status=OutboxMessage.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now()
+        )
+        transaction.on_commit(schedule_drain)
+        self.message_user(
+            request,
+            f"{updated} message(s) queued for delivery."
+        )
+    retry_now.short_description = "Retry selected messages now"
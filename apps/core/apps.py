@@ -4,4 +4,17 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
-    verbose_name = 'Core'
\ No newline at end of file
+    verbose_name = 'Core'
+
+    def ready(self):
+        from celery.signals import task_postrun
+        from django.core.signals import request_finished
+
+        # Buffered counters are written once due, after the response is sent
+        request_finished.connect(flush_counters, dispatch_uid='core.flush_counters')
+        task_postrun.connect(flush_counters, dispatch_uid='core.flush_counters')
+
+
+def flush_counters(**kwargs):
+    from .counters import counters
+    counters.flush_if_due()
@@ -0,0 +1,162 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple, Type
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Case, F, Value, When
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[Type[models.Model], Any]
+
+
+class CounterBuffer:
+    """Buffer hot counter increments per process and apply them in bulk.
+
+    ``add`` only records a delta in memory, keyed by (model, pk, field).
+    Once ``HOT_COUNTERS_FLUSH_INTERVAL`` seconds have passed, or
+    ``HOT_COUNTERS_MAX_KEYS`` keys are pending, the next ``flush_if_due``
+    (called after each request and Celery task, see CoreConfig.ready)
+    writes everything with one UPDATE per model and batch::
+
+        UPDATE t SET n = n + CASE pk WHEN 1 THEN 3 WHEN 2 THEN 1 ELSE 0 END
+        WHERE pk IN (1, 2)
+
+    Increments are atomic in the database, so concurrent processes never
+    lose counts. Non-counter fields that should follow the counter (e.g. a
+    "last accessed" timestamp) are passed as ``touch`` and keep the latest
+    value. An interval of 0 writes every increment straight through.
+
+    Deltas not yet flushed are only visible to this process; ``value``
+    merges them into a value read from the database.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None, max_keys: Optional[int] = None):
+        self._flush_interval = flush_interval
+        self._max_keys = max_keys
+        self._deltas: Dict[Key, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._touched: Dict[Key, Dict[str, Any]] = defaultdict(dict)
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def flush_interval(self) -> float:
+        if self._flush_interval is not None:
+            return self._flush_interval
+        return settings.HOT_COUNTERS_FLUSH_INTERVAL
+
+    @property
+    def max_keys(self) -> int:
+        return self._max_keys or settings.HOT_COUNTERS_MAX_KEYS
+
+    def add(self, model: Type[models.Model], pk: Any, field: str, delta: int = 1, touch: Optional[Dict[str, Any]] = None):
+        """Record ``delta`` for ``model.field`` of row ``pk``.
+
+        Args:
+            model: Model class
+            pk: Primary key of the row
+            field: Integer field to increment
+            delta: Amount to add (may be negative)
+            touch: Other fields to set to these values with the next flush
+        """
+        if pk is None:
+            return
+        with self._lock:
+            self._deltas[(model, pk)][field] += delta
+            if touch:
+                self._touched[(model, pk)].update(touch)
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def pending(self, model: Type[models.Model], pk: Any, field: str) -> int:
+        """Return the unflushed delta of one counter."""
+        with self._lock:
+            deltas = self._deltas.get((model, pk))
+            return deltas.get(field, 0) if deltas else 0
+
+    def value(self, instance: models.Model, field: str) -> int:
+        """Return ``instance.field`` plus this process's unflushed delta."""
+        return (getattr(instance, field) or 0) + self.pending(type(instance), instance.pk, field)
+
+    def flush_if_due(self):
+        with self._lock:
+            due = self._deltas and (
+                time.monotonic() - self._last_flush >= self.flush_interval
+                or len(self._deltas) >= self.max_keys
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all pending deltas; returns the number of rows updated.
+
+        If the database is unavailable the deltas are put back and retried
+        with the next flush.
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(lambda: defaultdict(int))
+            touched, self._touched = self._touched, defaultdict(dict)
+            self._last_flush = time.monotonic()
+        if not deltas:
+            return 0
+
+        by_model = defaultdict(list)
+        for model, pk in deltas:
+            by_model[model].append(pk)
+
+        updated = 0
+        for model, pks in by_model.items():
+            batch_size = settings.HOT_COUNTERS_BATCH_SIZE
+            for start in range(0, len(pks), batch_size):
+                batch = pks[start:start + batch_size]
+                try:
+                    updated += self._apply(model, batch, deltas, touched)
+                except Exception as e:
+                    logger.warning(f"Counter flush for {model.__name__} failed, will retry: {str(e)}")
+                    self._restore(model, batch, deltas, touched)
+        return updated
+
+    @staticmethod
+    def _apply(model, pks, deltas, touched) -> int:
+        fields = {field for pk in pks for field in deltas[(model, pk)]}
+        touch_fields = {field for pk in pks for field in touched.get((model, pk), {})}
+
+        updates = {}
+        for field in fields:
+            output_field = model._meta.get_field(field)
+            whens = [
+                When(pk=pk, then=Value(deltas[(model, pk)][field]))
+                for pk in pks if deltas[(model, pk)].get(field)
+            ]
+            if whens:
+                updates[field] = F(field) + Case(*whens, default=Value(0), output_field=output_field)
+        for field in touch_fields:
+            whens = [
+                When(pk=pk, then=Value(touched[(model, pk)][field]))
+                for pk in pks if field in touched.get((model, pk), {})
+            ]
+            updates[field] = Case(*whens, default=F(field), output_field=model._meta.get_field(field))
+
+        if not updates:
+            return 0
+        return model.objects.filter(pk__in=pks).update(**updates)
+
+    def _restore(self, model, pks, deltas, touched):
+        with self._lock:
+            for pk in pks:
+                for field, delta in deltas[(model, pk)].items():
+                    self._deltas[(model, pk)][field] += delta
+                for field, value in touched.get((model, pk), {}).items():
+                    # A newer value recorded meanwhile wins
+                    self._touched[(model, pk)].setdefault(field, value)
+
+
+counters = CounterBuffer()
+
+atexit.register(counters.flush)
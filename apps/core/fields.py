@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from .counters import counters
+
+
+class CounterField(serializers.ReadOnlyField):
+    """Read-only hot counter, including this process's unflushed increments.
+
+    Counters written through ``apps.core.counters`` lag in the database
+    until the next flush; this shows a client its own action right away.
+    """
+
+    def get_attribute(self, instance):
+        return counters.value(instance, self.source)
@@ -0,0 +1,318 @@
+import random
+import threading
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised when a call is short-circuited because the upstream is marked down.
+
+    Subclasses ``requests.exceptions.ConnectionError`` so existing
+    ``except requests.exceptions.RequestException`` handlers keep working.
+    """
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker for a single upstream.
+
+    Closed: calls go through and consecutive failures are counted.
+    Open: calls fail fast until ``reset_timeout`` seconds have passed.
+    Half-open: a single trial call is let through; success closes the
+    circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted right now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    logger.warning(
+                        f"Circuit '{self.name}' opened after {self._failures} consecutive failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def check(self):
+        """Raise ``CircuitOpenError`` if the circuit does not allow a call."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open; upstream marked unavailable")
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry with full jitter on the exponential backoff."""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, backoff)
+
+
+class UpstreamClient:
+    """Pooled, keep-alive HTTP client for an external upstream (n8n webhooks).
+
+    One instance is shared per process (see ``get_upstream_client``). It holds
+    a ``requests.Session`` with a bounded connection pool, applies separate
+    connect/read timeouts, retries idempotent calls with jittered backoff and
+    guards every call with a ``CircuitBreaker``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.3,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+
+        retry = JitteredRetry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=False,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _timeout(self, timeout):
+        """Normalize ``timeout`` into a (connect, read) tuple.
+
+        A scalar is treated as the read timeout; the connect timeout always
+        stays short so an unreachable host fails fast.
+        """
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+        if isinstance(timeout, (tuple, list)):
+            return tuple(timeout)
+        return (self.connect_timeout, timeout)
+
+    def request(self, method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        self.breaker.check()
+        try:
+            response = self.session.request(method, url, timeout=self._timeout(timeout), **kwargs)
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncUpstreamClient:
+    """Non-blocking counterpart of ``UpstreamClient`` for the ASGI code path.
+
+    Wraps an ``httpx.AsyncClient`` with the same connect/read timeout split
+    and shares the sync client's ``CircuitBreaker``, so both paths agree on
+    whether the upstream is down. Only connection failures are retried,
+    which is safe for the non-idempotent webhook POSTs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        max_connections: int = 200,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        max_retries: int = 2,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=pool_size,
+        )
+        self.client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self._timeout(None),
+            transport=httpx.AsyncHTTPTransport(retries=max_retries, limits=limits),
+        )
+
+    def _timeout(self, timeout) -> httpx.Timeout:
+        if timeout is None:
+            timeout = self.read_timeout
+        if isinstance(timeout, (tuple, list)):
+            connect, read = timeout
+        else:
+            connect, read = self.connect_timeout, timeout
+        return httpx.Timeout(read, connect=connect)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, timeout=None, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Open a streamed request; the body is read inside the ``async with``."""
+        self.breaker.check()
+        try:
+            async with self.client.stream(method, url, timeout=self._timeout(timeout), **kwargs) as response:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                yield response
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+
+    async def request(self, method: str, url: str, timeout=None, **kwargs) -> httpx.Response:
+        self.breaker.check()
+        try:
+            response = await self.client.request(method, url, timeout=self._timeout(timeout), **kwargs)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients: Dict[str, UpstreamClient] = {}
+_async_clients: Dict[str, AsyncUpstreamClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_upstream_client(url: str) -> UpstreamClient:
+    """Return the per-process client for the upstream host of ``url``.
+
+    Clients are created lazily, so each forked gunicorn worker builds its own
+    pool after the fork instead of sharing sockets with the master.
+    """
+    name = urlsplit(url).netloc
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = UpstreamClient(
+                    name,
+                    pool_size=settings.RAG_HTTP_POOL_SIZE,
+                    connect_timeout=settings.RAG_HTTP_CONNECT_TIMEOUT,
+                    read_timeout=settings.RAG_HTTP_READ_TIMEOUT,
+                    max_retries=settings.RAG_HTTP_MAX_RETRIES,
+                    backoff_factor=settings.RAG_HTTP_BACKOFF_FACTOR,
+                    failure_threshold=settings.RAG_CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=settings.RAG_CIRCUIT_RESET_TIMEOUT,
+                )
+                _clients[name] = client
+    return client
+
+
+def get_async_upstream_client(url: str) -> AsyncUpstreamClient:
+    """Return the per-process async client for the upstream host of ``url``.
+
+    Must be first used from the server's event loop; the underlying httpx
+    connection pool is bound to the loop that opened it.
+    """
+    name = urlsplit(url).netloc
+    client = _async_clients.get(name)
+    if client is None:
+        breaker = get_upstream_client(url).breaker
+        with _clients_lock:
+            client = _async_clients.get(name)
+            if client is None:
+                client = AsyncUpstreamClient(
+                    name,
+                    breaker,
+                    max_connections=settings.RAG_HTTP_ASYNC_MAX_CONNECTIONS,
+                    pool_size=settings.RAG_HTTP_POOL_SIZE,
+                    connect_timeout=settings.RAG_HTTP_CONNECT_TIMEOUT,
+                    read_timeout=settings.RAG_HTTP_READ_TIMEOUT,
+                    max_retries=settings.RAG_HTTP_MAX_RETRIES,
+                )
+                _async_clients[name] = client
+    return client
@@ -0,0 +1,72 @@
+import json
+import logging
+from typing import Any, Callable, Optional, Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency, only needed for JSON_BACKEND = 'orjson'
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ORJSON = 'orjson'
+STDLIB = 'stdlib'
+
+_drf_default = JSONEncoder().default
+
+
+def backend() -> str:
+    """Return the configured JSON backend (settings.JSON_BACKEND)."""
+    name = getattr(settings, 'JSON_BACKEND', STDLIB)
+    if name == ORJSON and orjson is None:
+        raise ImproperlyConfigured("JSON_BACKEND is 'orjson' but the orjson package is not installed")
+    if name not in (ORJSON, STDLIB):
+        raise ImproperlyConfigured(f"Unknown JSON_BACKEND {name!r}, expected 'stdlib' or 'orjson'")
+    return name
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None, indent: Optional[int] = None) -> bytes:
+    """Encode ``obj`` as UTF-8 JSON.
+
+    Without ``default``, types are encoded the way DRF's JSONEncoder does:
+    UUID as string, datetime as ISO 8601 with 'Z' for UTC, Decimal as float,
+    lazy strings, querysets and other iterables as arrays. With a custom
+    ``default``, datetimes are handed to it like the stdlib encoder would,
+    so ``dumps(data, default=str)`` matches ``json.dumps(data, default=str)``.
+
+    Output is compact (no spaces) unless ``indent`` is given. The orjson
+    backend only indents by 2; other widths, and values orjson rejects
+    (e.g. integers over 64 bits), go through the stdlib encoder.
+    """
+    if backend() == ORJSON and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if default is None:
+            option |= orjson.OPT_UTC_Z
+        else:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default or _drf_default, option=option)
+        except orjson.JSONEncodeError as e:
+            logger.debug(f"orjson could not encode value, using stdlib: {str(e)}")
+
+    return _stdlib_dumps(obj, default, indent).encode('utf-8')
+
+
+def _stdlib_dumps(obj: Any, default: Optional[Callable[[Any], Any]], indent: Optional[int]) -> str:
+    separators = (',', ':') if indent is None else (',', ': ')
+    if default is None:
+        return json.dumps(obj, cls=JSONEncoder, ensure_ascii=False, indent=indent, separators=separators)
+    return json.dumps(obj, default=default, ensure_ascii=False, indent=indent, separators=separators)
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Decode JSON; raises ValueError on invalid input with either backend."""
+    if backend() == ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
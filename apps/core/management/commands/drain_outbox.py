@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.outbox import drain, requeue_dead
+
+
+class Command(BaseCommand):
+    help = 'Deliver due outbox messages (outbound webhooks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Give dead messages a fresh set of attempts first'
+        )
+        parser.add_argument(
+            '--topic',
+            help='With --requeue-dead, only requeue messages of this topic'
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            requeued = requeue_dead(options['topic'])
+            self.stdout.write(f"Requeued {requeued} dead messages")
+
+        result = drain()
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {result['sent']}, failed {result['failed']}, dead {result['dead']}, "
+            f"deferred {result['deferred']}"
+        ))
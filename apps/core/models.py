@@ -0,0 +1,70 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """An outbound webhook call, written in the same transaction as the change it reports.
+
+    Rows are delivered in the background by ``apps.core.outbox.drain``;
+    see that module for retries and dead-lettering.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        DEAD = 'dead', 'Dead'
+
+    topic = models.CharField(
+        max_length=100,
+        help_text="Kind of notification, e.g. 'files.uploaded'"
+    )
+
+    url = models.URLField(
+        max_length=500,
+        help_text="Webhook URL the payload is POSTed to"
+    )
+
+    payload = models.JSONField(
+        help_text="JSON body of the webhook call"
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of delivery attempts so far"
+    )
+
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time of the next delivery attempt"
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        help_text="Error of the last failed attempt"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'core_outbox_messages'
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                name='core_outbox_due_idx',
+                condition=models.Q(status='pending')
+            ),
+            models.Index(fields=['status', 'topic']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
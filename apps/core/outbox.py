@@ -0,0 +1,250 @@
+import logging
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .http import CircuitOpenError, get_upstream_client
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DRAIN_SCHEDULED_KEY = 'core:outbox:drain-scheduled'
+RETRY_SCHEDULED_KEY = 'core:outbox:retry-at'
+
+# Sent after a drained batch was recorded, once per topic, with the
+# ``topic`` and the delivered ``messages``. Receivers react to the remote
+# side having acted on a notification (not merely to it being queued).
+delivered = Signal()
+
+# Outcomes of one delivery attempt
+SENT = 'sent'
+FAILED = 'failed'
+DEFERRED = 'deferred'
+
+
+def enqueue(topic: str, url: str, payload: Dict[str, Any]) -> OutboxMessage:
+    """Record a webhook call to be made once the current transaction commits.
+
+    Write it inside the transaction of the change it reports: either both
+    are stored or neither is. Delivery happens in the background, so the
+    caller never waits for the remote side.
+
+    Args:
+        topic: Kind of notification, for logs and the admin
+        url: Webhook URL
+        payload: JSON body
+
+    Returns:
+        The stored OutboxMessage
+    """
+    message = OutboxMessage.objects.create(topic=topic, url=url, payload=payload)
+    transaction.on_commit(schedule_drain)
+    return message
+
+
+def enqueue_many(messages: List[Tuple[str, str, Dict[str, Any]]]) -> List[OutboxMessage]:
+    """Record several webhook calls, given as (topic, url, payload), with one INSERT."""
+    if not messages:
+        return []
+    created = OutboxMessage.objects.bulk_create([
+        OutboxMessage(topic=topic, url=url, payload=payload)
+        for topic, url, payload in messages
+    ])
+    transaction.on_commit(schedule_drain)
+    return created
+
+
+def schedule_drain(countdown: float = 0):
+    """Queue a drain run, unless one is already queued."""
+    from .tasks import drain_outbox_task
+
+    try:
+        # Only dedupes a burst of enqueues: the key may live in a per-process
+        # cache, so the periodic drain (CELERY_BEAT_SCHEDULE) picks up rows it
+        # hides from other processes within OUTBOX_DRAIN_INTERVAL
+        if not cache.add(DRAIN_SCHEDULED_KEY, True, timeout=int(countdown) + settings.OUTBOX_DRAIN_INTERVAL):
+            return
+        drain_outbox_task.apply_async(countdown=countdown)
+    except Exception as e:
+        cache.delete(DRAIN_SCHEDULED_KEY)
+        logger.warning(f"Failed to schedule outbox drain: {str(e)}")
+
+
+def schedule_retry(due):
+    """Queue a drain run for ``due``, unless one is already queued for that time or earlier."""
+    from .tasks import drain_outbox_task
+
+    now = timezone.now()
+    try:
+        scheduled = cache.get(RETRY_SCHEDULED_KEY)
+        if scheduled is not None and now < scheduled <= due:
+            return
+        countdown = max((due - now).total_seconds(), 0)
+        cache.set(RETRY_SCHEDULED_KEY, due, timeout=int(countdown) + settings.OUTBOX_CLAIM_SECONDS)
+        drain_outbox_task.apply_async(countdown=countdown)
+    except Exception as e:
+        logger.warning(f"Failed to schedule outbox retry: {str(e)}")
+
+
+def drain(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, Any]:
+    """Deliver due outbox messages, one claimed batch at a time.
+
+    A batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED and leased
+    for OUTBOX_CLAIM_SECONDS, so several workers can drain in parallel
+    without sending a message twice; a worker that dies mid-batch only
+    delays its messages until the lease runs out. The batch is POSTed by
+    OUTBOX_CONCURRENCY threads over the pooled upstream clients, and the
+    outcomes are written back with one UPDATE per outcome.
+
+    Failed messages are retried with exponential backoff; after
+    OUTBOX_MAX_ATTEMPTS they are marked DEAD and kept for inspection. While
+    an upstream's circuit is open its messages wait without using up
+    attempts.
+
+    Returns:
+        Dict with the number of messages ``sent``, ``failed`` (to be
+        retried), ``dead`` and ``deferred``, and ``next_due``: when the
+        earliest remaining message is due (None if there is none)
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_batches = max_batches or settings.OUTBOX_DRAIN_MAX_BATCHES
+    result = {'sent': 0, 'failed': 0, 'dead': 0, 'deferred': 0}
+
+    for _ in range(max_batches):
+        batch = _claim(batch_size)
+        if not batch:
+            break
+        outcomes = _deliver(batch)
+        for key, value in _record(batch, outcomes).items():
+            result[key] += value
+
+    result['next_due'] = OutboxMessage.objects.filter(
+        status=OutboxMessage.Status.PENDING
+    ).order_by('next_attempt_at').values_list('next_attempt_at', flat=True).first()
+    return result
+
+
+def _claim(batch_size: int) -> List[OutboxMessage]:
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxMessage.Status.PENDING,
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboxMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+            )
+    return batch
+
+
+def _deliver(batch: List[OutboxMessage]) -> List[Tuple[str, str]]:
+    """POST every message of the batch; returns (outcome, error) per message."""
+    if len(batch) == 1 or settings.OUTBOX_CONCURRENCY <= 1:
+        return [_send(message) for message in batch]
+    with ThreadPoolExecutor(max_workers=min(settings.OUTBOX_CONCURRENCY, len(batch))) as pool:
+        return list(pool.map(_send, batch))
+
+
+def _send(message: OutboxMessage) -> Tuple[str, str]:
+    try:
+        response = get_upstream_client(message.url).post(
+            message.url,
+            json=message.payload,
+            timeout=settings.OUTBOX_HTTP_TIMEOUT
+        )
+    except CircuitOpenError as e:
+        return DEFERRED, str(e)
+    except Exception as e:
+        return FAILED, str(e)
+
+    if 200 <= response.status_code < 300:
+        return SENT, ''
+    return FAILED, f"HTTP {response.status_code}: {response.text[:500]}"
+
+
+def _record(batch: List[OutboxMessage], outcomes: List[Tuple[str, str]]) -> Dict[str, int]:
+    now = timezone.now()
+    counts = {'sent': 0, 'failed': 0, 'dead': 0, 'deferred': 0}
+
+    sent = [message for message, (outcome, _) in zip(batch, outcomes) if outcome == SENT]
+    if sent:
+        counts['sent'] = OutboxMessage.objects.filter(pk__in=[message.pk for message in sent]).update(
+            status=OutboxMessage.Status.SENT,
+            sent_at=now,
+            last_error=''
+        )
+        _notify_delivered(sent)
+
+    deferred = [message.pk for message, (outcome, _) in zip(batch, outcomes) if outcome == DEFERRED]
+    if deferred:
+        counts['deferred'] = OutboxMessage.objects.filter(pk__in=deferred).update(
+            next_attempt_at=now + timedelta(seconds=settings.RAG_CIRCUIT_RESET_TIMEOUT)
+        )
+
+    failed = []
+    for message, (outcome, error) in zip(batch, outcomes):
+        if outcome != FAILED:
+            continue
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboxMessage.Status.DEAD
+            counts['dead'] += 1
+            logger.error(f"Outbox message {message.topic} #{message.pk} dead after {message.attempts} attempts: {error}")
+        else:
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            counts['failed'] += 1
+            logger.warning(f"Outbox message {message.topic} #{message.pk} failed (attempt {message.attempts}): {error}")
+        failed.append(message)
+    if failed:
+        OutboxMessage.objects.bulk_update(failed, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+    return counts
+
+
+def _notify_delivered(messages: List[OutboxMessage]):
+    by_topic = defaultdict(list)
+    for message in messages:
+        by_topic[message.topic].append(message)
+    for topic, topic_messages in by_topic.items():
+        # A failing receiver must not fail the drain; the messages are sent
+        for receiver, response in delivered.send_robust(sender=OutboxMessage, topic=topic, messages=topic_messages):
+            if isinstance(response, Exception):
+                logger.error(f"Outbox delivered receiver {receiver} failed for {topic}: {str(response)}")
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, capped at OUTBOX_RETRY_MAX_SECONDS."""
+    delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def prune_sent(days: Optional[int] = None) -> int:
+    """Delete messages delivered more than ``days`` (OUTBOX_SENT_RETENTION_DAYS) ago."""
+    days = settings.OUTBOX_SENT_RETENTION_DAYS if days is None else days
+    return OutboxMessage.objects.filter(
+        status=OutboxMessage.Status.SENT,
+        sent_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
+
+
+def requeue_dead(topic: Optional[str] = None) -> int:
+    """Give dead messages a fresh set of attempts."""
+    dead = OutboxMessage.objects.filter(status=OutboxMessage.Status.DEAD)
+    if topic:
+        dead = dead.filter(topic=topic)
+    requeued = dead.update(status=OutboxMessage.Status.PENDING, attempts=0, next_attempt_at=timezone.now())
+    if requeued:
+        transaction.on_commit(schedule_drain)
+    return requeued
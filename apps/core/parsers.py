@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from . import json as fast_json
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that decodes with orjson when JSON_BACKEND = 'orjson'.
+
+    orjson rejects NaN/Infinity like JSONParser does with STRICT_JSON, so
+    the non-strict setting and the stdlib backend use ``JSONParser``.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if fast_json.backend() != fast_json.ORJSON or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return fast_json.loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
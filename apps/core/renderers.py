@@ -0,0 +1,34 @@
+from rest_framework.renderers import JSONRenderer
+
+from . import json as fast_json
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when JSON_BACKEND = 'orjson'.
+
+    Output is byte-for-byte what ``JSONRenderer`` produces for API data
+    (compact, UTF-8, DRF's type conversions, \\u2028/\\u2029 escaped). Indented
+    output (``Accept: application/json; indent=4``), non-default
+    UNICODE_JSON/COMPACT_JSON/STRICT_JSON settings and the stdlib backend
+    are delegated to ``JSONRenderer`` itself.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (
+            fast_json.backend() != fast_json.ORJSON
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = fast_json.dumps(data)
+        # Keep the output a strict JavaScript subset, as JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
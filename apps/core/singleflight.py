@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Hashable, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """A single in-flight upstream call whose events are shared by every caller.
+
+    Events are appended to an in-memory log, so a subscriber that joins late
+    still receives everything from the first event on. Sync subscribers wait
+    on a condition variable; async subscribers are woken through their own
+    event loop, so producers and consumers may live on different threads.
+    """
+
+    def __init__(self, key: Hashable, on_finish: Callable[['Flight'], None] = None):
+        self.key = key
+        self.events = []
+        self.done = False
+        self.error = None
+        self._on_finish = on_finish
+        self.task = None
+        self._cond = threading.Condition()
+        self._async_waiters = set()
+
+    def publish(self, event: Any):
+        with self._cond:
+            self.events.append(event)
+            self._wake()
+
+    def finish(self, error: Exception = None):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._wake()
+        if self._on_finish:
+            self._on_finish(self)
+
+    def _wake(self):
+        self._cond.notify_all()
+        for loop, waiter in list(self._async_waiters):
+            loop.call_soon_threadsafe(waiter.set)
+
+    def run(self, iterable: Iterable[Any]):
+        """Drain ``iterable`` into the flight (producer side)."""
+        try:
+            for event in iterable:
+                self.publish(event)
+        except Exception as e:
+            logger.error(f"Flight {self.key!r} failed: {str(e)}")
+            self.finish(e)
+        else:
+            self.finish()
+
+    async def arun(self, iterable: AsyncIterable[Any]):
+        """Async counterpart of ``run``."""
+        try:
+            async for event in iterable:
+                self.publish(event)
+        except Exception as e:
+            logger.error(f"Flight {self.key!r} failed: {str(e)}")
+            self.finish(e)
+        else:
+            self.finish()
+
+    def subscribe(self) -> Iterator[Any]:
+        """Yield every event of the flight, blocking until the next one arrives."""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.events) and not self.done:
+                    self._cond.wait()
+                pending = self.events[index:]
+                index += len(pending)
+                finished = self.done and index >= len(self.events)
+            yield from pending
+            if finished:
+                break
+        if self.error:
+            raise self.error
+
+    async def asubscribe(self) -> AsyncIterator[Any]:
+        """Async counterpart of ``subscribe``."""
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        entry = (loop, waiter)
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    pending = self.events[index:]
+                    index += len(pending)
+                    finished = self.done and index >= len(self.events)
+                    if not pending and not finished:
+                        waiter.clear()
+                        self._async_waiters.add(entry)
+                for event in pending:
+                    yield event
+                if finished:
+                    break
+                if not pending:
+                    await waiter.wait()
+        finally:
+            with self._cond:
+                self._async_waiters.discard(entry)
+        if self.error:
+            raise self.error
+
+    def result(self) -> Any:
+        """Wait for the flight to finish and return its last event."""
+        with self._cond:
+            while not self.done:
+                self._cond.wait()
+        if self.error:
+            raise self.error
+        return self.events[-1] if self.events else None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one upstream call per process.
+
+    The first caller for a key becomes the leader and starts the work; callers
+    arriving while it is still in flight subscribe to the same ``Flight``.
+    Once it finishes the key is released, so later calls start a new flight.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> Tuple[Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = Flight(key, on_finish=self._release)
+            self._flights[key] = flight
+            return flight, True
+
+    def _release(self, flight: Flight):
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Call ``fn`` once for all concurrent callers of ``key``.
+
+        Returns:
+            Tuple of (result, shared) where ``shared`` is True for callers
+            that received another caller's result
+        """
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                flight.publish(fn())
+            except Exception as e:
+                flight.finish(e)
+                raise
+            flight.finish()
+        return flight.result(), not leader
+
+    def stream(self, key: Hashable, factory: Callable[[], Iterable[Any]]) -> Tuple[Iterator[Any], bool]:
+        """Subscribe to the stream for ``key``, starting it if needed.
+
+        The leader's stream is drained on a background thread, so it keeps
+        feeding the other subscribers if the leader's client disconnects.
+
+        Returns:
+            Tuple of (events iterator, shared)
+        """
+        flight, leader = self._join(key)
+        if leader:
+            threading.Thread(
+                target=flight.run, args=(factory(),), name=f'singleflight-{key}', daemon=True
+            ).start()
+        return flight.subscribe(), not leader
+
+    def astream(self, key: Hashable, factory: Callable[[], AsyncIterable[Any]]) -> Tuple[AsyncIterator[Any], bool]:
+        """Async counterpart of ``stream``; the leader's stream runs as a task on the current loop."""
+        flight, leader = self._join(key)
+        if leader:
+            # Keep a reference so the task is not garbage collected mid-flight
+            flight.task = asyncio.ensure_future(flight.arun(factory()))
+        return flight.asubscribe(), not leader
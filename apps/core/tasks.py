@@ -0,0 +1,35 @@
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+from django.utils import timezone
+
+from .outbox import DRAIN_SCHEDULED_KEY, drain, prune_sent, schedule_drain, schedule_retry
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='core.drain_outbox', ignore_result=True)
+def drain_outbox_task():
+    """Deliver due outbox messages (see apps.core.outbox).
+    
+    Queues the next run itself: right away if due messages are left after
+    OUTBOX_DRAIN_MAX_BATCHES, otherwise for when the next retry is due.
+    Celery beat also runs it every OUTBOX_DRAIN_INTERVAL seconds, so
+    messages are delivered even if a scheduled run is lost or skipped.
+    """
+    # Messages enqueued from now on need another run
+    cache.delete(DRAIN_SCHEDULED_KEY)
+    result = drain()
+    
+    next_due = result.pop('next_due')
+    if next_due is not None:
+        if next_due <= timezone.now():
+            schedule_drain()
+        else:
+            schedule_retry(next_due)
+    
+    result['pruned'] = prune_sent()
+    if any(result.values()):
+        logger.info(f"Outbox drain: {result}")
+    return result
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.analytics.models import EventType, UserActivity
+from apps.analytics.services import AnalyticsService
+from apps.chat.models import ChatTemplate
+from apps.core.counters import CounterBuffer, counters
+
+
+class CounterBufferTest(TestCase):
+    """Test cases for buffered hot counters"""
+    
+    def setUp(self):
+        self.counters = CounterBuffer(flush_interval=3600)
+        self.templates = [
+            ChatTemplate.objects.create(name=f'Template {i}', prompt='Hello', usage_count=10)
+            for i in range(3)
+        ]
+    
+    def usage(self, template):
+        return ChatTemplate.objects.get(pk=template.pk).usage_count
+    
+    def test_increments_are_buffered(self):
+        """Test nothing is written until a flush"""
+        self.counters.add(ChatTemplate, self.templates[0].pk, 'usage_count')
+        self.counters.flush_if_due()
+        
+        self.assertEqual(self.usage(self.templates[0]), 10)
+        self.assertEqual(self.counters.pending(ChatTemplate, self.templates[0].pk, 'usage_count'), 1)
+    
+    def test_flush_applies_deltas_in_one_update(self):
+        """Test different deltas for several rows are written atomically together"""
+        for _ in range(3):
+            self.counters.add(ChatTemplate, self.templates[0].pk, 'usage_count')
+        self.counters.add(ChatTemplate, self.templates[1].pk, 'usage_count', delta=5)
+        # Concurrent write from elsewhere must not be lost
+        ChatTemplate.objects.filter(pk=self.templates[0].pk).update(usage_count=20)
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counters.flush(), 2)
+        
+        self.assertEqual(self.usage(self.templates[0]), 23)
+        self.assertEqual(self.usage(self.templates[1]), 15)
+        self.assertEqual(self.usage(self.templates[2]), 10)
+        self.assertEqual(self.counters.pending(ChatTemplate, self.templates[0].pk, 'usage_count'), 0)
+    
+    def test_value_merges_unflushed_delta(self):
+        """Test reads can include this process's pending increments"""
+        self.counters.add(ChatTemplate, self.templates[0].pk, 'usage_count', delta=2)
+        
+        self.assertEqual(self.counters.value(self.templates[0], 'usage_count'), 12)
+    
+    @override_settings(HOT_COUNTERS_FLUSH_INTERVAL=3600)
+    def test_serializers_include_unflushed_delta(self):
+        """Test API reads of hot counters show increments not yet flushed"""
+        from apps.chat.serializers import ChatTemplateSerializer
+        
+        self.addCleanup(counters.flush)
+        counters.add(ChatTemplate, self.templates[0].pk, 'usage_count', delta=3)
+        template = ChatTemplate.objects.get(pk=self.templates[0].pk)
+        
+        self.assertEqual(template.usage_count, 10)
+        self.assertEqual(ChatTemplateSerializer(template).data['usage_count'], 13)
+    
+    def test_max_keys_triggers_flush(self):
+        """Test a full buffer is flushed without waiting for the interval"""
+        buffer = CounterBuffer(flush_interval=3600, max_keys=2)
+        buffer.add(ChatTemplate, self.templates[0].pk, 'usage_count')
+        buffer.add(ChatTemplate, self.templates[1].pk, 'usage_count')
+        
+        self.assertEqual(self.usage(self.templates[0]), 11)
+        self.assertEqual(self.usage(self.templates[1]), 11)
+    
+    def test_failed_flush_keeps_deltas(self):
+        """Test deltas survive a database error and are written later"""
+        self.counters.add(ChatTemplate, self.templates[0].pk, 'usage_count', delta=4)
+        
+        with patch.object(CounterBuffer, '_apply', side_effect=RuntimeError('db down')):
+            self.counters.flush()
+        self.assertEqual(self.counters.pending(ChatTemplate, self.templates[0].pk, 'usage_count'), 4)
+        
+        self.counters.flush()
+        self.assertEqual(self.usage(self.templates[0]), 14)
+    
+    def test_touch_fields_keep_latest_value(self):
+        """Test touched fields are set alongside the counter"""
+        user = get_user_model().objects.create_user(
+            username='counted',
+            email='counted@example.com',
+            password='testpass123'
+        )
+        activity = UserActivity.objects.create(user=user, date=timezone.now().date())
+        later = timezone.now() + timedelta(minutes=5)
+        
+        self.counters.add(UserActivity, activity.pk, 'login_count', touch={'updated_at': timezone.now()})
+        self.counters.add(UserActivity, activity.pk, 'login_count', touch={'updated_at': later})
+        self.counters.flush()
+        
+        activity.refresh_from_db()
+        self.assertEqual(activity.login_count, 2)
+        self.assertEqual(activity.updated_at, later)
+    
+    @override_settings(HOT_COUNTERS_FLUSH_INTERVAL=0)
+    def test_hot_paths_use_shared_counters(self):
+        """Test template usage and activity tracking go through the shared buffer"""
+        user = get_user_model().objects.create_user(
+            username='tracked',
+            email='tracked@example.com',
+            password='testpass123'
+        )
+        
+        self.templates[0].increment_usage()
+        AnalyticsService._update_user_activity(user, EventType.CHAT_MESSAGE)
+        AnalyticsService._update_user_activity(user, EventType.CHAT_MESSAGE)
+        
+        self.assertEqual(self.templates[0].usage_count, 11)
+        self.assertEqual(self.usage(self.templates[0]), 11)
+        self.assertEqual(UserActivity.objects.get(user=user).chat_messages_sent, 2)
+        self.assertEqual(counters.pending(ChatTemplate, self.templates[0].pk, 'usage_count'), 0)
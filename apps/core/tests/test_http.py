@@ -0,0 +1,90 @@
+from django.test import SimpleTestCase
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from apps.core.http import CircuitBreaker, CircuitOpenError, UpstreamClient
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """Test cases for CircuitBreaker"""
+    
+    def test_opens_after_threshold(self):
+        """Test circuit opens after consecutive failures"""
+        breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=30)
+        
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpenError, breaker.check)
+    
+    def test_success_resets_failures(self):
+        """Test a success resets the consecutive failure count"""
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+        
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+    
+    @patch('apps.core.http.time.monotonic')
+    def test_half_open_allows_single_trial(self, mock_monotonic):
+        """Test only one trial call is allowed after the reset timeout"""
+        mock_monotonic.return_value = 100.0
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+        
+        mock_monotonic.return_value = 111.0
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        
+        mock_monotonic.return_value = 122.0
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class UpstreamClientTest(SimpleTestCase):
+    """Test cases for UpstreamClient"""
+    
+    def setUp(self):
+        self.client = UpstreamClient('upstream.test', failure_threshold=2)
+        self.client.session = MagicMock()
+    
+    def test_scalar_timeout_is_read_timeout(self):
+        """Test a scalar timeout keeps the short connect timeout"""
+        self.client.session.request.return_value = MagicMock(status_code=200)
+        
+        self.client.post('https://upstream.test/hook', json={}, timeout=60)
+        
+        _, kwargs = self.client.session.request.call_args
+        self.assertEqual(kwargs['timeout'], (self.client.connect_timeout, 60))
+    
+    def test_fails_fast_when_circuit_open(self):
+        """Test calls are short-circuited once the upstream keeps failing"""
+        self.client.session.request.side_effect = requests.exceptions.ConnectTimeout()
+        
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                self.client.get('https://upstream.test/hook')
+        
+        with self.assertRaises(CircuitOpenError):
+            self.client.get('https://upstream.test/hook')
+        self.assertEqual(self.client.session.request.call_count, 2)
+    
+    def test_server_errors_count_as_failures(self):
+        """Test 5xx responses are returned but trip the breaker"""
+        self.client.session.request.return_value = MagicMock(status_code=503)
+        
+        response = self.client.get('https://upstream.test/hook')
+        self.client.get('https://upstream.test/hook')
+        
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
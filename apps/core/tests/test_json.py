@@ -0,0 +1,138 @@
+import datetime
+import io
+import json
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from apps.core import json as fast_json
+from apps.core.parsers import FastJSONParser
+from apps.core.renderers import FastJSONRenderer
+
+PAYLOADS = [
+    {},
+    [],
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'count': 3, 'ratio': 0.25, 'ok': True, 'none': None},
+    {'created_at': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)},
+    {'created_at': datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5)))},
+    {'naive': datetime.datetime(2024, 5, 1, 12, 30), 'day': datetime.date(2024, 5, 1), 'at': datetime.time(8, 15)},
+    {'price': Decimal('19.99'), 'elapsed': datetime.timedelta(minutes=2, seconds=3)},
+    {'text': 'Zürich – 東京   "quoted" \\ back\nslash', 'emoji': '🙂'},
+    {'lazy': gettext_lazy('Conversation'), 'nested': [{'a': [1, 2, {'b': None}]}], 'bytes': b'raw'},
+    {1: 'int key', 'tuple': (1, 2)},
+    ReturnDict(OrderedDict([('id', 1), ('title', 'x')]), serializer=None),
+    ReturnList([{'id': 1}, {'id': 2}], serializer=None),
+    {'big': 2 ** 70},
+]
+
+
+@override_settings(JSON_BACKEND='orjson')
+class FastJSONRendererCompatibilityTest(SimpleTestCase):
+    """Test the orjson renderer produces the same bytes as DRF's JSONRenderer"""
+    
+    def test_matches_json_renderer(self):
+        """Test payloads with UUID, datetime, Decimal and unicode render identically"""
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+    
+    def test_indent_is_delegated(self):
+        """Test an indented Accept header still gets DRF's formatting"""
+        media_type = 'application/json; indent=4'
+        payload = PAYLOADS[2]
+        
+        self.assertEqual(
+            FastJSONRenderer().render(payload, media_type),
+            JSONRenderer().render(payload, media_type)
+        )
+    
+    def test_none_renders_empty(self):
+        """Test a None body renders as an empty response"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+    
+    def test_stdlib_backend_uses_json_renderer(self):
+        """Test the stdlib backend never calls orjson"""
+        with self.settings(JSON_BACKEND='stdlib'), patch('apps.core.json.orjson') as mock_orjson:
+            self.assertEqual(FastJSONRenderer().render(PAYLOADS[3]), JSONRenderer().render(PAYLOADS[3]))
+        mock_orjson.dumps.assert_not_called()
+
+
+@override_settings(JSON_BACKEND='orjson')
+class FastJSONParserCompatibilityTest(SimpleTestCase):
+    """Test the orjson parser against DRF's JSONParser"""
+    
+    DOCUMENTS = [
+        b'{"message": "Hello", "conversation_id": null, "template_id": 3}',
+        '{"text": "Zürich – 東京", "list": [1, 2.5, true, false]}'.encode('utf-8'),
+        b'[]',
+    ]
+    
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+    
+    def test_matches_json_parser(self):
+        """Test documents parse to the same data"""
+        for body in self.DOCUMENTS:
+            with self.subTest(body=body):
+                self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+    
+    def test_invalid_json_raises_parse_error(self):
+        """Test malformed input and NaN are rejected like STRICT_JSON does"""
+        for body in (b'{"a": ', b'{"a": NaN}'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    self.parse(FastJSONParser(), body)
+
+
+class FastJSONDumpsTest(SimpleTestCase):
+    """Test apps.core.json.dumps against the stdlib output it replaces"""
+    
+    REPORT = {
+        'report_info': {'name': 'Monthly', 'generated_at': '2024-05-01T00:00:00'},
+        'summary': {'total': 3, 'rate': 0.5, 'top': [{'name': 'chat', 'count': 2}]},
+        'empty': {},
+        'items': [],
+    }
+    
+    @override_settings(JSON_BACKEND='orjson')
+    def test_report_output_matches_stdlib(self):
+        """Test indented output with default=str is what json.dumps produced"""
+        expected = json.dumps(self.REPORT, indent=2, default=str).encode('utf-8')
+        
+        self.assertEqual(fast_json.dumps(self.REPORT, indent=2, default=str), expected)
+    
+    @override_settings(JSON_BACKEND='orjson')
+    def test_custom_default_receives_datetimes(self):
+        """Test default=str formats datetimes and Decimals like the stdlib"""
+        data = {'at': timezone.now(), 'day': datetime.date(2024, 5, 1), 'amount': Decimal('1.50')}
+        
+        self.assertEqual(
+            json.loads(fast_json.dumps(data, default=str)),
+            json.loads(json.dumps(data, default=str))
+        )
+    
+    def test_backends_agree(self):
+        """Test both backends produce the same bytes"""
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                with self.settings(JSON_BACKEND='stdlib'):
+                    stdlib = fast_json.dumps(payload)
+                with self.settings(JSON_BACKEND='orjson'):
+                    self.assertEqual(fast_json.dumps(payload), stdlib)
+    
+    @override_settings(JSON_BACKEND='orjson')
+    def test_missing_orjson_is_reported(self):
+        """Test selecting orjson without the package fails clearly"""
+        with patch('apps.core.json.orjson', None):
+            with self.assertRaises(ImproperlyConfigured):
+                fast_json.dumps({})
@@ -0,0 +1,161 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core import outbox
+from apps.core.http import CircuitOpenError
+from apps.core.models import OutboxMessage
+
+
+def upstream(status_code=200, error=None):
+    """Patch the upstream client so POSTs answer ``status_code`` or raise ``error``."""
+    client = MagicMock()
+    if error is not None:
+        client.post.side_effect = error
+    else:
+        client.post.return_value = MagicMock(status_code=status_code, text='')
+    return patch('apps.core.outbox.get_upstream_client', return_value=client)
+
+
+@override_settings(OUTBOX_CONCURRENCY=1, OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTest(TestCase):
+    """Test cases for the transactional webhook outbox"""
+    
+    url = 'https://hooks.example.com/webhook/test'
+    
+    def setUp(self):
+        cache.delete(outbox.DRAIN_SCHEDULED_KEY)
+    
+    def test_enqueue_schedules_drain_after_commit(self):
+        """Test the drain task is only queued once the transaction commits"""
+        with patch('apps.core.tasks.drain_outbox_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks() as callbacks:
+                outbox.enqueue('test.event', self.url, {'id': 1})
+                outbox.enqueue('test.event', self.url, {'id': 2})
+                apply_async.assert_not_called()
+            for callback in callbacks:
+                callback()
+        
+        # Debounced to one run
+        apply_async.assert_called_once()
+        self.assertEqual(OutboxMessage.objects.filter(status=OutboxMessage.Status.PENDING).count(), 2)
+    
+    def test_periodic_drain_is_scheduled(self):
+        """Test celery beat drains the outbox without relying on enqueue-time scheduling"""
+        from django.conf import settings
+        
+        tasks = {entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()}
+        self.assertIn('core.drain_outbox', tasks)
+    
+    def test_drain_sends_due_messages(self):
+        """Test due messages are POSTed and marked sent"""
+        message = outbox.enqueue('test.event', self.url, {'id': 1})
+        later = outbox.enqueue('test.event', self.url, {'id': 2})
+        OutboxMessage.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+        
+        with upstream() as client:
+            result = outbox.drain()
+        
+        client.return_value.post.assert_called_once_with(self.url, json={'id': 1}, timeout=30)
+        self.assertEqual(result['sent'], 1)
+        self.assertEqual(result['next_due'], OutboxMessage.objects.get(pk=later.pk).next_attempt_at)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.Status.SENT)
+        self.assertIsNotNone(message.sent_at)
+    
+    def test_failures_back_off_then_dead_letter(self):
+        """Test failed messages are retried later and dead after OUTBOX_MAX_ATTEMPTS"""
+        message = outbox.enqueue('test.event', self.url, {'id': 1})
+        
+        for attempt in range(1, 4):
+            OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+            with upstream(status_code=500):
+                outbox.drain()
+            message.refresh_from_db()
+            self.assertEqual(message.attempts, attempt)
+            self.assertIn('HTTP 500', message.last_error)
+            if attempt < 3:
+                self.assertEqual(message.status, OutboxMessage.Status.PENDING)
+                self.assertGreater(message.next_attempt_at, timezone.now())
+        
+        self.assertEqual(message.status, OutboxMessage.Status.DEAD)
+        
+        self.assertEqual(outbox.requeue_dead(), 1)
+        with upstream():
+            self.assertEqual(outbox.drain()['sent'], 1)
+    
+    def test_delivered_file_webhooks_invalidate_answers(self):
+        """Test cached answers are dropped once n8n has received a document change"""
+        outbox.enqueue('files.pdf_deleted', self.url, {'file_id': 1})
+        outbox.enqueue('test.event', self.url, {'id': 1})
+        
+        with upstream(), patch('apps.chat.cache.answer_cache.invalidate') as invalidate:
+            outbox.drain()
+        
+        invalidate.assert_called_once_with()
+    
+    def test_open_circuit_does_not_use_attempts(self):
+        """Test messages wait while the upstream's circuit is open"""
+        message = outbox.enqueue('test.event', self.url, {'id': 1})
+        
+        with upstream(error=CircuitOpenError('open')):
+            result = outbox.drain()
+        
+        message.refresh_from_db()
+        self.assertEqual(result['deferred'], 1)
+        self.assertEqual(message.attempts, 0)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+    
+    def test_claimed_messages_are_not_sent_twice(self):
+        """Test a claimed batch is leased to its worker"""
+        outbox.enqueue('test.event', self.url, {'id': 1})
+        
+        batch = outbox._claim(10)
+        
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(outbox._claim(10), [])
+    
+    def test_prune_sent(self):
+        """Test old delivered messages are deleted"""
+        message = outbox.enqueue('test.event', self.url, {'id': 1})
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            status=OutboxMessage.Status.SENT,
+            sent_at=timezone.now() - timedelta(days=30)
+        )
+        
+        self.assertEqual(outbox.prune_sent(), 1)
+
+
+class FeedbackOutboxTest(TestCase):
+    """Test cases for feedback notifications going through the outbox"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='feedback',
+            email='feedback@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_feedback_is_queued_not_sent(self):
+        """Test feedback returns without calling the webhook and queues both notifications"""
+        with patch('apps.chat.services.FeedbackService.get_feedbacks_by_status'), \
+                upstream() as client:
+            response = self.client.post('/api/chat/feedback/', {
+                'question': 'What is it?',
+                'answer': 'It is this.',
+                'action': 'Good Response'
+            }, format='json')
+        
+        self.assertEqual(response.status_code, 201)
+        client.return_value.post.assert_not_called()
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('topic', flat=True)),
+            ['feedback.rag', 'feedback.webhook']
+        )
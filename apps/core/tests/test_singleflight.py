@@ -0,0 +1,98 @@
+import threading
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from apps.core.singleflight import SingleFlight
+
+
+class SingleFlightTest(SimpleTestCase):
+    """Test cases for coalescing identical in-flight calls"""
+    
+    def setUp(self):
+        self.flights = SingleFlight()
+    
+    def test_concurrent_calls_share_one_result(self):
+        """Test callers arriving while a call is in flight reuse its result"""
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+        
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'response': 'shared'}
+        
+        def caller():
+            results.append(self.flights.do('q', fetch))
+        
+        threads = [threading.Thread(target=caller) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0] for r in results], [{'response': 'shared'}] * 5)
+        self.assertEqual(sorted(r[1] for r in results), [False, True, True, True, True])
+    
+    def test_key_released_after_finish(self):
+        """Test a finished flight does not capture later calls"""
+        self.assertEqual(self.flights.do('q', lambda: 1), (1, False))
+        self.assertEqual(self.flights.do('q', lambda: 2), (2, False))
+    
+    def test_stream_subscribers_receive_all_events(self):
+        """Test a late stream subscriber replays events published before it joined"""
+        release = threading.Event()
+        
+        def produce():
+            yield 'a'
+            release.wait(5)
+            yield 'b'
+        
+        first, shared_first = self.flights.stream('q', produce)
+        self.assertEqual(next(first), 'a')
+        second, shared_second = self.flights.stream('q', produce)
+        release.set()
+        
+        self.assertFalse(shared_first)
+        self.assertTrue(shared_second)
+        self.assertEqual(list(first), ['b'])
+        self.assertEqual(list(second), ['a', 'b'])
+    
+    def test_async_stream_subscribers(self):
+        """Test async subscribers share one async producer"""
+        produced = []
+        
+        async def produce():
+            for event in ('a', 'b'):
+                produced.append(event)
+                yield event
+        
+        async def run():
+            first, _ = self.flights.astream('q', produce)
+            second, shared = self.flights.astream('q', produce)
+            return [e async for e in first], [e async for e in second], shared
+        
+        first, second, shared = async_to_sync(run)()
+        
+        self.assertEqual(first, ['a', 'b'])
+        self.assertEqual(second, ['a', 'b'])
+        self.assertTrue(shared)
+        self.assertEqual(produced, ['a', 'b'])
+    
+    def test_producer_error_reaches_subscribers(self):
+        """Test a failing producer raises in every subscriber"""
+        def produce():
+            yield 'a'
+            raise RuntimeError('boom')
+        
+        events, _ = self.flights.stream('q', produce)
+        
+        with self.assertRaises(RuntimeError):
+            list(events)
@@ -4,4 +4,16 @@ from django.apps import AppConfig
 class FilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.files'
-    verbose_name = 'File Management'
\ No newline at end of file
+    verbose_name = 'File Management'
+
+    def ready(self):
+        from apps.core.outbox import delivered
+
+        delivered.connect(invalidate_answers, dispatch_uid='files.invalidate_answers')
+
+
+def invalidate_answers(topic, **kwargs):
+    """Drop cached RAG answers once n8n has applied a document upload or delete."""
+    if topic.startswith('files.'):
+        from apps.chat.cache import answer_cache
+        answer_cache.invalidate()
@@ -5,6 +5,8 @@ from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 
+from apps.core.counters import counters
+
 
 class FileCategory(models.TextChoices):
     """File category choices"""
@@ -135,10 +137,10 @@ class File(models.Model):
         self.save(update_fields=['deleted_at', 'status'])
     
     def increment_download_count(self):
-        """Increment download count and update last accessed"""
-        self.download_count += 1
+        """Increment download count and update last accessed (buffered, see apps.core.counters)"""
         self.last_accessed = timezone.now()
-        self.save(update_fields=['download_count', 'last_accessed'])
+        counters.add(File, self.pk, 'download_count', touch={'last_accessed': self.last_accessed})
+        self.download_count += 1
     
     def get_category_from_mime_type(self, mime_type):
         """Determine file category from MIME type"""
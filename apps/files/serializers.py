@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
+from apps.core.fields import CounterField
 from .models import File, FileShare, FileVersion, FileComment
 
 User = get_user_model()
@@ -192,6 +193,7 @@ class FileSerializer(serializers.ModelSerializer):
     can_edit = serializers.SerializerMethodField()
     can_delete = serializers.SerializerMethodField()
     download_url = serializers.SerializerMethodField()
+    download_count = CounterField()
     
     class Meta:
         model = File
@@ -2,7 +2,6 @@ import os
 import uuid
 import mimetypes
 import shutil
-import requests
 from datetime import datetime, timedelta
 from typing import Optional, Tuple, Dict, Any
 from urllib.parse import urljoin
@@ -12,14 +11,21 @@ from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.utils import timezone
 from django.http import FileResponse, Http404
 import logging
 
+from apps.chat.cache import answer_cache
+from apps.core import outbox
+from apps.core.counters import counters
 from .models import File, FileCategory, FileStatus
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_WEBHOOK_URL = "https://n8n.omadligrouphq.com/webhook/952410c7-550a-47c1-9496-4cffff12d21a"
+PDF_DELETE_WEBHOOK_URL = "https://n8n.omadligrouphq.com/webhook/e9f2f888-a8d5-4b32-8553-c5dd46e788c3"
+
 
 class LocalFileService:
     """Service for local file operations"""
@@ -267,16 +273,14 @@ class FileService:
             )
             
             if success:
-                # Update file record
-                file_obj.status = FileStatus.COMPLETED
-                file_obj.upload_progress = 100
-                file_obj.metadata = metadata
-                file_obj.save()
-                
-                # Send file info to webhook (without file content to avoid upload issues)
-                try:
-                    webhook_url = "https://n8n.omadligrouphq.com/webhook/952410c7-550a-47c1-9496-4cffff12d21a"
+                with transaction.atomic():
+                    # Update file record
+                    file_obj.status = FileStatus.COMPLETED
+                    file_obj.upload_progress = 100
+                    file_obj.metadata = metadata
+                    file_obj.save()
                     
+                    # Notify the webhook (file info only, no content) once committed
                     webhook_data = {
                         'fileName': file_obj.original_name,
                         'fileSize': str(file_obj.file_size),
@@ -291,21 +295,11 @@ class FileService:
                         'file_type': file_obj.file_type,
                         'object_key': file_obj.object_key
                     }
-                    
-                    response = requests.post(
-                        webhook_url,
-                        json=webhook_data,
-                        timeout=10
-                    )
-                    
-                    if response.status_code == 200:
-                        logger.info(f"Webhook notification sent successfully for file: {file_obj.id}")
-                    else:
-                        logger.warning(f"Webhook notification failed with status {response.status_code} for file: {file_obj.id}")
-                        
-                except Exception as webhook_error:
-                    logger.error(f"Webhook notification error for file {file_obj.id}: {str(webhook_error)}")
-                    # Don't fail the upload if webhook fails
+                    outbox.enqueue('files.uploaded', UPLOAD_WEBHOOK_URL, webhook_data)
+                
+                # The document set changes once the webhook is delivered, which
+                # invalidates again (FilesConfig); this only drops answers early
+                answer_cache.invalidate()
                 
                 logger.info(f"File uploaded successfully: {file_obj.id}")
                 return True, file_obj, "File uploaded successfully"
@@ -351,30 +345,22 @@ class FileService:
             if not self._can_modify_file(file_obj, user):
                 return False, "Permission denied"
             
-            # Send PDF delete webhook before deletion
-            if file_obj.file_type == 'application/pdf':
-                try:
-                    webhook_success, webhook_message = self.delete_pdf_webhook(file_obj, user)
-                    if webhook_success:
-                        logger.info(f"PDF delete webhook sent successfully for file {file_obj.id}")
-                    else:
-                        logger.warning(f"PDF delete webhook failed: {webhook_message}")
-                except Exception as webhook_error:
-                    logger.error(f"PDF delete webhook error: {str(webhook_error)}")
-                    # Don't fail the deletion if webhook fails
-            
             if hard_delete:
                 # Delete from local storage
                 success, message = self.storage_service.delete_file(file_obj.object_key)
                 if success:
-                    # Delete from database
-                    file_obj.delete()
+                    # Delete from database, queueing the PDF delete webhook with it
+                    with transaction.atomic():
+                        self._queue_pdf_delete_webhook(file_obj, user)
+                        file_obj.delete()
                     return True, "File permanently deleted"
                 else:
                     return False, f"Failed to delete from storage: {message}"
             else:
                 # Soft delete
-                file_obj.soft_delete()
+                with transaction.atomic():
+                    self._queue_pdf_delete_webhook(file_obj, user)
+                    file_obj.soft_delete()
                 return True, "File moved to trash"
                 
         except Exception as e:
@@ -382,6 +368,14 @@ class FileService:
             logger.error(error_msg)
             return False, error_msg
     
+    def _queue_pdf_delete_webhook(self, file_obj: File, user):
+        """Queue the PDF delete webhook; errors never fail the deletion."""
+        if file_obj.file_type != 'application/pdf':
+            return
+        webhook_success, webhook_message = self.delete_pdf_webhook(file_obj, user)
+        if not webhook_success:
+            logger.warning(f"PDF delete webhook not queued: {webhook_message}")
+    
     def get_download_url(
         self, 
         file_obj: File, 
@@ -533,7 +527,7 @@ class FileService:
             'most_downloaded': [
                 {
                     'name': f.original_name,
-                    'downloads': f.download_count,
+                    'downloads': counters.value(f, 'download_count'),
                     'size': self._format_file_size(f.file_size)
                 }
                 for f in most_downloaded
@@ -550,13 +544,11 @@ class FileService:
         return f"{size_bytes:.1f} PB"
     
     def upload_pdf_webhook(self, file_obj: File, user) -> Tuple[bool, str]:
-        """Send PDF upload notification to webhook"""
+        """Queue PDF upload notification to webhook (sent once the transaction commits)"""
         try:
             if file_obj.file_type != 'application/pdf':
                 return False, "File is not a PDF"
             
-            url = "https://n8n.omadligrouphq.com/webhook/952410c7-550a-47c1-9496-4cffff12d21a"
-            
             payload = {
                 "file_id": str(file_obj.id),
                 "file_name": file_obj.original_name,
@@ -567,19 +559,9 @@ class FileService:
                 "action": "pdf_upload"
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                logger.info(f"PDF upload webhook sent successfully for file {file_obj.id}")
-                return True, "PDF upload webhook sent successfully"
-            else:
-                error_msg = f"PDF upload webhook failed with status {response.status_code}"
-                logger.error(error_msg)
-                return False, error_msg
+            outbox.enqueue('files.pdf_uploaded', UPLOAD_WEBHOOK_URL, payload)
+            logger.info(f"PDF upload webhook queued for file {file_obj.id}")
+            return True, "PDF upload webhook queued"
                 
         except Exception as e:
             error_msg = f"PDF upload webhook error: {str(e)}"
@@ -587,13 +569,11 @@ class FileService:
             return False, error_msg
     
     def delete_pdf_webhook(self, file_obj: File, user) -> Tuple[bool, str]:
-        """Send PDF delete notification to webhook"""
+        """Queue PDF delete notification to webhook (sent once the transaction commits)"""
         try:
             if file_obj.file_type != 'application/pdf':
                 return False, "File is not a PDF"
             
-            url = "https://n8n.omadligrouphq.com/webhook/e9f2f888-a8d5-4b32-8553-c5dd46e788c3"
-            
             payload = {
                 "file_id": str(file_obj.id),
                 "file_name": file_obj.original_name,
@@ -604,19 +584,13 @@ class FileService:
                 "action": "pdf_delete"
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            # Answers may cite the removed document. They are invalidated again
+            # once n8n has processed the delete (FilesConfig)
+            answer_cache.invalidate()
             
-            if response.status_code == 200:
-                logger.info(f"PDF delete webhook sent successfully for file {file_obj.id}")
-                return True, "PDF delete webhook sent successfully"
-            else:
-                error_msg = f"PDF delete webhook failed with status {response.status_code}"
-                logger.error(error_msg)
-                return False, error_msg
+            outbox.enqueue('files.pdf_deleted', PDF_DELETE_WEBHOOK_URL, payload)
+            logger.info(f"PDF delete webhook queued for file {file_obj.id}")
+            return True, "PDF delete webhook queued"
                 
         except Exception as e:
             error_msg = f"PDF delete webhook error: {str(e)}"
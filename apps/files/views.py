@@ -13,6 +13,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
 from apps.authentication.permissions import IsOwnerOrAdmin, IsActiveSubscription
+from apps.core.counters import counters
 from .models import File, FileShare, FileComment, FileVersion
 from .serializers import (
     FileUploadSerializer, FileSerializer, FileDetailSerializer,
@@ -424,7 +425,7 @@ class AdminFileAnalyticsView(APIView):
                     'id': f.id,
                     'name': f.original_name,
                     'user': f.user.username,
-                    'downloads': f.download_count,
+                    'downloads': counters.value(f, 'download_count'),
                     'size': f.file_size
                 }
                 for f in most_downloaded